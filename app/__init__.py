@@ -26,13 +26,27 @@ def create_app(config_class=Config):
     # Load cấu hình từ class Config
     app.config.from_object(config_class)
     
+    # Sau reverse proxy: lấy IP client / scheme / host từ X-Forwarded-* của đúng số proxy tin cậy
+    if app.config.get('PROXY_FIX_X_FOR') or app.config.get('PROXY_FIX_X_PROTO') or app.config.get('PROXY_FIX_X_HOST'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app,
+                                x_for=app.config.get('PROXY_FIX_X_FOR', 0),
+                                x_proto=app.config.get('PROXY_FIX_X_PROTO', 0),
+                                x_host=app.config.get('PROXY_FIX_X_HOST', 0))
+    
+    # Engine options theo loại database (SQLite: pool + PRAGMA cho mỗi kết nối)
+    from app.utils.database import configure_engine, init_engine
+    configure_engine(app)
+    
     # Gắn extensions vào app
     db.init_app(app)
+    init_engine(app, db)
     login_manager.init_app(app)
-    migrate.init_app(app, db)
+    migrate.init_app(app, db, render_as_batch=True)  # SQLite: ALTER TABLE qua batch mode
     
     # Cấu hình Login Manager
     login_manager.login_view = 'auth.login'  # Redirect đến trang login nếu chưa đăng nhập
+    login_manager.blueprint_login_views = {'api': None}  # API: trả 401, không redirect
     login_manager.login_message = 'Vui lòng đăng nhập để truy cập trang này.'
     login_manager.login_message_category = 'warning'  # Bootstrap alert class
     
@@ -40,11 +54,24 @@ def create_app(config_class=Config):
     from app.utils.logger import setup_logging
     setup_logging(app)
     
+    # SQL profiler theo request (SQL_PROFILER=1): Server-Timing + logs/sql_profile.log
+    from app.utils.profiler import init_profiler
+    init_profiler(app)
+    
     # Import models (phải import sau khi khởi tạo db)
     from app import models
     
+    # Index tìm kiếm full-text: đăng ký model events + tạo bảng index khi create_all
+    from app.services import search_service
+    
+    # Snapshot báo cáo theo tháng: làm mới khi ghi hóa đơn / khách thuê / phòng
+    from app.services import snapshot_service
+    
+    # Số phiên bản ghi của từng bảng (ETag cho /api/v1)
+    from app.services import version_service
+    
     # Đăng ký blueprints (routes)
-    from app.routes import auth, main, rooms, tenants, invoices, reports, users, services
+    from app.routes import auth, main, rooms, tenants, invoices, reports, users, services, api
     
     app.register_blueprint(auth.bp)
     app.register_blueprint(main.bp)
@@ -54,6 +81,7 @@ def create_app(config_class=Config):
     app.register_blueprint(reports.bp)
     app.register_blueprint(users.bp)
     app.register_blueprint(services.bp)
+    app.register_blueprint(api.bp)
     
     # Đăng ký error handlers
     from app.errors import register_error_handlers
@@ -65,6 +93,10 @@ def create_app(config_class=Config):
     def security_headers(response):
         return add_security_headers(response)
     
+    # Static assets đã build (manifest, asset_url, nén sẵn)
+    from app.utils.assets import init_assets
+    init_assets(app)
+    
     # Đăng ký template filters
     from app.utils.helpers import format_currency, format_date, get_status_badge_class
     app.jinja_env.filters['currency'] = format_currency
@@ -75,6 +107,10 @@ def create_app(config_class=Config):
     with app.app_context():
         db.create_all()
     
+    # Prometheus /metrics: cấp phát series cho mọi endpoint đã đăng ký
+    from app.utils.metrics import init_metrics
+    init_metrics(app, db)
+    
     app.logger.info('RoomMaster application started successfully')
     
     return app
@@ -35,6 +35,16 @@ def register_error_handlers(app):
             return jsonify({'error': 'Not Found', 'message': 'Không tìm thấy tài nguyên'}), 404
         return render_template('errors/404.html'), 404
     
+    @app.errorhandler(429)
+    def too_many_requests(error):
+        """Too Many Requests - Vượt giới hạn số lần gửi yêu cầu"""
+        retry_after = getattr(error, 'retry_after', None)
+        headers = {'Retry-After': str(retry_after)} if retry_after else {}
+        if request.is_json:
+            return jsonify({'error': 'Too Many Requests',
+                            'message': 'Bạn thao tác quá nhanh, vui lòng thử lại sau'}), 429, headers
+        return render_template('errors/429.html', retry_after=retry_after), 429, headers
+    
     @app.errorhandler(500)
     def internal_server_error(error):
         """Internal Server Error - Lỗi server"""
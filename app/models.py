@@ -1,7 +1,13 @@
 from datetime import datetime
+from sqlalchemy import case, select
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import joinedload, selectinload
 from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app
 from flask_login import UserMixin
 from app import db, login_manager
+from app.utils.cache import EntityCache
+from app.utils.money import Money, to_dong, usage_cost
 
 
 # ============================================
@@ -12,8 +18,11 @@ def load_user(user_id):
     """
     Flask-Login dùng hàm này để load user từ session
     Được gọi mỗi khi user truy cập trang (nếu đã đăng nhập)
+    
+    Đọc qua user_cache (TTL = USER_CACHE_TTL): phần lớn request không query bảng users.
+    Các route sửa/xóa/reset mật khẩu user phải gọi user_cache.invalidate(user.id) sau commit.
     """
-    return User.query.get(int(user_id))
+    return user_cache.get(db.session, int(user_id), ttl=current_app.config.get('USER_CACHE_TTL'))
 
 
 # ============================================
@@ -26,6 +35,11 @@ class User(UserMixin, db.Model):
     """
     __tablename__ = 'users'
     
+    __table_args__ = (
+        # Danh sách nhân viên: keyset pagination theo (created_at, id)
+        db.Index('ix_users_created_at', 'created_at'),
+    )
+    
     # Các cột (columns)
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -56,6 +70,10 @@ class User(UserMixin, db.Model):
         return f'<User {self.username}>'
 
 
+# Cache user cho load_user (mỗi process 1 bản)
+user_cache = EntityCache(User, ttl=60, maxsize=1024, name='user')
+
+
 # ============================================
 # MODEL 2: ROOM (Phòng trọ)
 # ============================================
@@ -63,12 +81,17 @@ class Room(db.Model):
     """Model Room - Quản lý thông tin phòng trọ"""
     __tablename__ = 'rooms'
     
+    __table_args__ = (
+        # Lọc phòng theo trạng thái, sắp xếp theo số phòng (danh sách, phòng trống)
+        db.Index('ix_rooms_status_room_number', 'status', 'room_number'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     room_number = db.Column(db.String(20), unique=True, nullable=False, index=True)
     floor = db.Column(db.Integer, default=1)
     area = db.Column(db.Float, default=0)  # Diện tích (m²)
-    price = db.Column(db.Float, nullable=False)  # Giá phòng/tháng
-    deposit = db.Column(db.Float, default=0)  # Tiền cọc
+    price = db.Column(Money, nullable=False)  # Giá phòng/tháng (VNĐ)
+    deposit = db.Column(Money, default=0)  # Tiền cọc
     status = db.Column(db.String(20), default='available')  # available, occupied, maintenance
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -81,6 +104,15 @@ class Room(db.Model):
     tenants = db.relationship('Tenant', backref='room', lazy='dynamic', cascade='all, delete-orphan')
     invoices = db.relationship('Invoice', backref='room', lazy='dynamic')
     
+    # Khách đang ở (chỉ đọc) - nạp theo lô bằng Room.current_tenant_loader()
+    active_tenants = db.relationship(
+        'Tenant',
+        primaryjoin="and_(Room.id == Tenant.room_id, Tenant.status == 'active')",
+        order_by='Tenant.id',
+        viewonly=True,
+        lazy='select'
+    )
+    
     def __repr__(self):
         return f'<Room {self.room_number}>'
     
@@ -89,8 +121,44 @@ class Room(db.Model):
         """
         Lấy khách thuê hiện tại của phòng
         @property: Dùng như thuộc tính (room.current_tenant)
+        
+        Đọc từ relationship active_tenants: chỉ query 1 lần cho mỗi phòng,
+        và không query thêm nếu đã nạp sẵn bằng current_tenant_loader()
+        """
+        return self.active_tenants[0] if self.active_tenants else None
+    
+    @staticmethod
+    def current_tenant_loader(via=None):
+        """
+        Query option nạp current_tenant cho cả trang trong 1 query (tránh N+1)
+        
+        Args:
+            via: Relationship dẫn tới Room (VD: Invoice.room). None nếu query Room trực tiếp
+            
+        Usage:
+            Room.query.options(Room.current_tenant_loader())
+            Invoice.query.options(Room.current_tenant_loader(Invoice.room))
+        """
+        if via is None:
+            return selectinload(Room.active_tenants)
+        return joinedload(via).selectinload(Room.active_tenants)
+    
+    @staticmethod
+    def current_tenant_name():
+        """
+        Biểu thức SQL (scalar subquery) lấy tên khách hiện tại của phòng
+        
+        Dùng khi chỉ cần cột, không cần nạp object (xuất file, in hàng loạt)
+        
+        Usage:
+            select(Room.room_number, Room.current_tenant_name())
         """
-        return self.tenants.filter_by(status='active').first()
+        return select(Tenant.full_name)\
+            .where(Tenant.room_id == Room.id, Tenant.status == 'active')\
+            .order_by(Tenant.id)\
+            .limit(1)\
+            .correlate(Room)\
+            .scalar_subquery()
 
 
 # ============================================
@@ -100,6 +168,13 @@ class Tenant(db.Model):
     """Model Tenant - Quản lý thông tin khách thuê"""
     __tablename__ = 'tenants'
     
+    __table_args__ = (
+        # Khách đang ở của 1 phòng (Room.active_tenants, current_tenant_name)
+        db.Index('ix_tenants_room_id_status', 'room_id', 'status'),
+        # Danh sách khách thuê: keyset pagination theo (status, full_name, id)
+        db.Index('ix_tenants_status_full_name', 'status', 'full_name'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(100), nullable=False)
     id_number = db.Column(db.String(20), unique=True, nullable=False, index=True)  # CMND/CCCD
@@ -113,7 +188,7 @@ class Tenant(db.Model):
     
     move_in_date = db.Column(db.Date, nullable=False)
     move_out_date = db.Column(db.Date)
-    deposit = db.Column(db.Float, default=0)  # Tiền đặt cọc
+    deposit = db.Column(Money, default=0)  # Tiền đặt cọc
     is_main_tenant = db.Column(db.Boolean, default=True)  # Người thuê chính
     status = db.Column(db.String(20), default='active')  # active, moved_out
     notes = db.Column(db.Text)
@@ -133,7 +208,7 @@ class Service(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
     unit = db.Column(db.String(20))  # Đơn vị: kWh, m³, tháng...
-    price = db.Column(db.Float, nullable=False)  # Đơn giá
+    price = db.Column(Money, nullable=False)  # Đơn giá (VNĐ)
     description = db.Column(db.Text)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -152,6 +227,12 @@ class Invoice(db.Model):
     # ✅ UNIQUE CONSTRAINT: MỖI PHÒNG - MỖI THÁNG - CHỈ MỘT HÓA ĐƠN
     __table_args__ = (
         db.UniqueConstraint('room_id', 'month', 'year', name='uq_room_month_year'),
+        # Tra cứu chuỗi chỉ số điện/nước theo thứ tự thời gian (MeterReadingService)
+        db.Index('ix_invoices_room_year_month', 'room_id', 'year', 'month'),
+        # Hóa đơn quá hạn / công nợ: lọc theo trạng thái, so sánh hạn thanh toán
+        db.Index('ix_invoices_status_due_date', 'status', 'due_date'),
+        # Báo cáo, thống kê theo kỳ (năm, tháng)
+        db.Index('ix_invoices_year_month', 'year', 'month'),
     )
     
     id = db.Column(db.Integer, primary_key=True)
@@ -165,23 +246,27 @@ class Invoice(db.Model):
     year = db.Column(db.Integer, nullable=False)   # 2024, 2025...
     
     # Tiền phòng
-    room_price = db.Column(db.Float, default=0)  # Giá phòng trong tháng
+    room_price = db.Column(Money, default=0)  # Giá phòng trong tháng
     
     # Chỉ số điện
-    electric_old = db.Column(db.Float, default=0)  # Số điện cũ
-    electric_new = db.Column(db.Float, default=0)  # Số điện mới
-    electric_unit_price = db.Column(db.Float, default=3500)  # Đơn giá điện (VNĐ/kWh)
+    electric_old = db.Column(db.Numeric(12, 2, asdecimal=False), default=0)  # Số điện cũ
+    electric_new = db.Column(db.Numeric(12, 2, asdecimal=False), default=0)  # Số điện mới
+    electric_unit_price = db.Column(Money, default=3500)  # Đơn giá điện (VNĐ/kWh)
     
     # Chỉ số nước
-    water_old = db.Column(db.Float, default=0)  # Số nước cũ
-    water_new = db.Column(db.Float, default=0)  # Số nước mới
-    water_unit_price = db.Column(db.Float, default=20000)  # Đơn giá nước (VNĐ/m³)
+    water_old = db.Column(db.Numeric(12, 2, asdecimal=False), default=0)  # Số nước cũ
+    water_new = db.Column(db.Numeric(12, 2, asdecimal=False), default=0)  # Số nước mới
+    water_unit_price = db.Column(Money, default=20000)  # Đơn giá nước (VNĐ/m³)
     
     # Các khoản phí khác
-    other_fees = db.Column(db.Float, default=0)  # Rác, internet, xe...
+    other_fees = db.Column(Money, default=0)  # Rác, internet, xe...
     
     # Tổng tiền (tự động tính)
-    total_amount = db.Column(db.Float, default=0)
+    total_amount = db.Column(Money, default=0)
+    
+    # Tổng đã thanh toán - cột ledger, cập nhật cùng transaction với Payment
+    # (xem apply_payment). Dùng `flask reconcile-paid-amounts` để dựng lại từ bảng payments
+    paid_amount = db.Column(Money, nullable=False, default=0, server_default='0')
     
     # Trạng thái
     status = db.Column(db.String(20), default='unpaid')  # unpaid, partial, paid
@@ -205,47 +290,75 @@ class Invoice(db.Model):
         Công thức: Tiền phòng + Tiền điện + Tiền nước + Phí khác
         
         Returns:
-            float: Tổng tiền hóa đơn
+            int: Tổng tiền hóa đơn (VNĐ)
         """
-        # Tính tiền điện = (Số mới - Số cũ) × Đơn giá
-        electric_usage = max(0, self.electric_new - self.electric_old)
-        electric_cost = electric_usage * self.electric_unit_price
-        
-        # Tính tiền nước = (Số mới - Số cũ) × Đơn giá
-        water_usage = max(0, self.water_new - self.water_old)
-        water_cost = water_usage * self.water_unit_price
-        
-        # Tổng = Phòng + Điện + Nước + Khác
-        self.total_amount = self.room_price + electric_cost + water_cost + self.other_fees
+        # Tổng = Phòng + Điện + Nước + Khác (điện/nước đã làm tròn về đồng)
+        self.total_amount = (to_dong(self.room_price or 0) + self.electric_cost + self.water_cost
+                             + to_dong(self.other_fees or 0))
         
         return self.total_amount
     
     @property
     def electric_cost(self):
-        """Tiền điện (VNĐ)"""
-        usage = max(0, self.electric_new - self.electric_old)
-        return usage * self.electric_unit_price
+        """Tiền điện (VNĐ) = (Số mới - Số cũ) × Đơn giá"""
+        return usage_cost(self.electric_old, self.electric_new, self.electric_unit_price)
     
     @property
     def water_cost(self):
-        """Tiền nước (VNĐ)"""
-        usage = max(0, self.water_new - self.water_old)
-        return usage * self.water_unit_price
+        """Tiền nước (VNĐ) = (Số mới - Số cũ) × Đơn giá"""
+        return usage_cost(self.water_old, self.water_new, self.water_unit_price)
     
-    @property
-    def paid_amount(self):
-        """Tổng số tiền đã thanh toán (VNĐ)"""
-        return sum(p.amount for p in self.payments)
-    
-    @property
+    @hybrid_property
     def remaining_amount(self):
         """Số tiền còn nợ (VNĐ)"""
-        return max(0, self.total_amount - self.paid_amount)
+        return max(0, (self.total_amount or 0) - (self.paid_amount or 0))
     
-    @property
+    @remaining_amount.expression
+    def remaining_amount(cls):
+        """Biểu thức SQL tương ứng - cho phép SUM(remaining_amount) trong query"""
+        return case(
+            (cls.total_amount > cls.paid_amount, cls.total_amount - cls.paid_amount),
+            else_=0
+        )
+    
+    @hybrid_property
     def overpaid_amount(self):
         """Số tiền thanh toán thừa (VNĐ)"""
-        return max(0, self.paid_amount - self.total_amount)
+        return max(0, (self.paid_amount or 0) - (self.total_amount or 0))
+    
+    @overpaid_amount.expression
+    def overpaid_amount(cls):
+        """Biểu thức SQL tương ứng"""
+        return case(
+            (cls.paid_amount > cls.total_amount, cls.paid_amount - cls.total_amount),
+            else_=0
+        )
+    
+    def apply_payment(self, amount):
+        """
+        Cộng (hoặc trừ nếu amount < 0) vào cột paid_amount và cập nhật trạng thái
+        
+        Phải gọi trong cùng transaction với thao tác thêm/sửa/xóa Payment
+        để paid_amount luôn khớp với tổng bảng payments.
+        
+        Args:
+            amount: Số tiền thay đổi (âm khi xóa/giảm thanh toán), làm tròn về đồng
+        """
+        self.paid_amount = (self.paid_amount or 0) + to_dong(amount)
+        self.update_status()
+    
+    def recalculate_paid_amount(self):
+        """
+        Tính lại paid_amount từ bảng payments (1 query SUM)
+        
+        Returns:
+            int: Tổng đã thanh toán sau khi tính lại
+        """
+        self.paid_amount = db.session.query(
+            db.func.coalesce(db.func.sum(Payment.amount), 0)
+        ).filter(Payment.invoice_id == self.id).scalar()
+        self.update_status()
+        return self.paid_amount
     
     def update_status(self):
         """
@@ -257,7 +370,7 @@ class Invoice(db.Model):
         - 0 < paid < total: partial
         - paid >= total: paid (kể cả thanh toán thừa)
         """
-        paid = self.paid_amount
+        paid = self.paid_amount or 0
         
         if paid == 0:
             self.status = 'unpaid'
@@ -351,12 +464,19 @@ class Payment(db.Model):
     """Model Payment - Quản lý các lần thanh toán"""
     __tablename__ = 'payments'
     
+    __table_args__ = (
+        # Các lần thanh toán của 1 hóa đơn theo thời gian (và SUM khi đối soát)
+        db.Index('ix_payments_invoice_id_payment_date', 'invoice_id', 'payment_date'),
+        # Thống kê thanh toán theo khoảng ngày
+        db.Index('ix_payments_payment_date', 'payment_date'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     
     # Foreign Key
     invoice_id = db.Column(db.Integer, db.ForeignKey('invoices.id'), nullable=False)
     
-    amount = db.Column(db.Float, nullable=False)  # Số tiền thanh toán
+    amount = db.Column(Money, nullable=False)  # Số tiền thanh toán (VNĐ)
     payment_method = db.Column(db.String(20), default='cash')  # cash, bank_transfer
     payment_date = db.Column(db.DateTime, default=datetime.utcnow)
     notes = db.Column(db.Text)  # Ghi chú
@@ -364,3 +484,94 @@ class Payment(db.Model):
     
     def __repr__(self):
         return f'<Payment {self.amount}đ>'
+
+
+# ============================================
+# MODEL 7: MONTHLY SNAPSHOT (Số liệu tổng hợp theo tháng)
+# ============================================
+class MonthlySnapshot(db.Model):
+    """
+    Model MonthlySnapshot - Số liệu báo cáo đã tính sẵn cho từng tháng
+    
+    Do SnapshotService ghi: thay đổi hóa đơn/khách thuê/phòng đánh dấu tháng
+    bị ảnh hưởng (dirty), tháng được tính lại ở lần đọc kế tiếp; tháng đã qua
+    được chốt (closed) và chỉ tính lại khi bị đánh dấu.
+    """
+    __tablename__ = 'monthly_snapshots'
+    
+    __table_args__ = (
+        db.UniqueConstraint('year', 'month', name='uq_monthly_snapshots_year_month'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    
+    # Hóa đơn của kỳ
+    receivable = db.Column(Money, nullable=False, default=0)    # Tổng phải thu
+    collected = db.Column(Money, nullable=False, default=0)     # Đã thu (paid_amount)
+    paid_revenue = db.Column(Money, nullable=False, default=0)  # Tổng tiền hóa đơn đã thanh toán đủ
+    invoices_total = db.Column(db.Integer, nullable=False, default=0)
+    invoices_paid = db.Column(db.Integer, nullable=False, default=0)
+    invoices_partial = db.Column(db.Integer, nullable=False, default=0)
+    invoices_unpaid = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Phòng / khách thuê tại cuối tháng (tháng đang mở: tại lần làm mới gần nhất)
+    total_rooms = db.Column(db.Integer, nullable=False, default=0)
+    occupied_rooms = db.Column(db.Integer, nullable=False, default=0)
+    maintenance_rooms = db.Column(db.Integer, nullable=False, default=0)
+    total_tenants = db.Column(db.Integer, nullable=False, default=0)
+    active_tenants = db.Column(db.Integer, nullable=False, default=0)
+    new_tenants = db.Column(db.Integer, nullable=False, default=0)  # Vào ở trong tháng
+    
+    closed = db.Column(db.Boolean, nullable=False, default=False)  # Tháng đã chốt
+    # Dữ liệu gốc đã đổi sau lần tính gần nhất → tính lại ở lần đọc kế tiếp
+    dirty = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def available_rooms(self):
+        """Số phòng trống"""
+        return max(self.total_rooms - self.occupied_rooms - self.maintenance_rooms, 0)
+    
+    @property
+    def moved_out_tenants(self):
+        """Số khách đã chuyển đi (tính tới cuối tháng)"""
+        return self.total_tenants - self.active_tenants
+    
+    @property
+    def occupancy_rate(self):
+        """Tỷ lệ lấp đầy (%)"""
+        return (self.occupied_rooms / self.total_rooms * 100) if self.total_rooms > 0 else 0
+    
+    @property
+    def unpaid_amount(self):
+        """Còn phải thu"""
+        return self.receivable - self.collected
+    
+    @property
+    def collection_rate(self):
+        """Tỷ lệ thu (%)"""
+        return (self.collected / self.receivable * 100) if self.receivable > 0 else 0
+    
+    def __repr__(self):
+        return f'<MonthlySnapshot {self.month:02d}/{self.year}>'
+
+
+# ============================================
+# MODEL 8: DATA VERSION (Số phiên bản ghi của từng bảng)
+# ============================================
+class DataVersion(db.Model):
+    """
+    Model DataVersion - Bộ đếm số lần ghi của mỗi bảng (dùng làm ETag cho API)
+    
+    Tăng 1 lần mỗi commit, trong cùng transaction với thay đổi dữ liệu
+    (DataVersionService), nên đúng cả khi chạy nhiều worker/process.
+    """
+    __tablename__ = 'data_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)  # Tên bảng
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DataVersion {self.name}={self.version}>'
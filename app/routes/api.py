@@ -0,0 +1,251 @@
+"""
+API v1 - JSON cho máy tính bảng lễ tân (polling)
+
+- Dùng lại các service (InvoiceService, RoomService, TenantService, ReportService, DashboardStats)
+- Mỗi response có ETag tính từ số phiên bản ghi (data_versions) của các bảng
+  liên quan + URL + ngày hiện tại. If-None-Match khớp → 304 không body, không
+  chạy query dữ liệu (chỉ 1 query đọc version)
+- Chưa đăng nhập → 401 JSON (không redirect về trang login)
+"""
+from datetime import date, datetime
+from functools import wraps
+
+from flask import Blueprint, current_app, jsonify, make_response, request
+from flask_login import login_required
+from sqlalchemy.orm import contains_eager
+
+from app.models import Invoice, Payment, Room
+from app.services import DashboardStats, InvoiceService, ReportService, RoomService, TenantService
+from app.services.version_service import DataVersionService
+from app.utils.pagination import keyset_paginate
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+MAX_PER_PAGE = 100
+
+
+# ============================================
+# HELPERS
+# ============================================
+def conditional(*tables):
+    """
+    Decorator: GET có điều kiện theo ETag
+    
+    Args:
+        tables: Các bảng mà dữ liệu trả về phụ thuộc vào
+    
+    Usage:
+        @bp.route('/rooms')
+        @login_required
+        @conditional('rooms', 'tenants')
+        def rooms(): ...
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Ngày hiện tại: số ngày quá hạn, doanh thu tháng... đổi theo ngày
+            etag = DataVersionService.etag(tables, request.full_path, date.today().isoformat())
+            
+            if etag in request.if_none_match:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def _per_page(default=20):
+    return min(max(request.args.get('per_page', default, type=int), 1), MAX_PER_PAGE)
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _page(pagination, serialize):
+    """Pagination (Flask-SQLAlchemy) → dict"""
+    return {
+        'items': [serialize(item) for item in pagination.items],
+        'page': pagination.page,
+        'pages': pagination.pages,
+        'per_page': pagination.per_page,
+        'total': pagination.total
+    }
+
+
+def _invoice(invoice):
+    return {
+        'id': invoice.id,
+        'room_id': invoice.room_id,
+        'room_number': invoice.room.room_number,
+        'month': invoice.month,
+        'year': invoice.year,
+        'total_amount': invoice.total_amount,
+        'paid_amount': invoice.paid_amount,
+        'remaining_amount': invoice.remaining_amount,
+        'status': invoice.status,
+        'due_date': _iso(invoice.due_date),
+        'days_overdue': invoice.days_overdue
+    }
+
+
+def _room(room):
+    tenant = room.current_tenant
+    return {
+        'id': room.id,
+        'room_number': room.room_number,
+        'floor': room.floor,
+        'area': room.area,
+        'price': room.price,
+        'status': room.status,
+        'current_tenant': {'id': tenant.id, 'full_name': tenant.full_name} if tenant else None
+    }
+
+
+def _tenant(tenant):
+    return {
+        'id': tenant.id,
+        'full_name': tenant.full_name,
+        'phone': tenant.phone,
+        'room_id': tenant.room_id,
+        'room_number': tenant.room.room_number if tenant.room else None,
+        'move_in_date': _iso(tenant.move_in_date),
+        'move_out_date': _iso(tenant.move_out_date),
+        'status': tenant.status
+    }
+
+
+@bp.errorhandler(401)
+def unauthorized(error):
+    return jsonify({'error': 'Unauthorized', 'message': 'Vui lòng đăng nhập'}), 401
+
+
+@bp.errorhandler(404)
+def not_found(error):
+    return jsonify({'error': 'Not Found', 'message': 'Không tìm thấy tài nguyên'}), 404
+
+
+# ============================================
+# HÓA ĐƠN
+# ============================================
+@bp.route('/invoices')
+@login_required
+@conditional('invoices', 'rooms')
+def invoices():
+    """
+    Danh sách hóa đơn (keyset pagination giống trang danh sách)
+    
+    Query: status, month, year, room_number, cursor, per_page
+    """
+    query = Invoice.query.join(Room).options(contains_eager(Invoice.room))
+    query = InvoiceService.filter_list(
+        query,
+        status=request.args.get('status', ''),
+        month=request.args.get('month', type=int),
+        year=request.args.get('year', type=int),
+        room_number=request.args.get('room_number', '').strip()
+    )
+    page = keyset_paginate(
+        query, [Invoice.year.desc(), Invoice.month.desc(), Invoice.id.desc()],
+        cursor=request.args.get('cursor'), per_page=_per_page()
+    )
+    return jsonify({
+        'items': [_invoice(invoice) for invoice in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor
+    })
+
+
+@bp.route('/invoices/<int:id>')
+@login_required
+@conditional('invoices', 'rooms', 'payments')
+def invoice_detail(id):
+    """Chi tiết hóa đơn kèm các lần thanh toán"""
+    invoice = InvoiceService.get_invoice_by_id(id)
+    data = _invoice(invoice)
+    data['payments'] = [
+        {
+            'id': payment.id,
+            'amount': payment.amount,
+            'payment_method': payment.payment_method,
+            'payment_date': _iso(payment.payment_date)
+        }
+        for payment in invoice.payments.order_by(Payment.payment_date)
+    ]
+    return jsonify(data)
+
+
+# ============================================
+# PHÒNG / KHÁCH THUÊ
+# ============================================
+@bp.route('/rooms')
+@login_required
+@conditional('rooms', 'tenants')
+def rooms():
+    """Danh sách phòng. Query: search, status, page, per_page"""
+    pagination = RoomService.get_all_rooms(
+        page=request.args.get('page', 1, type=int),
+        per_page=_per_page(),
+        search=request.args.get('search'),
+        status=request.args.get('status')
+    )
+    return jsonify(_page(pagination, _room))
+
+
+@bp.route('/rooms/<int:id>')
+@login_required
+@conditional('rooms', 'tenants')
+def room_detail(id):
+    """Chi tiết phòng"""
+    return jsonify(_room(RoomService.get_room_by_id(id)))
+
+
+@bp.route('/tenants')
+@login_required
+@conditional('tenants', 'rooms')
+def tenants():
+    """Danh sách khách thuê. Query: search, status, page, per_page"""
+    pagination = TenantService.get_all_tenants(
+        page=request.args.get('page', 1, type=int),
+        per_page=_per_page(),
+        search=request.args.get('search'),
+        status=request.args.get('status')
+    )
+    return jsonify(_page(pagination, _tenant))
+
+
+@bp.route('/tenants/<int:id>')
+@login_required
+@conditional('tenants', 'rooms')
+def tenant_detail(id):
+    """Chi tiết khách thuê"""
+    return jsonify(_tenant(TenantService.get_tenant_by_id(id)))
+
+
+# ============================================
+# TỔNG QUAN / BÁO CÁO
+# ============================================
+@bp.route('/dashboard')
+@login_required
+@conditional('rooms', 'tenants', 'invoices', 'payments')
+def dashboard():
+    """Số liệu Dashboard (DashboardStats, cùng cache với trang HTML)"""
+    stats = dict(DashboardStats.get(datetime.now()))
+    stats['recent_invoices'] = [
+        {key: _iso(value) for key, value in invoice.items()}
+        for invoice in stats['recent_invoices']
+    ]
+    return jsonify(stats)
+
+
+@bp.route('/reports/revenue')
+@login_required
+@conditional('invoices')
+def revenue():
+    """Báo cáo doanh thu (đọc từ monthly_snapshots). Query: year, month"""
+    year = request.args.get('year', datetime.now().year, type=int)
+    month = request.args.get('month', type=int)
+    return jsonify(ReportService.get_revenue_report(year, month))
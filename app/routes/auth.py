@@ -4,6 +4,7 @@ from urllib.parse import urlparse
 from app import db
 from app.models import User
 from app.forms import LoginForm, RegisterForm
+from app.security import rate_limit
 
 # Tạo Blueprint
 bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -12,6 +13,7 @@ bp = Blueprint('auth', __name__, url_prefix='/auth')
 # ROUTE: ĐĂNG NHẬP
 # ============================================
 @bp.route('/login', methods=['GET', 'POST'])
+@rate_limit(limit=5, per=60, methods=('POST',))  # Chống dò mật khẩu: 5 lần/phút/IP
 def login():
     """
     Xử lý đăng nhập
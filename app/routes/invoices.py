@@ -15,16 +15,26 @@ Routes:
     - create_bulk_invoices: Tạo hóa đơn hàng loạt
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+import io
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, abort,
+                   Response, current_app, send_file, stream_with_context)
 from flask_login import login_required, current_user
 from app import db
 from app.models import Invoice, Room, Payment, Service
 from datetime import datetime, timedelta
-from sqlalchemy import and_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import contains_eager
 from app.decorators import manager_or_admin, admin_required
+from app.services import InvoiceService, MeterReadingService, ExportService, InvoicePdfService, PaymentService
+from app.services.payment_service import PAYMENT_METHODS
+from app.utils.money import to_dong
+from app.utils.pagination import keyset_paginate
 
 bp = Blueprint('invoices', __name__, url_prefix='/invoices')
 
+# Danh sách hóa đơn: đếm tối đa bấy nhiêu dòng (hiển thị "1000+" khi nhiều hơn)
+INVOICE_COUNT_LIMIT = 1000
+
 
 # ============================================
 # HELPER FUNCTIONS
@@ -61,32 +71,26 @@ def list_invoices():
     Hiển thị danh sách hóa đơn với tìm kiếm & lọc
     """
     # Lấy tham số từ URL
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     status = request.args.get('status', '')
     month = request.args.get('month', type=int)
     year = request.args.get('year', type=int)
     room_number = request.args.get('room_number', '').strip()
     
-    # Query cơ bản
-    query = Invoice.query.join(Room)
-    
-    # Lọc theo trạng thái
-    if status:
-        query = query.filter(Invoice.status == status)
-    
-    # Lọc theo tháng/năm
-    if month and year:
-        query = query.filter(and_(Invoice.month == month, Invoice.year == year))
-    elif year:
-        query = query.filter(Invoice.year == year)
+    # Query cơ bản (nạp sẵn phòng + khách hiện tại cho cả trang)
+    query = Invoice.query.join(Room).options(
+        contains_eager(Invoice.room).selectinload(Room.active_tenants)
+    )
     
-    # Tìm kiếm theo số phòng
-    if room_number:
-        query = query.filter(Room.room_number.contains(room_number))
+    # Lọc theo trạng thái, tháng/năm, số phòng
+    query = InvoiceService.filter_list(query, status, month, year, room_number)
     
-    # Sắp xếp: Mới nhất trước
-    invoices = query.order_by(Invoice.year.desc(), Invoice.month.desc()).paginate(
-        page=page, per_page=15, error_out=False
+    # Sắp xếp: Mới nhất trước (keyset theo year, month, id - index ix_invoices_year_month).
+    # Chỉ đếm ở trang đầu, tối đa INVOICE_COUNT_LIMIT hóa đơn
+    invoices = keyset_paginate(
+        query, [Invoice.year.desc(), Invoice.month.desc(), Invoice.id.desc()],
+        cursor=cursor, per_page=15,
+        with_count=True, count_limit=INVOICE_COUNT_LIMIT
     )
     
     return render_template('invoices/list.html', 
@@ -97,6 +101,80 @@ def list_invoices():
                          room_number=room_number)
 
 
+# ============================================
+# 1b. XUẤT EXCEL / CSV / PDF
+# ============================================
+def _export_filters():
+    """Đọc bộ lọc giống trang danh sách hóa đơn"""
+    return dict(
+        status=request.args.get('status', ''),
+        month=request.args.get('month', type=int),
+        year=request.args.get('year', type=int),
+        room_number=request.args.get('room_number', '').strip()
+    )
+
+
+def _export_response(fmt, name, headers, rows):
+    """
+    Trả file xuất dạng streaming
+    
+    - csv: stream từng khối text trong lúc đọc database
+    - xlsx: ghi write-only workbook ra file tạm rồi gửi file theo từng khối
+    """
+    filename = f'{name}_{datetime.now():%Y%m%d_%H%M}.{fmt}'
+    
+    if fmt == 'csv':
+        return Response(
+            stream_with_context(ExportService.iter_csv(headers, rows)),
+            mimetype='text/csv; charset=utf-8',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    
+    fileobj = ExportService.write_xlsx([(name, headers, rows)])
+    return send_file(
+        fileobj,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        as_attachment=True,
+        download_name=filename
+    )
+
+
+@bp.route('/export.<any(xlsx, csv):fmt>')
+@login_required
+def export_invoices(fmt):
+    """
+    Xuất danh sách hóa đơn (cùng bộ lọc với trang danh sách)
+    Bộ nhớ không tăng theo số dòng (đọc theo lô bằng yield_per)
+    """
+    rows = ExportService.invoice_rows(**_export_filters())
+    return _export_response(fmt, 'hoa_don', ExportService.INVOICE_HEADERS, rows)
+
+
+@bp.route('/payments/export.<any(xlsx, csv):fmt>')
+@login_required
+def export_payments(fmt):
+    """
+    Xuất các lần thanh toán của những hóa đơn thỏa bộ lọc
+    """
+    rows = ExportService.payment_rows(**_export_filters())
+    return _export_response(fmt, 'thanh_toan', ExportService.PAYMENT_HEADERS, rows)
+
+
+@bp.route('/<int:id>/pdf')
+@login_required
+def invoice_pdf(id):
+    """
+    Tải hóa đơn dạng PDF (in cả tháng: flask render-invoices)
+    """
+    rendered = InvoicePdfService.render(id)
+    if rendered is None:
+        abort(404)
+    
+    filename, content = rendered
+    return send_file(io.BytesIO(content), mimetype='application/pdf',
+                     as_attachment=True, download_name=filename)
+
+
 # ============================================
 # 2. TẠO HÓA ĐƠN MỚI (ĐƠN LẺ)
 # ============================================
@@ -114,18 +192,24 @@ def create_invoice():
         month = request.form.get('month', type=int)
         year = request.form.get('year', type=int)
         
+        # Số cũ bỏ trống → lấy số mới của hóa đơn gần nhất trước tháng này
+        electric_old = request.form.get('electric_old', type=float)
+        water_old = request.form.get('water_old', type=float)
+        if electric_old is None or water_old is None:
+            prev_electric, prev_water = MeterReadingService.get_previous_reading(room_id, month, year)
+            electric_old = prev_electric if electric_old is None else electric_old
+            water_old = prev_water if water_old is None else water_old
+        
         # Chỉ số điện
-        electric_old = request.form.get('electric_old', 0, type=float)
         electric_new = request.form.get('electric_new', 0, type=float)
-        electric_unit_price = request.form.get('electric_unit_price', 3500, type=float)
+        electric_unit_price = request.form.get('electric_unit_price', 3500, type=to_dong)
         
         # Chỉ số nước
-        water_old = request.form.get('water_old', 0, type=float)
         water_new = request.form.get('water_new', 0, type=float)
-        water_unit_price = request.form.get('water_unit_price', 20000, type=float)
+        water_unit_price = request.form.get('water_unit_price', 20000, type=to_dong)
         
         # Phí khác
-        other_fees = request.form.get('other_fees', 0, type=float)
+        other_fees = request.form.get('other_fees', 0, type=to_dong)
         
         notes = request.form.get('notes', '').strip()
         
@@ -173,7 +257,9 @@ def create_invoice():
     
     # GET: Hiển thị form
     # Chỉ lấy phòng đang cho thuê
-    rooms = Room.query.filter_by(status='occupied').order_by(Room.room_number).all()
+    rooms = Room.query.filter_by(status='occupied').options(
+        Room.current_tenant_loader()
+    ).order_by(Room.room_number).all()
     
     # Lấy dịch vụ để hiển thị đơn giá tham khảo
     services = Service.query.filter_by(is_active=True).all()
@@ -181,9 +267,15 @@ def create_invoice():
     # Lấy tháng hiện tại
     now = datetime.now()
     
+    # Chỉ số tháng trước của các phòng → điền sẵn số cũ (1 query)
+    previous_readings = MeterReadingService.get_latest_readings(
+        now.month, now.year, [room.id for room in rooms]
+    )
+    
     return render_template('invoices/create.html',
                          rooms=rooms,
                          services=services,
+                         previous_readings=previous_readings,
                          current_month=now.month,
                          current_year=now.year)
 
@@ -226,8 +318,8 @@ def edit_invoice(id):
     
     LƯU Ý QUAN TRỌNG:
     - Chỉ cho phép sửa hóa đơn chưa thanh toán đủ
-    - Sửa số điện/nước sẽ ảnh hưởng đến tháng sau (số cũ tháng sau)
-    - Cần cảnh báo người dùng về ảnh hưởng này
+    - Sửa số điện/nước mới sẽ tự cập nhật số cũ của hóa đơn tháng sau
+      (trong cùng transaction, trừ khi hóa đơn tháng sau đã thanh toán đủ)
     """
     invoice = Invoice.query.get_or_404(id)
     
@@ -244,13 +336,13 @@ def edit_invoice(id):
         # Cập nhật thông tin
         invoice.electric_old = request.form.get('electric_old', 0, type=float)
         invoice.electric_new = request.form.get('electric_new', 0, type=float)
-        invoice.electric_unit_price = request.form.get('electric_unit_price', 3500, type=float)
+        invoice.electric_unit_price = request.form.get('electric_unit_price', 3500, type=to_dong)
         
         invoice.water_old = request.form.get('water_old', 0, type=float)
         invoice.water_new = request.form.get('water_new', 0, type=float)
-        invoice.water_unit_price = request.form.get('water_unit_price', 20000, type=float)
+        invoice.water_unit_price = request.form.get('water_unit_price', 20000, type=to_dong)
         
-        invoice.other_fees = request.form.get('other_fees', 0, type=float)
+        invoice.other_fees = request.form.get('other_fees', 0, type=to_dong)
         invoice.notes = request.form.get('notes', '').strip()
         
         # Validation
@@ -262,47 +354,35 @@ def edit_invoice(id):
             flash(error_msg, 'danger')
             return redirect(url_for('invoices.edit_invoice', id=invoice.id))
         
-        # ✅ CẢNH BÁO: Kiểm tra xem có thay đổi số điện/nước mới không
-        warnings = []
-        if invoice.electric_new != old_electric_new:
-            warnings.append(f'Số điện mới đã thay đổi từ {old_electric_new} → {invoice.electric_new}')
-        if invoice.water_new != old_water_new:
-            warnings.append(f'Số nước mới đã thay đổi từ {old_water_new} → {invoice.water_new}')
-        
-        # Kiểm tra xem có hóa đơn tháng sau không
-        next_month = invoice.month + 1 if invoice.month < 12 else 1
-        next_year = invoice.year if invoice.month < 12 else invoice.year + 1
-        next_invoice = Invoice.query.filter_by(
-            room_id=invoice.room_id,
-            month=next_month,
-            year=next_year
-        ).first()
-        
-        if warnings and next_invoice:
-            warning_msg = '⚠️ <strong>Cảnh báo:</strong> ' + ', '.join(warnings)
-            warning_msg += f'<br>Bạn cần kiểm tra và sửa lại <a href="{url_for("invoices.edit_invoice", id=next_invoice.id)}" class="alert-link">hóa đơn tháng {next_month}/{next_year}</a> (số cũ phải = {invoice.electric_new} điện, {invoice.water_new} nước)'
-            flash(warning_msg, 'warning')
-        
         # Tính lại tổng tiền
         invoice.calculate_total()
         
         # Cập nhật trạng thái
         invoice.update_status()
         
+        # ✅ Số mới thay đổi → cập nhật số cũ của hóa đơn tháng sau (cùng transaction)
+        if invoice.electric_new != old_electric_new or invoice.water_new != old_water_new:
+            next_invoice, cascaded = MeterReadingService.cascade_to_next(invoice)
+            next_link = f'<a href="{url_for("invoices.edit_invoice", id=next_invoice.id)}" class="alert-link">' \
+                        f'hóa đơn tháng {next_invoice.month}/{next_invoice.year}</a>' if next_invoice else ''
+            
+            if cascaded:
+                flash(f'ℹ️ Đã cập nhật số cũ của {next_link} '
+                      f'({invoice.electric_new} điện, {invoice.water_new} nước).', 'info')
+            elif next_invoice and not MeterReadingService.is_synced(invoice, next_invoice):
+                reason = 'đã thanh toán đủ' if next_invoice.status == 'paid' else 'có số mới nhỏ hơn số cũ mới'
+                flash(f'⚠️ <strong>Cảnh báo:</strong> {next_link} {reason} nên không tự cập nhật số cũ. '
+                      f'Vui lòng liên hệ Admin (số cũ phải = {invoice.electric_new} điện, {invoice.water_new} nước).',
+                      'warning')
+        
         db.session.commit()
         
         flash('✅ Đã cập nhật hóa đơn!', 'success')
         return redirect(url_for('invoices.view_invoice', id=invoice.id))
     
     # GET: Hiển thị form
-    # Kiểm tra xem có hóa đơn tháng sau không
-    next_month = invoice.month + 1 if invoice.month < 12 else 1
-    next_year = invoice.year if invoice.month < 12 else invoice.year + 1
-    next_invoice = Invoice.query.filter_by(
-        room_id=invoice.room_id,
-        month=next_month,
-        year=next_year
-    ).first()
+    # Kiểm tra xem có hóa đơn tháng sau không (số cũ của nó sẽ được cập nhật theo)
+    next_invoice = MeterReadingService.get_next_invoice(invoice)
     
     return render_template('invoices/edit.html', invoice=invoice, next_invoice=next_invoice)
 
@@ -332,7 +412,7 @@ def payment_invoice(id):
         return redirect(url_for('invoices.view_invoice', id=invoice.id))
     
     if request.method == 'POST':
-        amount = request.form.get('amount', 0, type=float)
+        amount = request.form.get('amount', 0, type=to_dong)
         payment_method = request.form.get('payment_method', 'cash')
         payment_date_str = request.form.get('payment_date')
         notes = request.form.get('notes', '').strip()
@@ -342,20 +422,8 @@ def payment_invoice(id):
             flash('❌ Số tiền thanh toán phải lớn hơn 0!', 'danger')
             return redirect(url_for('invoices.payment_invoice', id=invoice.id))
         
-        # ✅ VALIDATION 3: Số tiền không được vượt quá số tiền còn nợ
-        remaining = invoice.remaining_amount
-        if amount > remaining:
-            flash(f'❌ Số tiền thanh toán ({amount:,.0f}đ) lớn hơn số tiền còn nợ ({remaining:,.0f}đ)! '
-                  f'Vui lòng nhập số tiền không vượt quá {remaining:,.0f}đ.', 'danger')
-            return redirect(url_for('invoices.payment_invoice', id=invoice.id))
-        
-        # ⚠️ CẢNH BÁO: Số tiền gần bằng số tiền còn nợ (trong phạm vi 1000đ)
-        if remaining - amount <= 1000 and remaining - amount > 0:
-            flash(f'⚠️ Lưu ý: Sau khi thanh toán sẽ còn dư {remaining - amount:,.0f}đ', 'warning')
-        
-        # ✅ VALIDATION 4: Phương thức thanh toán hợp lệ
-        valid_methods = ['cash', 'bank_transfer']
-        if payment_method not in valid_methods:
+        # ✅ VALIDATION 3: Phương thức thanh toán hợp lệ
+        if payment_method not in PAYMENT_METHODS:
             flash('❌ Phương thức thanh toán không hợp lệ!', 'danger')
             return redirect(url_for('invoices.payment_invoice', id=invoice.id))
         
@@ -365,40 +433,87 @@ def payment_invoice(id):
         except:
             payment_date = datetime.now()
         
-        # Kiểm tra xem thanh toán này có hoàn tất hóa đơn không
-        will_be_fully_paid = (invoice.paid_amount + amount) >= invoice.total_amount
-        
-        # Tạo payment mới
-        payment = Payment(
-            invoice_id=invoice.id,
-            amount=amount,
-            payment_method=payment_method,
-            payment_date=payment_date,
-            notes=notes
-        )
-        
-        db.session.add(payment)
-        
-        # Cập nhật trạng thái hóa đơn
-        invoice.update_status()
-        
-        db.session.commit()
+        # ✅ VALIDATION 4: Không vượt quá số tiền còn nợ - kiểm tra trong transaction
+        # giữ lock hóa đơn (2 người thu cùng lúc không thể cùng vượt qua)
+        try:
+            payment, attempts = PaymentService.record_payment(
+                invoice.id, amount,
+                payment_method=payment_method,
+                payment_date=payment_date,
+                notes=notes
+            )
+        except ValueError as e:
+            flash(f'❌ {e}', 'danger')
+            return redirect(url_for('invoices.payment_invoice', id=invoice.id))
+        except OperationalError:
+            current_app.logger.warning('Thanh toán hóa đơn %s: vẫn tranh chấp lock sau nhiều lần thử', invoice.id)
+            flash('❌ Hệ thống đang bận, chưa ghi nhận thanh toán. Vui lòng thử lại!', 'danger')
+            response = redirect(url_for('invoices.payment_invoice', id=invoice.id))
+            response.headers['Retry-After'] = '1'
+            return response
+        
+        invoice = payment.invoice
+        remaining = invoice.remaining_amount
         
         # Flash message với thông tin chi tiết
-        if will_be_fully_paid:
+        if invoice.status == 'paid':
             flash(f'✅ Đã ghi nhận thanh toán {amount:,.0f}đ! '
                   f'Hóa đơn đã được thanh toán đầy đủ.', 'success')
         else:
-            new_remaining = invoice.remaining_amount
             flash(f'✅ Đã ghi nhận thanh toán {amount:,.0f}đ! '
-                  f'Còn nợ: {new_remaining:,.0f}đ', 'success')
+                  f'Còn nợ: {remaining:,.0f}đ', 'success')
+            # ⚠️ CẢNH BÁO: Còn nợ rất ít (trong phạm vi 1000đ)
+            if remaining <= 1000:
+                flash(f'⚠️ Lưu ý: Sau khi thanh toán sẽ còn dư {remaining:,.0f}đ', 'warning')
         
-        return redirect(url_for('invoices.view_invoice', id=invoice.id))
+        response = redirect(url_for('invoices.view_invoice', id=invoice.id))
+        # Số lần thử khi tranh chấp lock (load test: python -m benchmarks payments)
+        response.headers['X-Payment-Attempts'] = str(attempts)
+        return response
     
     # GET: Hiển thị form
     return render_template('invoices/payment.html', invoice=invoice, now=datetime.now())
 
 
+# ============================================
+# 5b. SỬA THANH TOÁN (PAYMENT)
+# ============================================
+@bp.route('/payment/<int:payment_id>/edit', methods=['POST'])
+@login_required
+@manager_or_admin
+def edit_payment(payment_id):
+    """
+    Sửa số tiền / phương thức / ghi chú của một lần thanh toán (nếu nhập sai)
+    Sau khi sửa sẽ tự động cập nhật lại tổng đã thu và trạng thái hóa đơn
+    """
+    payment = Payment.query.get_or_404(payment_id)
+    invoice_id = payment.invoice_id
+    notes = request.form.get('notes')
+    
+    # Sửa payment + cộng phần chênh lệch vào paid_amount (cùng transaction, giữ lock hóa đơn)
+    try:
+        payment, attempts = PaymentService.change_payment(
+            payment_id,
+            amount=request.form.get('amount', 0, type=to_dong),
+            payment_method=request.form.get('payment_method') or None,
+            notes=notes.strip() if notes is not None else None
+        )
+    except ValueError as e:
+        flash(f'❌ {e}', 'danger')
+        return redirect(url_for('invoices.view_invoice', id=invoice_id))
+    except OperationalError:
+        current_app.logger.warning('Sửa thanh toán %s: vẫn tranh chấp lock sau nhiều lần thử', payment_id)
+        flash('❌ Hệ thống đang bận, chưa sửa thanh toán. Vui lòng thử lại!', 'danger')
+        response = redirect(url_for('invoices.view_invoice', id=invoice_id))
+        response.headers['Retry-After'] = '1'
+        return response
+    
+    flash(f'✅ Đã sửa thanh toán thành {payment.amount:,.0f}đ! Trạng thái hóa đơn đã được cập nhật.', 'success')
+    response = redirect(url_for('invoices.view_invoice', id=invoice_id))
+    response.headers['X-Payment-Attempts'] = str(attempts)
+    return response
+
+
 # ============================================
 # 6. XÓA THANH TOÁN (PAYMENT)
 # ============================================
@@ -410,18 +525,14 @@ def delete_payment(payment_id):
     Xóa một lần thanh toán (nếu nhập sai)
     Sau khi xóa sẽ tự động cập nhật lại trạng thái hóa đơn
     """
-    payment = Payment.query.get_or_404(payment_id)
-    invoice = payment.invoice
-    invoice_id = invoice.id
-    amount = payment.amount
-    
-    # Xóa payment
-    db.session.delete(payment)
-    
-    # Cập nhật lại trạng thái hóa đơn
-    invoice.update_status()
+    Payment.query.get_or_404(payment_id)
     
-    db.session.commit()
+    # Xóa payment + trừ paid_amount, cập nhật trạng thái (cùng transaction, giữ lock hóa đơn)
+    try:
+        invoice_id, amount = PaymentService.delete_payment(payment_id)
+    except ValueError as e:
+        flash(f'❌ {e}', 'danger')
+        return redirect(url_for('invoices.list_invoices'))
     
     flash(f'✅ Đã xóa thanh toán {amount:,.0f}đ! Trạng thái hóa đơn đã được cập nhật.', 'success')
     return redirect(url_for('invoices.view_invoice', id=invoice_id))
@@ -470,71 +581,36 @@ def create_bulk_invoices():
         month = request.form.get('month', type=int)
         year = request.form.get('year', type=int)
         
-        # Lấy đơn giá
-        electric_unit_price = request.form.get('electric_unit_price', 3500, type=float)
-        water_unit_price = request.form.get('water_unit_price', 20000, type=float)
-        other_fees = request.form.get('other_fees', 0, type=float)
-        
-        # Lấy tất cả phòng đang cho thuê
-        occupied_rooms = Room.query.filter_by(status='occupied').all()
-        
-        created_count = 0
-        skipped_count = 0
-        
-        for room in occupied_rooms:
-            # Kiểm tra đã tồn tại chưa
-            existing = Invoice.query.filter_by(room_id=room.id, month=month, year=year).first()
-            if existing:
-                skipped_count += 1
-                continue
-            
-            # Tạo hóa đơn mới
-            invoice = Invoice(
-                room_id=room.id,
-                month=month,
-                year=year,
-                room_price=room.price,
-                electric_old=0,
-                electric_new=0,
-                electric_unit_price=electric_unit_price,
-                water_old=0,
-                water_new=0,
-                water_unit_price=water_unit_price,
-                other_fees=other_fees,
-                created_by=current_user.id,
-                due_date=datetime.now() + timedelta(days=7)
-            )
-            
-            invoice.calculate_total()
-            db.session.add(invoice)
-            created_count += 1
-        
-        db.session.commit()
+        # Tạo hóa đơn theo lô cho tất cả phòng đang cho thuê chưa có hóa đơn
+        created_count, skipped_count = InvoiceService.create_bulk_invoices(
+            month, year,
+            due_date=datetime.now() + timedelta(days=7),
+            created_by=current_user.id,
+            electric_unit_price=request.form.get('electric_unit_price', 3500, type=to_dong),
+            water_unit_price=request.form.get('water_unit_price', 20000, type=to_dong),
+            other_fees=request.form.get('other_fees', 0, type=to_dong)
+        )
         
         flash(f'✅ Đã tạo {created_count} hóa đơn, bỏ qua {skipped_count} hóa đơn đã tồn tại!', 'success')
         return redirect(url_for('invoices.list_invoices'))
     
     # GET: Hiển thị form
     now = datetime.now()
-    occupied_rooms = Room.query.filter_by(status='occupied').order_by(Room.room_number).all()
+    occupied_rooms = Room.query.filter_by(status='occupied').options(
+        Room.current_tenant_loader()
+    ).order_by(Room.room_number).all()
     
     # Lấy tháng hiện tại để kiểm tra
     current_month = now.month
     current_year = now.year
     
-    # Đếm số phòng chưa có hóa đơn trong tháng hiện tại
-    rooms_without_invoice = []
-    for room in occupied_rooms:
-        existing = Invoice.query.filter_by(
-            room_id=room.id, 
-            month=current_month, 
-            year=current_year
-        ).first()
-        if not existing:
-            rooms_without_invoice.append(room)
+    # Phòng chưa có hóa đơn trong tháng hiện tại (1 query anti-join)
+    rooms_without_invoice = InvoiceService.get_rooms_without_invoice(current_month, current_year)
+    pending_room_ids = {room.id for room in rooms_without_invoice}
     
     return render_template('invoices/create_bulk.html',
                          rooms=occupied_rooms,
                          rooms_without_invoice=rooms_without_invoice,
+                         pending_room_ids=pending_room_ids,
                          current_month=current_month,
                          current_year=current_year)
@@ -1,9 +1,10 @@
 from flask import Blueprint, render_template, request
 from flask_login import login_required
 from app import db
-from app.models import Invoice, Room, Tenant, Payment
+from app.models import Room, Tenant
 from app.services.payment_service import PaymentService
-from sqlalchemy import func, extract
+from app.services.snapshot_service import SnapshotService
+from sqlalchemy import func
 from datetime import datetime
 
 bp = Blueprint('reports', __name__, url_prefix='/reports')
@@ -22,24 +23,13 @@ def revenue():
     """Revenue report"""
     year = request.args.get('year', datetime.now().year, type=int)
     
-    # Monthly revenue
-    monthly_data = db.session.query(
-        Invoice.month,
-        func.sum(Invoice.total_amount).label('total'),
-        func.count(Invoice.id).label('count')
-    ).filter(
-        Invoice.year == year,
-        Invoice.status == 'paid'
-    ).group_by(Invoice.month).all()
+    # Monthly revenue (read from monthly_snapshots, not recomputed from invoices)
+    snapshots = SnapshotService.get_year(year)
     
     # Prepare data for chart
     months = list(range(1, 13))
-    revenue_data = {m: 0 for m in months}
-    invoice_count = {m: 0 for m in months}
-    
-    for month, total, count in monthly_data:
-        revenue_data[month] = float(total)
-        invoice_count[month] = count
+    revenue_data = {m: snapshots[m].paid_revenue if snapshots[m] else 0 for m in months}
+    invoice_count = {m: snapshots[m].invoices_paid if snapshots[m] else 0 for m in months}
     
     total_revenue = sum(revenue_data.values())
     total_invoices = sum(invoice_count.values())
@@ -56,14 +46,14 @@ def revenue():
 @login_required
 def occupancy():
     """Room occupancy report"""
-    total_rooms = Room.query.count()
-    occupied_rooms = Room.query.filter_by(status='occupied').count()
-    available_rooms = Room.query.filter_by(status='available').count()
-    maintenance_rooms = Room.query.filter_by(status='maintenance').count()
-    
-    occupancy_rate = (occupied_rooms / total_rooms * 100) if total_rooms > 0 else 0
+    snapshot = SnapshotService.get_current()
+    total_rooms = snapshot.total_rooms
+    occupied_rooms = snapshot.occupied_rooms
+    available_rooms = snapshot.available_rooms
+    maintenance_rooms = snapshot.maintenance_rooms
+    occupancy_rate = snapshot.occupancy_rate
     
-    # Rooms by floor
+    # Rooms by floor (room inventory, not a monthly figure)
     rooms_by_floor = db.session.query(
         Room.floor,
         func.count(Room.id).label('count')
@@ -82,9 +72,10 @@ def occupancy():
 @login_required
 def tenants():
     """Tenant statistics"""
-    total_tenants = Tenant.query.count()
-    active_tenants = Tenant.query.filter_by(status='active').count()
-    moved_out_tenants = Tenant.query.filter_by(status='moved_out').count()
+    snapshot = SnapshotService.get_current()
+    total_tenants = snapshot.total_tenants
+    active_tenants = snapshot.active_tenants
+    moved_out_tenants = snapshot.moved_out_tenants
     
     # Recent move-ins
     recent_move_ins = Tenant.query.filter_by(status='active').order_by(
@@ -108,8 +99,14 @@ def overdue():
     month = request.args.get('month', type=int)
     year = request.args.get('year', datetime.now().year, type=int)
     
+    # Trang chi tiết của từng nhóm công nợ (?critical_page=2...)
+    pages = {
+        bucket: request.args.get(f'{bucket}_page', 1, type=int)
+        for bucket in ('critical', 'danger', 'warning', 'partial')
+    }
+    
     # Lấy báo cáo công nợ từ PaymentService
-    debt_report = PaymentService.get_debt_report(month=month, year=year)
+    debt_report = PaymentService.get_debt_report(month=month, year=year, pages=pages)
     
     # Lấy tổng hợp thu tiền
     collection_summary = PaymentService.get_collection_summary(month=month, year=year)
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required
 from app import db
 from app.models import Room, Tenant
+from app.services.search_service import SearchService
 from app.forms import RoomForm
 from app.decorators import manager_or_admin, admin_required
 
@@ -21,20 +22,18 @@ def list_rooms():
     # Lấy tham số tìm kiếm từ URL (?search=P101)
     search = request.args.get('search', '')
     status_filter = request.args.get('status', '')
+    page = request.args.get('page', 1, type=int)
     
-    # Query cơ bản
-    query = Room.query
-    
-    # Tìm kiếm theo số phòng
-    if search:
-        query = query.filter(Room.room_number.like(f'%{search}%'))
+    # Query cơ bản (nạp sẵn khách hiện tại cho tất cả phòng trong 1 query)
+    query = Room.query.options(Room.current_tenant_loader())
     
     # Lọc theo trạng thái
     if status_filter:
         query = query.filter(Room.status == status_filter)
     
-    # Sắp xếp theo số phòng
-    rooms = query.order_by(Room.room_number).all()
+    # Tìm kiếm theo số phòng, mô tả (full-text, không dấu), sắp xếp theo độ khớp rồi số phòng
+    query = SearchService.apply(query, 'rooms', search, Room.room_number)
+    rooms = query.paginate(page=page, per_page=20, error_out=False)
     
     return render_template('rooms/list.html', 
                          rooms=rooms, 
@@ -18,6 +18,7 @@ from flask_login import login_required, current_user
 from app import db
 from app.models import Service
 from app.decorators import admin_required
+from app.utils.money import to_dong
 
 bp = Blueprint('services', __name__, url_prefix='/services')
 
@@ -50,7 +51,7 @@ def create_service():
     if request.method == 'POST':
         name = request.form.get('name', '').strip()
         unit = request.form.get('unit', '').strip()
-        price = request.form.get('price', 0, type=float)
+        price = request.form.get('price', 0, type=to_dong)
         description = request.form.get('description', '').strip()
         is_active = request.form.get('is_active') == 'on'
         
@@ -103,7 +104,7 @@ def edit_service(id):
     if request.method == 'POST':
         name = request.form.get('name', '').strip()
         unit = request.form.get('unit', '').strip()
-        price = request.form.get('price', 0, type=float)
+        price = request.form.get('price', 0, type=to_dong)
         description = request.form.get('description', '').strip()
         is_active = request.form.get('is_active') == 'on'
         
@@ -2,6 +2,9 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required
 from app import db
 from app.models import Tenant, Room
+from app.services.search_service import SearchService
+from app.utils.pagination import keyset_paginate
+from sqlalchemy.orm import joinedload
 from app.forms import TenantForm
 from datetime import datetime
 from app.decorators import manager_or_admin, admin_required
@@ -36,32 +39,31 @@ def list_tenants():
     # Lấy tham số tìm kiếm
     search = request.args.get('search', '')
     status_filter = request.args.get('status', '')
+    cursor = request.args.get('cursor')
     
-    # Query cơ bản
-    query = Tenant.query
+    # Tìm kiếm theo tên, CCCD, SĐT (full-text, không dấu: "nguyen" khớp "Nguyễn")
+    query, rank = SearchService.filter(Tenant.query, 'tenants', search)
     
-    # Tìm kiếm theo tên, CCCD, SĐT
-    if search:
-        query = query.filter(
-            db.or_(
-                Tenant.full_name.like(f'%{search}%'),
-                Tenant.id_number.like(f'%{search}%'),
-                Tenant.phone.like(f'%{search}%')
-            )
-        )
+    # Thống kê theo trạng thái trên toàn bộ kết quả tìm kiếm (không chỉ trang hiện tại)
+    status_counts = dict(
+        query.with_entities(Tenant.status, db.func.count(Tenant.id))
+        .group_by(Tenant.status).all()
+    )
     
     # Lọc theo trạng thái
     if status_filter:
         query = query.filter(Tenant.status == status_filter)
     
-    # Sắp xếp: Khách đang ở lên đầu
-    tenants = query.order_by(
-        Tenant.status.desc(),  # active trước inactive
-        Tenant.full_name
-    ).all()
+    # Keyset pagination: độ khớp (khi tìm kiếm), khách đang ở trước, theo tên
+    order_by = [Tenant.status, Tenant.full_name, Tenant.id]
+    if rank is not None:
+        order_by.insert(0, rank)
+    tenants = keyset_paginate(query.options(joinedload(Tenant.room)), order_by,
+                              cursor=cursor, per_page=20)
     
     return render_template('tenants/list.html', 
                          tenants=tenants, 
+                         status_counts=status_counts,
                          search=search,
                          status_filter=status_filter)
 
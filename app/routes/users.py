@@ -1,12 +1,13 @@
 """
 User Management Routes - Chỉ Admin
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required
 from app import db
-from app.models import User
+from app.models import User, user_cache
 from app.forms import RegisterForm
 from app.decorators import admin_required
+from app.utils.pagination import keyset_paginate
 
 bp = Blueprint('users', __name__, url_prefix='/users')
 
@@ -16,7 +17,7 @@ bp = Blueprint('users', __name__, url_prefix='/users')
 @admin_required
 def list_users():
     """Danh sách nhân viên"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     role_filter = request.args.get('role', 'all')
     
     # Query users
@@ -25,9 +26,8 @@ def list_users():
     if role_filter != 'all':
         query = query.filter_by(role=role_filter)
     
-    users = query.order_by(User.created_at.desc()).paginate(
-        page=page, per_page=10, error_out=False
-    )
+    users = keyset_paginate(query, [User.created_at.desc(), User.id.desc()],
+                            cursor=cursor, per_page=10, with_count=True)
     
     return render_template('users/list.html', 
                          users=users,
@@ -88,6 +88,7 @@ def edit_user(id):
             user.set_password(form.password.data)
         
         db.session.commit()
+        user_cache.invalidate(user.id)  # Đổi role/mật khẩu có hiệu lực ngay
         flash(f'Đã cập nhật thông tin {user.username}!', 'success')
         return redirect(url_for('users.list_users'))
     
@@ -113,8 +114,10 @@ def delete_user(id):
         return redirect(url_for('users.list_users'))
     
     username = user.username
+    user_id = user.id
     db.session.delete(user)
     db.session.commit()
+    user_cache.invalidate(user_id)
     
     flash(f'Đã xóa tài khoản {username}!', 'success')
     return redirect(url_for('users.list_users'))
@@ -131,6 +134,20 @@ def reset_password(id):
     default_password = "123456"
     user.set_password(default_password)
     db.session.commit()
+    user_cache.invalidate(user.id)
     
     flash(f'Đã reset mật khẩu của {user.username} về: {default_password}', 'warning')
     return redirect(url_for('users.list_users'))
+
+
+@bp.route('/cache-stats')
+@login_required
+@admin_required
+def cache_stats():
+    """Thống kê cache của process đang xử lý request (hit/miss)"""
+    from app.services import DashboardStats
+    
+    return jsonify({
+        'user_cache': user_cache.stats(),
+        'dashboard_cache': DashboardStats.cache_stats()
+    })
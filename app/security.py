@@ -1,47 +1,203 @@
 """
 Security enhancements for RoomMaster
 """
+from collections import OrderedDict
 from functools import wraps
-from flask import request, abort
-from datetime import datetime, timedelta
+from flask import request, abort, current_app
+from app.utils.assets import uses_local_vendor
 import logging
+import math
+import os
+import sqlite3
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
-# Simple rate limiting (for production, use Flask-Limiter with Redis)
-_rate_limit_storage = {}
+# ============================================
+# RATE LIMITING
+# ============================================
+# Sliding-window counter: each key stores only (window, current, previous),
+# so a hit is O(1) and memory is bounded by the number of keys kept.
+# Estimated requests in the last `per` seconds:
+#     previous * (1 - elapsed / per) + current
 
-def rate_limit(limit=5, per=60):
+
+def _sliding_window(state, limit, per, now):
+    """
+    Apply one hit to a (window, current, previous) state
+    
+    Returns (new_state, allowed, retry_after)
+    """
+    window = int(now // per)
+    stored_window, current, previous = state or (window, 0, 0)
+    
+    if stored_window != window:
+        previous = current if stored_window == window - 1 else 0
+        current = 0
+    
+    elapsed = (now % per) / per
+    estimated = previous * (1 - elapsed) + current
+    
+    if estimated >= limit:
+        return (window, current, previous), False, max(1, math.ceil(per - now % per))
+    
+    return (window, current + 1, previous), True, 0
+
+
+class MemoryRateLimitBackend:
+    """
+    In-process backend: LRU-bounded key table (quiet IPs are evicted first)
+    
+    Counts are per worker process.
+    """
+    
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def hit(self, key, limit, per, now=None):
+        """Record one hit, returns (allowed, retry_after)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            state, allowed, retry_after = _sliding_window(self._states.get(key), limit, per, now)
+            self._states[key] = state
+            self._states.move_to_end(key)
+            if len(self._states) > self.max_keys:
+                self._states.popitem(last=False)
+        return allowed, retry_after
+    
+    def reset(self, key=None):
+        """Forget one key (or everything)"""
+        with self._lock:
+            if key is None:
+                self._states.clear()
+            else:
+                self._states.pop(key, None)
+
+
+class SQLiteRateLimitBackend:
+    """
+    Shared backend on a SQLite file, so all gunicorn workers share counts
+    
+    Each hit is one BEGIN IMMEDIATE transaction on a primary-key row.
+    The table is pruned to max_keys (least recently seen first).
+    """
+    
+    PRUNE_EVERY = 100  # new keys between prune passes
+    
+    def __init__(self, path, max_keys=10000):
+        self.path = path
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._new_keys = 0
+        
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limits ('
+            ' key TEXT PRIMARY KEY, window INTEGER, current INTEGER,'
+            ' previous INTEGER, touched REAL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_rate_limits_touched ON rate_limits (touched)')
+    
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def hit(self, key, limit, per, now=None):
+        """Record one hit, returns (allowed, retry_after)"""
+        now = time.time() if now is None else now
+        conn = self._connect()
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT window, current, previous FROM rate_limits WHERE key = ?', (key,)
+            ).fetchone()
+            state, allowed, retry_after = _sliding_window(row, limit, per, now)
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_limits (key, window, current, previous, touched)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (key, *state, now)
+            )
+            if row is None:
+                self._new_keys += 1
+                if self._new_keys >= self.PRUNE_EVERY:
+                    self._new_keys = 0
+                    self._prune(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        
+        return allowed, retry_after
+    
+    def _prune(self, conn):
+        conn.execute(
+            'DELETE FROM rate_limits WHERE key IN ('
+            ' SELECT key FROM rate_limits ORDER BY touched DESC LIMIT -1 OFFSET ?)',
+            (self.max_keys,)
+        )
+    
+    def reset(self, key=None):
+        """Forget one key (or everything)"""
+        conn = self._connect()
+        if key is None:
+            conn.execute('DELETE FROM rate_limits')
+        else:
+            conn.execute('DELETE FROM rate_limits WHERE key = ?', (key,))
+
+
+def create_rate_limit_backend(storage, max_keys=10000):
     """
-    Simple rate limiting decorator
+    Build a backend from RATE_LIMIT_STORAGE
+    
+    - 'memory'                  : per-process (default)
+    - 'sqlite:///path/to/file'  : shared between worker processes
+    """
+    if storage and storage.startswith('sqlite:///'):
+        return SQLiteRateLimitBackend(storage[len('sqlite:///'):], max_keys=max_keys)
+    return MemoryRateLimitBackend(max_keys=max_keys)
+
+
+def get_rate_limiter():
+    """Backend of the current app (created once, kept in app.extensions)"""
+    backend = current_app.extensions.get('rate_limiter')
+    if backend is None:
+        backend = create_rate_limit_backend(
+            current_app.config.get('RATE_LIMIT_STORAGE', 'memory'),
+            current_app.config.get('RATE_LIMIT_MAX_KEYS', 10000)
+        )
+        current_app.extensions['rate_limiter'] = backend
+    return backend
+
+
+def rate_limit(limit=5, per=60, methods=None):
+    """
+    Rate limiting decorator (per client IP and endpoint)
     Usage: @rate_limit(limit=5, per=60) # 5 requests per 60 seconds
+    
+    methods: only count these HTTP methods (e.g. ('POST',)), None = all
     """
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Get client IP
-            client_ip = request.remote_addr
-            
-            # Get current time
-            now = datetime.utcnow()
-            
-            # Initialize storage for this IP
-            if client_ip not in _rate_limit_storage:
-                _rate_limit_storage[client_ip] = []
-            
-            # Clean old requests
-            _rate_limit_storage[client_ip] = [
-                req_time for req_time in _rate_limit_storage[client_ip]
-                if now - req_time < timedelta(seconds=per)
-            ]
-            
-            # Check limit
-            if len(_rate_limit_storage[client_ip]) >= limit:
-                logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-                abort(429)  # Too Many Requests
-            
-            # Add current request
-            _rate_limit_storage[client_ip].append(now)
+            if methods is None or request.method in methods:
+                client_ip = request.remote_addr
+                key = f'{request.endpoint}:{client_ip}'
+                
+                allowed, retry_after = get_rate_limiter().hit(key, limit, per)
+                if not allowed:
+                    logger.warning(f"Rate limit exceeded for IP: {client_ip} ({request.endpoint})")
+                    abort(429, retry_after=retry_after)  # Too Many Requests
             
             return f(*args, **kwargs)
         return decorated_function
@@ -91,13 +247,26 @@ def add_security_headers(response):
         response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
     
     # Content Security Policy
-    response.headers['Content-Security-Policy'] = \
-        "default-src 'self'; " \
-        "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; " \
-        "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; " \
-        "font-src 'self' https://cdn.jsdelivr.net; " \
-        "img-src 'self' data: https:; " \
-        "connect-src 'self' https://cdn.jsdelivr.net; "
+    # Assets vendored locally (python build_assets.py --vendor): no CDN origins needed
+    if uses_local_vendor():
+        response.headers['Content-Security-Policy'] = \
+            "default-src 'self'; " \
+            "script-src 'self' 'unsafe-inline'; " \
+            "style-src 'self' 'unsafe-inline'; " \
+            "font-src 'self'; " \
+            "img-src 'self' data:; " \
+            "connect-src 'self'; " \
+            "object-src 'none'; " \
+            "base-uri 'self'; " \
+            "form-action 'self'"
+    else:
+        response.headers['Content-Security-Policy'] = \
+            "default-src 'self'; " \
+            "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; " \
+            "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; " \
+            "font-src 'self' https://cdn.jsdelivr.net; " \
+            "img-src 'self' data: https:; " \
+            "connect-src 'self' https://cdn.jsdelivr.net; "
     
     # Referrer Policy
     response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
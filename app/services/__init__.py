@@ -12,11 +12,27 @@ from app.services.tenant_service import TenantService
 from app.services.invoice_service import InvoiceService
 from app.services.payment_service import PaymentService
 from app.services.report_service import ReportService
+from app.services.dashboard_service import DashboardStats
+from app.services.meter_service import MeterReadingService
+from app.services.export_service import ExportService
+from app.services.pdf_service import InvoicePdfService
+from app.services.query_plan_service import QueryPlanService
+from app.services.search_service import SearchService
+from app.services.snapshot_service import SnapshotService
+from app.services.version_service import DataVersionService
 
 __all__ = [
     'RoomService',
     'TenantService', 
     'InvoiceService',
     'PaymentService',
-    'ReportService'
+    'ReportService',
+    'DashboardStats',
+    'MeterReadingService',
+    'ExportService',
+    'InvoicePdfService',
+    'QueryPlanService',
+    'SearchService',
+    'SnapshotService',
+    'DataVersionService'
 ]
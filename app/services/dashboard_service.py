@@ -0,0 +1,103 @@
+"""
+Dashboard Service - Số liệu tổng quan cho trang Dashboard
+"""
+from app import db
+from app.models import Room, Tenant, Invoice, Payment
+from app.utils.cache import TTLCache, invalidate_on_write
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, select
+
+# Cache theo process, key = (năm, tháng). Tự xóa khi có commit ghi vào các bảng liên quan
+_cache = TTLCache(ttl=30, maxsize=16, name='dashboard')
+invalidate_on_write(_cache.clear, Room, Tenant, Invoice, Payment)
+
+
+class DashboardStats:
+    """Service tính (và cache) các số liệu của Dashboard"""
+    
+    @staticmethod
+    def get(now=None):
+        """
+        Lấy số liệu dashboard, ưu tiên đọc từ cache
+        
+        TTL lấy từ config DASHBOARD_CACHE_TTL (giây, 0 = tắt cache).
+        
+        Args:
+            now: Thời điểm tính doanh thu tháng (mặc định datetime.now())
+            
+        Returns:
+            Dictionary chứa các bộ đếm + 5 hóa đơn mới nhất
+        """
+        now = now or datetime.now()
+        ttl = current_app.config.get('DASHBOARD_CACHE_TTL', 30)
+        
+        return _cache.get_or_set(
+            (now.year, now.month),
+            lambda: DashboardStats.compute(now.month, now.year),
+            ttl=ttl
+        )
+    
+    @staticmethod
+    def compute(month, year):
+        """
+        Tính số liệu dashboard trực tiếp từ database (2 câu SQL)
+        
+        Args:
+            month: Tháng tính doanh thu
+            year: Năm tính doanh thu
+            
+        Returns:
+            Dictionary chứa các bộ đếm + 5 hóa đơn mới nhất
+        """
+        unpaid = Invoice.status.in_(['unpaid', 'partial'])
+        
+        # Câu 1: tất cả bộ đếm trong 1 SELECT (mỗi bảng 1 scalar subquery)
+        counters = db.session.execute(select(
+            select(func.count(Room.id)).scalar_subquery().label('total_rooms'),
+            select(func.count(Room.id)).where(Room.status == 'occupied')
+                .scalar_subquery().label('rented_rooms'),
+            select(func.count(Room.id)).where(Room.status == 'available')
+                .scalar_subquery().label('empty_rooms'),
+            select(func.count(Tenant.id)).where(Tenant.status == 'active')
+                .scalar_subquery().label('total_tenants'),
+            select(func.count(Invoice.id)).where(unpaid)
+                .scalar_subquery().label('unpaid_invoices'),
+            select(func.coalesce(func.sum(Invoice.remaining_amount), 0)).where(unpaid)
+                .scalar_subquery().label('total_debt'),
+            # Doanh thu = số tiền thực tế đã thu của các hóa đơn trong tháng
+            select(func.coalesce(func.sum(Invoice.paid_amount), 0))
+                .where(Invoice.month == month, Invoice.year == year)
+                .scalar_subquery().label('monthly_revenue')
+        )).one()
+        
+        # Câu 2: hóa đơn mới nhất (chỉ lấy các cột cần hiển thị để cache được)
+        recent_invoices = [
+            row._asdict() for row in db.session.execute(
+                select(
+                    Invoice.id,
+                    Room.room_number,
+                    Invoice.month,
+                    Invoice.year,
+                    Invoice.total_amount,
+                    Invoice.status,
+                    Invoice.created_at
+                ).join(Room, Invoice.room_id == Room.id)
+                .order_by(Invoice.created_at.desc())
+                .limit(5)
+            )
+        ]
+        
+        stats = counters._asdict()
+        stats['recent_invoices'] = recent_invoices
+        return stats
+    
+    @staticmethod
+    def invalidate():
+        """Xóa cache dashboard"""
+        _cache.clear()
+    
+    @staticmethod
+    def cache_stats():
+        """Thống kê hit/miss của cache dashboard"""
+        return _cache.stats()
@@ -0,0 +1,159 @@
+"""
+Export Service - Xuất hóa đơn/thanh toán ra Excel (.xlsx) và CSV
+
+Dữ liệu được đọc theo lô bằng yield_per (chỉ lấy cột, không tạo ORM object)
+và ghi lần lượt ra file, nên bộ nhớ không tăng theo số dòng:
+- CSV: generator trả từng khối text cho Flask streaming response
+- Excel: openpyxl write-only workbook, ghi vào file tạm trên đĩa rồi gửi dần
+"""
+import csv
+import io
+import tempfile
+
+from openpyxl import Workbook
+
+from app import db
+from app.models import Invoice, Room, Payment
+from app.services.invoice_service import InvoiceService
+from sqlalchemy import select
+
+# Số dòng đọc mỗi lô từ database
+EXPORT_BATCH_SIZE = 1000
+
+STATUS_LABELS = {
+    'unpaid': 'Chưa thanh toán',
+    'partial': 'Thanh toán 1 phần',
+    'paid': 'Đã thanh toán'
+}
+
+PAYMENT_METHOD_LABELS = {
+    'cash': 'Tiền mặt',
+    'bank_transfer': 'Chuyển khoản'
+}
+
+
+class ExportService:
+    """Service xuất dữ liệu hóa đơn/thanh toán"""
+    
+    INVOICE_HEADERS = [
+        'Mã HĐ', 'Phòng', 'Khách thuê', 'Tháng', 'Năm',
+        'Tiền phòng', 'Điện cũ', 'Điện mới', 'Đơn giá điện',
+        'Nước cũ', 'Nước mới', 'Đơn giá nước', 'Phí khác',
+        'Tổng tiền', 'Đã trả', 'Còn nợ', 'Trạng thái',
+        'Hạn thanh toán', 'Ngày tạo'
+    ]
+    
+    PAYMENT_HEADERS = [
+        'Mã TT', 'Mã HĐ', 'Phòng', 'Tháng', 'Năm',
+        'Số tiền', 'Phương thức', 'Ngày thanh toán', 'Ghi chú'
+    ]
+    
+    @staticmethod
+    def _stream(stmt, batch_size=EXPORT_BATCH_SIZE):
+        """Chạy câu lệnh và trả từng dòng, database trả kết quả theo lô"""
+        result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+        try:
+            for row in result:
+                yield row
+        finally:
+            result.close()
+    
+    @staticmethod
+    def invoice_rows(status=None, month=None, year=None, room_number=None):
+        """
+        Các dòng hóa đơn theo bộ lọc, mới nhất trước
+        
+        Returns:
+            Generator các list giá trị, theo thứ tự INVOICE_HEADERS
+        """
+        stmt = select(
+            Invoice.id, Room.room_number, Room.current_tenant_name(), Invoice.month, Invoice.year,
+            Invoice.room_price, Invoice.electric_old, Invoice.electric_new, Invoice.electric_unit_price,
+            Invoice.water_old, Invoice.water_new, Invoice.water_unit_price, Invoice.other_fees,
+            Invoice.total_amount, Invoice.paid_amount, Invoice.remaining_amount, Invoice.status,
+            Invoice.due_date, Invoice.created_at
+        ).join(Room, Invoice.room_id == Room.id)
+        
+        stmt = InvoiceService.filter_list(stmt, status, month, year, room_number)\
+            .order_by(Invoice.year.desc(), Invoice.month.desc(), Invoice.id.desc())
+        
+        for row in ExportService._stream(stmt):
+            row = list(row)
+            row[16] = STATUS_LABELS.get(row[16], row[16])
+            yield row
+    
+    @staticmethod
+    def payment_rows(status=None, month=None, year=None, room_number=None):
+        """
+        Các lần thanh toán của những hóa đơn thỏa bộ lọc
+        
+        Returns:
+            Generator các list giá trị, theo thứ tự PAYMENT_HEADERS
+        """
+        stmt = select(
+            Payment.id, Invoice.id, Room.room_number, Invoice.month, Invoice.year,
+            Payment.amount, Payment.payment_method, Payment.payment_date, Payment.notes
+        ).join(Invoice, Payment.invoice_id == Invoice.id)\
+         .join(Room, Invoice.room_id == Room.id)
+        
+        stmt = InvoiceService.filter_list(stmt, status, month, year, room_number)\
+            .order_by(Payment.payment_date.desc(), Payment.id.desc())
+        
+        for row in ExportService._stream(stmt):
+            row = list(row)
+            row[6] = PAYMENT_METHOD_LABELS.get(row[6], row[6])
+            yield row
+    
+    @staticmethod
+    def iter_csv(headers, rows, flush_every=500):
+        """
+        Sinh nội dung CSV theo từng khối (dùng cho streaming response)
+        
+        Args:
+            headers: Dòng tiêu đề
+            rows: Iterable các dòng dữ liệu
+            flush_every: Số dòng mỗi khối trả về
+        
+        Yields:
+            Chuỗi CSV (khối đầu có BOM để Excel đọc đúng tiếng Việt)
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        buffer.write('\ufeff')
+        writer.writerow(headers)
+        
+        for index, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if index % flush_every == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        
+        yield buffer.getvalue()
+    
+    @staticmethod
+    def write_xlsx(sheets, fileobj=None):
+        """
+        Ghi workbook Excel ở chế độ write-only (không giữ các dòng trong bộ nhớ)
+        
+        Args:
+            sheets: List các tuple (tên sheet, headers, rows)
+            fileobj: File để ghi, mặc định tạo file tạm trên đĩa
+        
+        Returns:
+            File object đã ghi xong, con trỏ ở đầu file
+        """
+        if fileobj is None:
+            fileobj = tempfile.TemporaryFile()
+        
+        workbook = Workbook(write_only=True)
+        for title, headers, rows in sheets:
+            sheet = workbook.create_sheet(title=title)
+            sheet.append(headers)
+            for row in rows:
+                sheet.append(row)
+        
+        workbook.save(fileobj)
+        fileobj.seek(0)
+        return fileobj
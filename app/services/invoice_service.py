@@ -4,7 +4,11 @@ Invoice Service - Business logic cho quản lý hóa đơn
 from app import db
 from app.models import Invoice, Room, Service, Payment
 from datetime import datetime, date
-from sqlalchemy import and_, or_, extract
+from sqlalchemy import and_, or_, extract, exists
+from app.utils.db import insert_ignore
+from app.utils.money import to_dong
+from app.services.meter_service import MeterReadingService
+from app.services.snapshot_service import SnapshotService
 
 
 class InvoiceService:
@@ -76,64 +80,97 @@ class InvoiceService:
             raise e
     
     @staticmethod
-    def create_bulk_invoices(month, year, room_ids, due_date=None):
+    def create_bulk_invoices(month, year, room_ids=None, due_date=None, created_by=None,
+                             electric_unit_price=3500, water_unit_price=20000, other_fees=0):
         """
-        Tạo hàng loạt hóa đơn cho nhiều phòng
+        Tạo hàng loạt hóa đơn cho các phòng đang cho thuê (xử lý theo lô)
+        
+        Pipeline:
+        1. 1 query lấy các phòng đang thuê kèm cờ "đã có hóa đơn" (anti-join EXISTS)
+           + 1 query lấy chỉ số điện/nước tháng trước làm số cũ
+        2. Tính tổng tiền cho tất cả hóa đơn trong 1 vòng lặp (không tạo ORM object)
+        3. 1 câu INSERT nhiều dòng, bỏ qua trùng uq_room_month_year (ON CONFLICT DO NOTHING)
         
         Args:
             month: Tháng
             year: Năm
-            room_ids: List các room_id
+            room_ids: List các room_id (None = tất cả phòng đang cho thuê)
             due_date: Hạn thanh toán
+            created_by: ID người tạo
+            electric_unit_price: Đơn giá điện
+            water_unit_price: Đơn giá nước
+            other_fees: Phí khác
             
         Returns:
-            Tuple (số hóa đơn tạo thành công, số hóa đơn bị lỗi)
+            Tuple (số hóa đơn tạo mới, số phòng bỏ qua vì đã có hóa đơn)
         """
-        success_count = 0
-        error_count = 0
-        
-        for room_id in room_ids:
-            try:
-                # Kiểm tra đã tồn tại hóa đơn chưa
-                existing = Invoice.query.filter_by(
-                    room_id=room_id,
-                    month=month,
-                    year=year
-                ).first()
-                
-                if existing:
-                    error_count += 1
-                    continue
-                
-                # Lấy thông tin phòng
-                room = Room.query.get(room_id)
-                if not room:
-                    error_count += 1
-                    continue
-                
-                # Tạo hóa đơn
-                invoice = Invoice(
-                    room_id=room_id,
-                    month=month,
-                    year=year,
-                    room_charge=room.price,
-                    due_date=due_date,
-                    status='unpaid'
-                )
-                db.session.add(invoice)
-                success_count += 1
-                
-            except Exception:
-                error_count += 1
+        has_invoice = InvoiceService._invoice_exists(month, year)
+        
+        query = db.session.query(Room.id, Room.price, has_invoice.label('has_invoice'))\
+            .filter(Room.status == 'occupied')
+        if room_ids is not None:
+            query = query.filter(Room.id.in_(room_ids))
+        
+        now = datetime.utcnow()
+        other_fees = to_dong(other_fees or 0)
+        rows = []
+        skipped_count = 0
+        
+        # Số cũ = số mới của hóa đơn gần nhất trước tháng này (1 query window function)
+        readings = MeterReadingService.get_latest_readings(month, year, room_ids)
+        
+        for room_id, room_price, existing in query.all():
+            if existing:
+                skipped_count += 1
                 continue
+            
+            room_price = room_price or 0
+            electric, water = readings.get(room_id, (0, 0))
+            rows.append({
+                'room_id': room_id,
+                'month': month,
+                'year': year,
+                'room_price': room_price,
+                # Số mới tạm thời = số cũ (chưa tiêu thụ), cập nhật khi chốt chỉ số
+                'electric_old': electric,
+                'electric_new': electric,
+                'electric_unit_price': electric_unit_price,
+                'water_old': water,
+                'water_new': water,
+                'water_unit_price': water_unit_price,
+                'other_fees': other_fees,
+                # Chỉ số mới = cũ nên tổng = tiền phòng + phí khác (như calculate_total)
+                'total_amount': room_price + other_fees,
+                'paid_amount': 0,
+                'status': 'unpaid',
+                'created_by': created_by,
+                'created_at': now,
+                'due_date': due_date
+            })
+        
+        if not rows:
+            return 0, skipped_count
         
         try:
+            stmt = insert_ignore(Invoice, ['room_id', 'month', 'year'])
+            
+            # RETURNING chỉ trả về các dòng thực sự được insert, nên đếm được
+            # cả trường hợp phòng vừa được request khác tạo hóa đơn (conflict bị bỏ qua)
+            if db.session.get_bind().dialect.insert_executemany_returning:
+                created_count = len(db.session.execute(stmt.returning(Invoice.id), rows).all())
+            else:
+                db.session.execute(stmt, rows)
+                created_count = len(rows)
+            
+            # INSERT hàng loạt bỏ qua flush: tự đánh dấu snapshot báo cáo của kỳ
+            SnapshotService.touch(db.session, [(year, month)])
+            
             db.session.commit()
         except Exception:
             db.session.rollback()
             raise
         
-        return success_count, error_count
+        return created_count, skipped_count + len(rows) - created_count
     
     @staticmethod
     def update_invoice(invoice_id, data):
@@ -217,29 +254,56 @@ class InvoiceService:
             'remaining_amount': total_amount - paid_amount
         }
     
+    @staticmethod
+    def filter_list(query, status=None, month=None, year=None, room_number=None):
+        """
+        Bộ lọc của trang danh sách hóa đơn (dùng chung cho xuất Excel/CSV)
+        
+        Args:
+            query: Query/select đã join Room
+            status: Trạng thái hóa đơn
+            month: Tháng (chỉ áp dụng khi có năm)
+            year: Năm
+            room_number: Một phần số phòng
+            
+        Returns:
+            Query/select đã áp dụng bộ lọc
+        """
+        if status:
+            query = query.filter(Invoice.status == status)
+        
+        if month and year:
+            query = query.filter(and_(Invoice.month == month, Invoice.year == year))
+        elif year:
+            query = query.filter(Invoice.year == year)
+        
+        if room_number:
+            query = query.filter(Room.room_number.contains(room_number))
+        
+        return query
+    
+    @staticmethod
+    def _invoice_exists(month, year):
+        """Điều kiện EXISTS: phòng (Room) đã có hóa đơn trong tháng/năm"""
+        return exists().where(
+            Invoice.room_id == Room.id,
+            Invoice.month == month,
+            Invoice.year == year
+        )
+    
     @staticmethod
     def get_rooms_without_invoice(month, year):
         """
-        Lấy danh sách phòng chưa có hóa đơn trong tháng
+        Lấy danh sách phòng chưa có hóa đơn trong tháng (1 query anti-join)
         
         Args:
             month: Tháng
             year: Năm
             
         Returns:
-            List các Room objects
+            List các Room objects (đã nạp sẵn current_tenant)
         """
-        # Lấy các room_id đã có hóa đơn
-        existing_room_ids = db.session.query(Invoice.room_id).filter_by(
-            month=month,
-            year=year
-        ).all()
-        existing_room_ids = [r[0] for r in existing_room_ids]
-        
-        # Lấy các phòng chưa có hóa đơn và đang có người thuê
         return Room.query.filter(
-            and_(
-                Room.status == 'occupied',
-                ~Room.id.in_(existing_room_ids)
-            )
-        ).order_by(Room.room_number).all()
+            Room.status == 'occupied',
+            ~InvoiceService._invoice_exists(month, year)
+        ).options(Room.current_tenant_loader()).order_by(Room.room_number).all()
@@ -0,0 +1,161 @@
+"""
+Meter Reading Service - Chuỗi chỉ số điện/nước giữa các tháng
+
+Quy tắc: số cũ (electric_old/water_old) của một hóa đơn = số mới
+(electric_new/water_new) của hóa đơn liền trước của cùng phòng.
+Các query dùng index ix_invoices_room_year_month (room_id, year, month).
+"""
+from app import db
+from app.models import Invoice
+from sqlalchemy import and_, func, or_
+
+
+class MeterReadingService:
+    """Service xử lý chuỗi chỉ số điện/nước"""
+    
+    @staticmethod
+    def _before(month, year):
+        """Điều kiện: hóa đơn thuộc kỳ trước tháng/năm chỉ định"""
+        return or_(
+            Invoice.year < year,
+            and_(Invoice.year == year, Invoice.month < month)
+        )
+    
+    @staticmethod
+    def _after(month, year):
+        """Điều kiện: hóa đơn thuộc kỳ sau tháng/năm chỉ định"""
+        return or_(
+            Invoice.year > year,
+            and_(Invoice.year == year, Invoice.month > month)
+        )
+    
+    @staticmethod
+    def get_latest_readings(month, year, room_ids=None):
+        """
+        Lấy chỉ số mới nhất trước tháng/năm chỉ định cho nhiều phòng (1 query)
+        
+        Dùng window function ROW_NUMBER() OVER (PARTITION BY room_id
+        ORDER BY year DESC, month DESC) thay vì query từng phòng.
+        
+        Args:
+            month: Tháng của hóa đơn sắp tạo
+            year: Năm của hóa đơn sắp tạo
+            room_ids: List room_id cần lấy (None = tất cả phòng)
+        
+        Returns:
+            Dictionary {room_id: (electric_new, water_new)}
+        """
+        row_number = func.row_number().over(
+            partition_by=Invoice.room_id,
+            order_by=(Invoice.year.desc(), Invoice.month.desc())
+        ).label('rn')
+        
+        ranked = db.session.query(
+            Invoice.room_id,
+            Invoice.electric_new,
+            Invoice.water_new,
+            row_number
+        ).filter(MeterReadingService._before(month, year))
+        
+        if room_ids is not None:
+            ranked = ranked.filter(Invoice.room_id.in_(room_ids))
+        
+        ranked = ranked.subquery()
+        
+        rows = db.session.query(
+            ranked.c.room_id,
+            ranked.c.electric_new,
+            ranked.c.water_new
+        ).filter(ranked.c.rn == 1).all()
+        
+        return {
+            room_id: (electric_new or 0, water_new or 0)
+            for room_id, electric_new, water_new in rows
+        }
+    
+    @staticmethod
+    def get_previous_reading(room_id, month, year):
+        """
+        Lấy chỉ số mới nhất của 1 phòng trước tháng/năm chỉ định
+        
+        Returns:
+            Tuple (electric_new, water_new), (0, 0) nếu chưa có hóa đơn nào
+        """
+        row = db.session.query(Invoice.electric_new, Invoice.water_new)\
+            .filter(Invoice.room_id == room_id, MeterReadingService._before(month, year))\
+            .order_by(Invoice.year.desc(), Invoice.month.desc())\
+            .first()
+        
+        if row is None:
+            return 0, 0
+        return row[0] or 0, row[1] or 0
+    
+    @staticmethod
+    def get_next_invoice(invoice):
+        """Lấy hóa đơn liền sau (theo tháng/năm) của cùng phòng, hoặc None"""
+        return Invoice.query.filter(
+            Invoice.room_id == invoice.room_id,
+            MeterReadingService._after(invoice.month, invoice.year)
+        ).order_by(Invoice.year, Invoice.month).first()
+    
+    @staticmethod
+    def _shifted_new(old, new, cascaded_old):
+        """
+        Số mới của hóa đơn sau khi số cũ đổi thành cascaded_old
+        
+        Returns:
+            Số mới (số tạm = số cũ được dời theo, số thật giữ nguyên),
+            None nếu số thật nhỏ hơn số cũ mới (không tự sửa được)
+        """
+        if new == old:
+            return cascaded_old
+        if new < cascaded_old:
+            return None
+        return new
+    
+    @staticmethod
+    def cascade_to_next(invoice):
+        """
+        Chuyển số mới của hóa đơn sang số cũ của hóa đơn liền sau
+        
+        Không commit - phải gọi trong cùng transaction với thao tác sửa hóa đơn.
+        Hóa đơn sau còn số mới tạm (= số cũ, VD: tạo hàng loạt chưa chốt chỉ số)
+        được dời số mới theo. Không sửa (cần Admin xử lý) khi hóa đơn sau đã
+        thanh toán đủ hoặc có số mới đã chốt nhỏ hơn số cũ mới.
+        
+        Args:
+            invoice: Hóa đơn vừa sửa số mới
+        
+        Returns:
+            Tuple (next_invoice hoặc None, đã cập nhật hay chưa)
+        """
+        next_invoice = MeterReadingService.get_next_invoice(invoice)
+        if next_invoice is None:
+            return None, False
+        
+        if MeterReadingService.is_synced(invoice, next_invoice):
+            return next_invoice, False
+        
+        if next_invoice.status == 'paid':
+            return next_invoice, False
+        
+        electric_new = MeterReadingService._shifted_new(
+            next_invoice.electric_old, next_invoice.electric_new, invoice.electric_new)
+        water_new = MeterReadingService._shifted_new(
+            next_invoice.water_old, next_invoice.water_new, invoice.water_new)
+        if electric_new is None or water_new is None:
+            return next_invoice, False
+        
+        next_invoice.electric_old = invoice.electric_new
+        next_invoice.electric_new = electric_new
+        next_invoice.water_old = invoice.water_new
+        next_invoice.water_new = water_new
+        next_invoice.calculate_total()
+        next_invoice.update_status()
+        return next_invoice, True
+    
+    @staticmethod
+    def is_synced(invoice, next_invoice):
+        """Số cũ của hóa đơn sau đã bằng số mới của hóa đơn trước chưa"""
+        return (next_invoice.electric_old == invoice.electric_new and
+                next_invoice.water_old == invoice.water_new)
@@ -2,48 +2,119 @@
 Payment Service - Business logic cho quản lý thanh toán
 """
 from app import db
-from app.models import Payment, Invoice
-from datetime import datetime
-from sqlalchemy import func, extract
+from app.models import Payment, Invoice, Room
+from app.utils.database import run_with_retry
+from app.utils.helpers import chunk_list
+from app.utils.money import to_dong
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import case, func, select
+
+PAYMENT_METHODS = ('cash', 'bank_transfer')
 
 
 class PaymentService:
     """Service xử lý logic nghiệp vụ liên quan đến thanh toán"""
     
     @staticmethod
-    def create_payment(invoice_id, data):
+    def _lock_invoice(invoice_id):
         """
-        Tạo thanh toán mới
+        Đọc lại hóa đơn trong transaction ghi hiện tại và khóa dòng đó
+        
+        PostgreSQL/MySQL: SELECT ... FOR UPDATE (thanh toán khác của cùng hóa đơn
+        phải chờ tới khi commit). SQLite: bỏ FOR UPDATE, lock ghi đã có từ
+        BEGIN IMMEDIATE. populate_existing: bỏ giá trị cũ trong session (đọc trước khi khóa).
+        """
+        invoice = db.session.execute(
+            select(Invoice).where(Invoice.id == invoice_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+        if invoice is None:
+            raise ValueError('Không tìm thấy hóa đơn!')
+        return invoice
+    
+    @staticmethod
+    def _retry_options():
+        """Số lần thử / thời gian chờ khi tranh chấp lock (config)"""
+        return {
+            'max_attempts': current_app.config.get('PAYMENT_MAX_ATTEMPTS', 5),
+            'backoff': current_app.config.get('PAYMENT_RETRY_BACKOFF', 0.05)
+        }
+    
+    @staticmethod
+    def record_payment(invoice_id, amount, payment_method='cash', payment_date=None, notes=None):
+        """
+        Ghi nhận thanh toán - an toàn khi nhiều người thu tiền cùng 1 hóa đơn
+        
+        Kiểm tra số tiền còn nợ, thêm Payment và cập nhật paid_amount/trạng thái
+        trong 1 transaction giữ lock hóa đơn (run_with_retry), nên 2 lần thu
+        cùng lúc không thể cùng vượt qua kiểm tra "không vượt quá số còn nợ".
+        Tự thử lại khi tranh chấp lock (PAYMENT_MAX_ATTEMPTS lần).
         
         Args:
-            invoice_id: ID của hóa đơn
-            data: Dictionary chứa thông tin thanh toán
+            invoice_id: ID hóa đơn
+            amount: Số tiền (làm tròn về đồng)
+            payment_method: cash, bank_transfer
+            payment_date: Ngày thanh toán (mặc định: bây giờ)
+            notes: Ghi chú
             
         Returns:
-            Payment object
+            (Payment, số lần đã thử)
+            
+        Raises:
+            ValueError: Dữ liệu không hợp lệ / hóa đơn đã trả đủ / vượt số còn nợ
+            OperationalError: Vẫn tranh chấp lock sau số lần thử tối đa
         """
-        try:
-            invoice = Invoice.query.get_or_404(invoice_id)
+        amount = to_dong(amount)
+        if amount is None or amount <= 0:
+            raise ValueError('Số tiền thanh toán phải lớn hơn 0!')
+        if payment_method not in PAYMENT_METHODS:
+            raise ValueError('Phương thức thanh toán không hợp lệ!')
+        
+        def work():
+            invoice = PaymentService._lock_invoice(invoice_id)
+            remaining = invoice.remaining_amount
+            if invoice.status == 'paid' and remaining == 0:
+                raise ValueError('Hóa đơn này đã được thanh toán đầy đủ! Không thể thêm thanh toán.')
+            if amount > remaining:
+                raise ValueError(f'Số tiền thanh toán ({amount:,.0f}đ) lớn hơn số tiền còn nợ ({remaining:,.0f}đ)! '
+                                 f'Vui lòng nhập số tiền không vượt quá {remaining:,.0f}đ.')
             
             payment = Payment(
-                invoice_id=invoice_id,
-                amount=data['amount'],
-                payment_method=data['payment_method'],
-                payment_date=data['payment_date'],
-                reference_number=data.get('reference_number'),
-                notes=data.get('notes')
+                invoice_id=invoice.id,
+                amount=amount,
+                payment_method=payment_method,
+                payment_date=payment_date or datetime.now(),
+                notes=notes
             )
-            
             db.session.add(payment)
             
-            # Cập nhật trạng thái hóa đơn
-            invoice.update_status()
-            
-            db.session.commit()
+            # Cập nhật paid_amount + trạng thái hóa đơn (cùng transaction, đang giữ lock)
+            invoice.apply_payment(amount)
             return payment
-        except Exception as e:
-            db.session.rollback()
-            raise e
+        
+        return run_with_retry(db.session, work, **PaymentService._retry_options())
+    
+    @staticmethod
+    def create_payment(invoice_id, data):
+        """
+        Tạo thanh toán mới (xem record_payment)
+        
+        Args:
+            invoice_id: ID của hóa đơn
+            data: Dictionary chứa thông tin thanh toán
+            
+        Returns:
+            Payment object
+        """
+        payment, _ = PaymentService.record_payment(
+            invoice_id, data['amount'],
+            payment_method=data.get('payment_method', 'cash'),
+            payment_date=data.get('payment_date'),
+            notes=data.get('notes')
+        )
+        return payment
     
     @staticmethod
     def get_payment_by_id(payment_id):
@@ -51,55 +122,151 @@ class PaymentService:
         return Payment.query.get_or_404(payment_id)
     
     @staticmethod
-    def update_payment(payment_id, data):
+    def change_payment(payment_id, amount=None, payment_method=None, payment_date=None, notes=None):
         """
-        Cập nhật thanh toán
+        Sửa thanh toán - giữ lock hóa đơn như record_payment
+        
+        paid_amount được cộng phần chênh lệch trong cùng transaction giữ lock
+        hóa đơn, nên 2 lần sửa (hoặc sửa + thu tiền) cùng lúc không làm lệch
+        paid_amount so với SUM(payments.amount).
         
         Args:
-            payment_id: ID của thanh toán
-            data: Dictionary chứa thông tin cần update
+            payment_id: ID thanh toán
+            amount: Số tiền mới (None = giữ nguyên)
+            payment_method: cash, bank_transfer (None = giữ nguyên)
+            payment_date: Ngày thanh toán (None = giữ nguyên)
+            notes: Ghi chú (None = giữ nguyên)
             
         Returns:
-            Payment object
-        """
-        try:
-            payment = Payment.query.get_or_404(payment_id)
+            (Payment, số lần đã thử)
             
-            for key, value in data.items():
-                if hasattr(payment, key) and key not in ['id', 'invoice_id']:
-                    setattr(payment, key, value)
+        Raises:
+            ValueError: Dữ liệu không hợp lệ / thanh toán không còn / tổng đã thu vượt tổng hóa đơn
+            OperationalError: Vẫn tranh chấp lock sau số lần thử tối đa
+        """
+        if amount is not None:
+            amount = to_dong(amount)
+            if amount is None or amount <= 0:
+                raise ValueError('Số tiền thanh toán phải lớn hơn 0!')
+        if payment_method is not None and payment_method not in PAYMENT_METHODS:
+            raise ValueError('Phương thức thanh toán không hợp lệ!')
+        
+        def work():
+            payment = db.session.get(Payment, payment_id)
+            if payment is None:
+                raise ValueError('Không tìm thấy thanh toán!')
+            invoice = PaymentService._lock_invoice(payment.invoice_id)
+            # Đọc lại sau khi khóa: có thể vừa bị sửa / xóa bởi request khác
+            payment = db.session.get(Payment, payment_id, populate_existing=True)
+            if payment is None:
+                raise ValueError('Thanh toán đã bị xóa!')
             
-            # Cập nhật lại trạng thái hóa đơn
-            payment.invoice.update_status()
+            difference = 0
+            if amount is not None:
+                difference = amount - payment.amount
+                if difference > invoice.remaining_amount:
+                    limit = payment.amount + invoice.remaining_amount
+                    raise ValueError(f'Số tiền thanh toán ({amount:,.0f}đ) làm tổng đã thu vượt tổng hóa đơn! '
+                                     f'Vui lòng nhập số tiền không vượt quá {limit:,.0f}đ.')
+                payment.amount = amount
+            if payment_method is not None:
+                payment.payment_method = payment_method
+            if payment_date is not None:
+                payment.payment_date = payment_date
+            if notes is not None:
+                payment.notes = notes
             
-            db.session.commit()
+            # Cập nhật paid_amount theo phần chênh lệch + trạng thái hóa đơn (đang giữ lock)
+            invoice.apply_payment(difference)
             return payment
-        except Exception as e:
-            db.session.rollback()
-            raise e
+        
+        return run_with_retry(db.session, work, **PaymentService._retry_options())
+    
+    @staticmethod
+    def update_payment(payment_id, data):
+        """
+        Cập nhật thanh toán (xem change_payment)
+        
+        Args:
+            payment_id: ID của thanh toán
+            data: Dictionary chứa thông tin cần update (amount, payment_method, payment_date, notes)
+            
+        Returns:
+            Payment object
+        """
+        payment, _ = PaymentService.change_payment(
+            payment_id,
+            amount=data.get('amount'),
+            payment_method=data.get('payment_method'),
+            payment_date=data.get('payment_date'),
+            notes=data.get('notes')
+        )
+        return payment
     
     @staticmethod
     def delete_payment(payment_id):
         """
-        Xóa thanh toán
+        Xóa thanh toán (giữ lock hóa đơn như record_payment)
         
         Args:
             payment_id: ID của thanh toán
             
         Returns:
-            True nếu thành công
+            (invoice_id, số tiền đã xóa)
         """
-        try:
-            payment = Payment.query.get_or_404(payment_id)
-            invoice = payment.invoice
+        def work():
+            payment = db.session.get(Payment, payment_id)
+            if payment is None:
+                raise ValueError('Không tìm thấy thanh toán!')
+            invoice = PaymentService._lock_invoice(payment.invoice_id)
+            # Đọc lại sau khi khóa: có thể vừa bị xóa bởi request khác
+            payment = db.session.get(Payment, payment_id, populate_existing=True)
+            if payment is None:
+                raise ValueError('Thanh toán đã bị xóa!')
+            amount = payment.amount
             
             db.session.delete(payment)
             
-            # Cập nhật lại trạng thái hóa đơn
-            invoice.update_status()
+            # Trừ paid_amount + cập nhật lại trạng thái hóa đơn
+            invoice.apply_payment(-amount)
+            return invoice.id, amount
+        
+        result, _ = run_with_retry(db.session, work, **PaymentService._retry_options())
+        return result
+    
+    @staticmethod
+    def reconcile_paid_amounts():
+        """
+        Dựng lại cột Invoice.paid_amount từ bảng payments
+        
+        Dùng sau khi migrate thêm cột, hoặc khi nghi ngờ dữ liệu lệch
+        (VD: sửa payments trực tiếp bằng SQL). Chạy 1 câu UPDATE duy nhất,
+        sau đó cập nhật lại trạng thái cho các hóa đơn bị lệch.
+        
+        Returns:
+            Số hóa đơn có paid_amount bị sửa
+        """
+        try:
+            paid_sum = db.session.query(
+                func.coalesce(func.sum(Payment.amount), 0)
+            ).filter(Payment.invoice_id == Invoice.id).scalar_subquery()
+            
+            drifted_ids = [
+                row[0] for row in db.session.query(Invoice.id)
+                .filter(Invoice.paid_amount != paid_sum).all()
+            ]
+            
+            for ids in chunk_list(drifted_ids, 500):
+                db.session.query(Invoice).filter(Invoice.id.in_(ids))\
+                    .update({Invoice.paid_amount: paid_sum}, synchronize_session=False)
+            db.session.expire_all()
+            
+            for ids in chunk_list(drifted_ids, 500):
+                for invoice in Invoice.query.filter(Invoice.id.in_(ids)).all():
+                    invoice.update_status()
             
             db.session.commit()
-            return True
+            return len(drifted_ids)
         except Exception as e:
             db.session.rollback()
             raise e
@@ -124,14 +291,15 @@ class PaymentService:
         """
         query = Payment.query
         
+        # Lọc theo khoảng ngày (dùng được index payment_date, khác với extract(...))
         if month and year:
-            query = query.filter(
-                extract('month', Payment.payment_date) == month,
-                extract('year', Payment.payment_date) == year
-            )
+            start = datetime(year, month, 1)
+            end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+            query = query.filter(Payment.payment_date >= start, Payment.payment_date < end)
         elif year:
             query = query.filter(
-                extract('year', Payment.payment_date) == year
+                Payment.payment_date >= datetime(year, 1, 1),
+                Payment.payment_date < datetime(year + 1, 1, 1)
             )
         
         payments = query.all()
@@ -155,86 +323,148 @@ class PaymentService:
         }
     
     @staticmethod
-    def get_debt_report(month=None, year=None):
+    def _overdue_level_expr(now):
         """
-        Báo cáo công nợ chi tiết
+        Biểu thức SQL CASE tương đương Invoice.overdue_level
+        
+        Các mốc ngày được tính sẵn bằng Python rồi truyền vào dưới dạng tham số,
+        nên câu SQL chạy được trên mọi dialect (không dùng hàm ngày của DB).
+        """
+        return case(
+            (Invoice.status == 'paid', 'ok'),
+            (Invoice.due_date.is_(None), 'ok'),
+            (Invoice.due_date <= now - timedelta(days=11), 'critical'),
+            (Invoice.due_date <= now - timedelta(days=6), 'danger'),
+            (Invoice.due_date <= now - timedelta(days=1), 'warning'),
+            else_='ok'
+        )
+    
+    @staticmethod
+    def _period_filter(query, month=None, year=None):
+        """Áp dụng bộ lọc kỳ báo cáo (tháng/năm) cho query hóa đơn"""
+        if month and year:
+            query = query.filter(Invoice.month == month, Invoice.year == year)
+        elif year:
+            query = query.filter(Invoice.year == year)
+        return query
+    
+    @staticmethod
+    def get_debt_invoices(bucket, month=None, year=None, page=1, per_page=20, total=None, now=None):
+        """
+        Lấy 1 trang hóa đơn thuộc một nhóm công nợ
         
         Args:
+            bucket: 'critical', 'danger', 'warning' (theo mức quá hạn) hoặc 'partial'
             month: Tháng (optional)
             year: Năm (optional)
+            page: Trang hiện tại
+            per_page: Số hóa đơn mỗi trang
+            total: Tổng số hóa đơn của nhóm nếu đã biết (bỏ qua câu COUNT)
+            now: Mốc thời gian tính quá hạn (mặc định utcnow)
             
         Returns:
-            Dictionary chứa thông tin công nợ
+            Pagination object
         """
-        query = Invoice.query
+        now = now or datetime.utcnow()
+        query = PaymentService._period_filter(
+            Invoice.query.options(Room.current_tenant_loader(Invoice.room)), month, year
+        )
         
-        if month and year:
-            query = query.filter_by(month=month, year=year)
-        elif year:
-            query = query.filter_by(year=year)
+        if bucket == 'partial':
+            query = query.filter(Invoice.status == 'partial')
+        else:
+            # Điều kiện status tương đương (CASE trả 'ok' khi đã paid) để dùng được index
+            query = query.filter(
+                Invoice.status.in_(['unpaid', 'partial']),
+                PaymentService._overdue_level_expr(now) == bucket
+            )
+        
+        pagination = query.order_by(Invoice.due_date, Invoice.id).paginate(
+            page=page, per_page=per_page, error_out=False, count=total is None
+        )
+        if total is not None:
+            pagination.total = total
+        return pagination
+    
+    @staticmethod
+    def get_debt_report(month=None, year=None, pages=None, per_page=20):
+        """
+        Báo cáo công nợ chi tiết
+        
+        Phân loại paid/partial/unpaid và warning/danger/critical bằng 1 câu
+        GROUP BY trong SQL; chi tiết từng nhóm chỉ lấy 1 trang (phân trang riêng).
         
-        invoices = query.all()
+        Args:
+            month: Tháng (optional)
+            year: Năm (optional)
+            pages: Dictionary {nhóm: trang} cho chi tiết (critical/danger/warning/partial)
+            per_page: Số hóa đơn mỗi trang chi tiết
+            
+        Returns:
+            Dictionary chứa thông tin công nợ
+        """
+        pages = pages or {}
+        now = datetime.utcnow()
+        level = PaymentService._overdue_level_expr(now)
         
-        # Phân loại hóa đơn
-        paid_invoices = []
-        partial_invoices = []
-        unpaid_invoices = []
-        overdue_warning = []  # 1-5 ngày
-        overdue_danger = []   # 5-10 ngày
-        overdue_critical = [] # >10 ngày
+        rows = PaymentService._period_filter(db.session.query(
+            Invoice.status,
+            level,
+            func.count(Invoice.id),
+            func.coalesce(func.sum(Invoice.total_amount), 0),
+            func.coalesce(func.sum(Invoice.paid_amount), 0),
+            func.coalesce(func.sum(Invoice.remaining_amount), 0)
+        ), month, year).group_by(Invoice.status, level).all()
         
+        status_counts = {'paid': 0, 'partial': 0, 'unpaid': 0}
+        overdue = {lv: {'count': 0, 'amount': 0} for lv in ('warning', 'danger', 'critical')}
+        total_invoices = 0
         total_amount = 0
         total_paid = 0
         total_remaining = 0
         
-        for invoice in invoices:
-            total_amount += invoice.total_amount
-            total_paid += invoice.paid_amount
-            total_remaining += invoice.remaining_amount
+        for status, lv, count, amount, paid, remaining in rows:
+            total_invoices += count
+            total_amount += amount
+            total_paid += paid
+            total_remaining += remaining
             
-            if invoice.status == 'paid':
-                paid_invoices.append(invoice)
-            elif invoice.status == 'partial':
-                partial_invoices.append(invoice)
-            else:
-                unpaid_invoices.append(invoice)
+            status_counts[status if status in ('paid', 'partial') else 'unpaid'] += count
             
-            # Phân loại quá hạn
-            if invoice.status != 'paid':
-                level = invoice.overdue_level
-                if level == 'warning':
-                    overdue_warning.append(invoice)
-                elif level == 'danger':
-                    overdue_danger.append(invoice)
-                elif level == 'critical':
-                    overdue_critical.append(invoice)
+            if lv in overdue:
+                overdue[lv]['count'] += count
+                overdue[lv]['amount'] += remaining
+        
+        def detail(bucket, total):
+            return PaymentService.get_debt_invoices(
+                bucket, month, year,
+                page=pages.get(bucket, 1), per_page=per_page, total=total, now=now
+            )
         
         return {
-            'total_invoices': len(invoices),
+            'total_invoices': total_invoices,
             'total_amount': total_amount,
             'total_paid': total_paid,
             'total_remaining': total_remaining,
-            'paid_invoices': paid_invoices,
-            'paid_count': len(paid_invoices),
-            'partial_invoices': partial_invoices,
-            'partial_count': len(partial_invoices),
-            'unpaid_invoices': unpaid_invoices,
-            'unpaid_count': len(unpaid_invoices),
-            'overdue_warning': overdue_warning,
-            'overdue_warning_count': len(overdue_warning),
-            'overdue_warning_amount': sum(inv.remaining_amount for inv in overdue_warning),
-            'overdue_danger': overdue_danger,
-            'overdue_danger_count': len(overdue_danger),
-            'overdue_danger_amount': sum(inv.remaining_amount for inv in overdue_danger),
-            'overdue_critical': overdue_critical,
-            'overdue_critical_count': len(overdue_critical),
-            'overdue_critical_amount': sum(inv.remaining_amount for inv in overdue_critical),
+            'paid_count': status_counts['paid'],
+            'partial_invoices': detail('partial', status_counts['partial']),
+            'partial_count': status_counts['partial'],
+            'unpaid_count': status_counts['unpaid'],
+            'overdue_warning': detail('warning', overdue['warning']['count']),
+            'overdue_warning_count': overdue['warning']['count'],
+            'overdue_warning_amount': overdue['warning']['amount'],
+            'overdue_danger': detail('danger', overdue['danger']['count']),
+            'overdue_danger_count': overdue['danger']['count'],
+            'overdue_danger_amount': overdue['danger']['amount'],
+            'overdue_critical': detail('critical', overdue['critical']['count']),
+            'overdue_critical_count': overdue['critical']['count'],
+            'overdue_critical_amount': overdue['critical']['amount'],
         }
     
     @staticmethod
     def get_collection_summary(month=None, year=None):
         """
-        Tổng hợp thu tiền trong kỳ
+        Tổng hợp thu tiền trong kỳ (1 câu aggregate)
         
         Args:
             month: Tháng (optional)
@@ -243,23 +473,13 @@ class PaymentService:
         Returns:
             Dictionary chứa tổng hợp thu tiền
         """
-        invoice_query = Invoice.query
-        
-        if month and year:
-            invoice_query = invoice_query.filter_by(month=month, year=year)
-        elif year:
-            invoice_query = invoice_query.filter_by(year=year)
-        
-        invoices = invoice_query.all()
-        
-        # Tổng phải thu
-        total_receivable = sum(inv.total_amount for inv in invoices)
-        
-        # Tổng đã thu
-        total_collected = sum(inv.paid_amount for inv in invoices)
-        
-        # Tổng chưa thu
-        total_uncollected = sum(inv.remaining_amount for inv in invoices)
+        invoice_count, total_receivable, total_collected, total_uncollected = \
+            PaymentService._period_filter(db.session.query(
+                func.count(Invoice.id),
+                func.coalesce(func.sum(Invoice.total_amount), 0),   # Tổng phải thu
+                func.coalesce(func.sum(Invoice.paid_amount), 0),    # Tổng đã thu
+                func.coalesce(func.sum(Invoice.remaining_amount), 0)  # Tổng chưa thu
+            ), month, year).one()
         
         # Tỷ lệ thu
         collection_rate = (total_collected / total_receivable * 100) if total_receivable > 0 else 0
@@ -269,6 +489,5 @@ class PaymentService:
             'total_collected': total_collected,
             'total_uncollected': total_uncollected,
             'collection_rate': collection_rate,
-            'invoice_count': len(invoices)
+            'invoice_count': invoice_count
         }
-
@@ -0,0 +1,272 @@
+"""
+PDF Service - In hóa đơn ra PDF (reportlab)
+
+- Dữ liệu hóa đơn được lấy bằng 1 query (chỉ cột) thành dict thuần,
+  gửi được sang process khác (pickle) mà không cần kết nối database
+- Mỗi process giữ sẵn font + style + bảng mẫu (_InvoiceRenderer), chỉ tạo 1 lần
+- In cả tháng: chia việc cho ProcessPoolExecutor, ghi kết quả vào 1 file zip
+"""
+import io
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A5
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+from app import db
+from app.models import Invoice, Room
+from app.utils.money import usage_cost
+from sqlalchemy import select
+
+STATUS_LABELS = {
+    'unpaid': 'Chưa thanh toán',
+    'partial': 'Thanh toán 1 phần',
+    'paid': 'Đã thanh toán'
+}
+
+# Font dự phòng (có sẵn trong reportlab, không đủ dấu tiếng Việt)
+FALLBACK_FONT = 'Helvetica'
+
+
+def _money(amount):
+    """Định dạng tiền: 1,500,000đ"""
+    return f'{amount or 0:,.0f}đ'
+
+
+def _number(value):
+    """Định dạng chỉ số điện/nước: bỏ phần thập phân .0"""
+    return f'{value or 0:g}'
+
+
+class _InvoiceRenderer:
+    """
+    Bộ dựng PDF của 1 process: font, style và style bảng chỉ tạo 1 lần
+    
+    Không dùng trực tiếp - lấy qua _get_renderer()
+    """
+    
+    def __init__(self, font_path=None):
+        self.font = FALLBACK_FONT
+        if font_path and os.path.exists(font_path):
+            pdfmetrics.registerFont(TTFont('InvoiceFont', font_path))
+            self.font = 'InvoiceFont'
+        
+        self.title_style = ParagraphStyle('title', fontName=self.font, fontSize=14,
+                                          leading=18, alignment=1, spaceAfter=2 * mm)
+        self.normal_style = ParagraphStyle('normal', fontName=self.font, fontSize=9, leading=12)
+        self.total_style = ParagraphStyle('total', fontName=self.font, fontSize=11,
+                                          leading=14, alignment=2)
+        
+        self.table_style = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), self.font),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#f1f3f5')),
+        ])
+        self.col_widths = [38 * mm, 24 * mm, 24 * mm, 22 * mm, 26 * mm]
+    
+    def render(self, invoice):
+        """
+        Dựng PDF cho 1 hóa đơn
+        
+        Args:
+            invoice: Dict từ InvoicePdfService.get_payloads()
+        
+        Returns:
+            Nội dung file PDF (bytes)
+        """
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(
+            buffer, pagesize=A5,
+            leftMargin=10 * mm, rightMargin=10 * mm, topMargin=10 * mm, bottomMargin=10 * mm,
+            title=f"Hóa đơn {invoice['room_number']} - {invoice['month']}/{invoice['year']}",
+            pageCompression=1
+        )
+        
+        electric_usage = (invoice['electric_new'] or 0) - (invoice['electric_old'] or 0)
+        water_usage = (invoice['water_new'] or 0) - (invoice['water_old'] or 0)
+        due_date = invoice['due_date'].strftime('%d/%m/%Y') if invoice['due_date'] else '-'
+        
+        rows = [
+            ['Khoản', 'Chỉ số cũ', 'Chỉ số mới', 'Sử dụng', 'Thành tiền'],
+            ['Tiền phòng', '', '', '', _money(invoice['room_price'])],
+            ['Điện', _number(invoice['electric_old']), _number(invoice['electric_new']),
+             _number(electric_usage), _money(invoice['electric_cost'])],
+            ['Nước', _number(invoice['water_old']), _number(invoice['water_new']),
+             _number(water_usage), _money(invoice['water_cost'])],
+            ['Phí khác', '', '', '', _money(invoice['other_fees'])],
+            ['Tổng cộng', '', '', '', _money(invoice['total_amount'])],
+        ]
+        
+        table = Table(rows, colWidths=self.col_widths)
+        table.setStyle(self.table_style)
+        
+        story = [
+            Paragraph(f"HÓA ĐƠN TIỀN PHÒNG THÁNG {invoice['month']}/{invoice['year']}", self.title_style),
+            Paragraph(f"Mã hóa đơn: #{invoice['id']}", self.normal_style),
+            Paragraph(f"Phòng: {invoice['room_number']}", self.normal_style),
+            Paragraph(f"Khách thuê: {invoice['tenant_name'] or '-'}", self.normal_style),
+            Paragraph(f"Hạn thanh toán: {due_date}", self.normal_style),
+            Spacer(1, 4 * mm),
+            table,
+            Spacer(1, 4 * mm),
+            Paragraph(f"Đã trả: {_money(invoice['paid_amount'])}", self.total_style),
+            Paragraph(f"Còn nợ: {_money(invoice['remaining_amount'])}", self.total_style),
+            Paragraph(f"Trạng thái: {STATUS_LABELS.get(invoice['status'], invoice['status'])}",
+                      self.total_style),
+        ]
+        
+        doc.build(story)
+        return buffer.getvalue()
+
+
+# Bộ dựng của process hiện tại (mỗi worker có 1 bản riêng)
+_renderer = None
+
+
+def _get_renderer(font_path=None):
+    global _renderer
+    if _renderer is None:
+        _renderer = _InvoiceRenderer(font_path)
+    return _renderer
+
+
+def _init_worker(font_path):
+    """Initializer của worker: nạp font/style 1 lần cho cả vòng đời process"""
+    _get_renderer(font_path)
+
+
+def _render_job(invoice):
+    """Việc của worker: trả (tên file, nội dung PDF)"""
+    return InvoicePdfService.filename(invoice), _get_renderer().render(invoice)
+
+
+class InvoicePdfService:
+    """Service in hóa đơn ra PDF"""
+    
+    @staticmethod
+    def get_payloads(month=None, year=None, invoice_ids=None):
+        """
+        Lấy dữ liệu in của các hóa đơn (1 query, không tạo ORM object)
+        
+        Args:
+            month: Tháng
+            year: Năm
+            invoice_ids: List id hóa đơn (None = mọi hóa đơn của tháng/năm)
+        
+        Returns:
+            List dict, sắp xếp theo số phòng; electric_cost / water_cost tính
+            như Invoice.calculate_total (usage_cost) để các dòng cộng đúng tổng
+        """
+        stmt = select(
+            Invoice.id, Invoice.month, Invoice.year,
+            Room.room_number, Room.current_tenant_name().label('tenant_name'),
+            Invoice.room_price, Invoice.electric_old, Invoice.electric_new, Invoice.electric_unit_price,
+            Invoice.water_old, Invoice.water_new, Invoice.water_unit_price, Invoice.other_fees,
+            Invoice.total_amount, Invoice.paid_amount,
+            Invoice.remaining_amount.label('remaining_amount'),
+            Invoice.status, Invoice.due_date
+        ).join(Room, Invoice.room_id == Room.id)
+        
+        if month and year:
+            stmt = stmt.where(Invoice.month == month, Invoice.year == year)
+        if invoice_ids is not None:
+            stmt = stmt.where(Invoice.id.in_(invoice_ids))
+        
+        stmt = stmt.order_by(Room.room_number, Invoice.id)
+        payloads = []
+        for row in db.session.execute(stmt):
+            payload = dict(row._mapping)
+            payload['electric_cost'] = usage_cost(row.electric_old, row.electric_new, row.electric_unit_price)
+            payload['water_cost'] = usage_cost(row.water_old, row.water_new, row.water_unit_price)
+            payloads.append(payload)
+        return payloads
+    
+    @staticmethod
+    def filename(invoice):
+        """Tên file PDF: hoa_don_P01_2025_01.pdf"""
+        return f"hoa_don_{invoice['room_number']}_{invoice['year']}_{invoice['month']:02d}.pdf"
+    
+    @staticmethod
+    def render(invoice_id):
+        """
+        In 1 hóa đơn (trong process hiện tại)
+        
+        Returns:
+            Tuple (tên file, nội dung PDF), hoặc None nếu không có hóa đơn
+        """
+        payloads = InvoicePdfService.get_payloads(invoice_ids=[invoice_id])
+        if not payloads:
+            return None
+        _get_renderer(current_app.config.get('PDF_FONT_PATH'))
+        return _render_job(payloads[0])
+    
+    @staticmethod
+    def render_month(month, year, output, workers=None, chunksize=16):
+        """
+        In mọi hóa đơn của tháng vào 1 file zip
+        
+        Args:
+            month: Tháng
+            year: Năm
+            output: Đường dẫn hoặc file object để ghi zip
+            workers: Số process (None = PDF_RENDER_WORKERS, 1 = không dùng pool)
+            chunksize: Số hóa đơn gửi cho worker mỗi lần
+        
+        Returns:
+            Số hóa đơn đã in
+        """
+        font_path = current_app.config.get('PDF_FONT_PATH')
+        if workers is None:
+            workers = current_app.config.get('PDF_RENDER_WORKERS') or os.cpu_count() or 1
+        
+        payloads = InvoicePdfService.get_payloads(month, year)
+        
+        # PDF đã nén sẵn (pageCompression) nên zip chỉ lưu, không nén lại
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+            if workers <= 1 or len(payloads) <= 1:
+                _get_renderer(font_path)
+                results = map(_render_job, payloads)
+                for name, content in results:
+                    archive.writestr(name, content)
+            else:
+                # Không để process con dùng chung kết nối database của process cha
+                db.engine.dispose(close=False)
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(font_path,)) as executor:
+                    for name, content in executor.map(_render_job, payloads, chunksize=chunksize):
+                        archive.writestr(name, content)
+        
+        return len(payloads)
+    
+    @staticmethod
+    def benchmark(month, year, worker_counts=(1, 2, 4)):
+        """
+        Đo tốc độ in (hóa đơn/giây) với số worker khác nhau
+        
+        Returns:
+            List dict: workers, invoices, seconds, per_second
+        """
+        results = []
+        for workers in worker_counts:
+            started = time.perf_counter()
+            count = InvoicePdfService.render_month(month, year, io.BytesIO(), workers=workers)
+            seconds = time.perf_counter() - started
+            results.append({
+                'workers': workers,
+                'invoices': count,
+                'seconds': seconds,
+                'per_second': count / seconds if seconds else 0
+            })
+        return results
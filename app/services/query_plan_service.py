@@ -0,0 +1,175 @@
+"""
+Query Plan Service - Kiểm tra các query nóng có dùng index hay không
+
+Chạy từng hàm service (tham số mẫu), bắt lại mọi câu SELECT mà hàm đó gửi
+xuống database, rồi chạy EXPLAIN QUERY PLAN (SQLite) cho từng câu.
+Dòng plan "SCAN <bảng>" (không kèm "USING ... INDEX") là quét toàn bảng.
+
+Dùng qua lệnh: flask db-check-indexes
+"""
+import re
+from contextlib import contextmanager
+from datetime import datetime
+
+from app import db
+from app.services.dashboard_service import DashboardStats
+from app.services.export_service import ExportService
+from app.services.invoice_service import InvoiceService
+from app.services.meter_service import MeterReadingService
+from app.services.payment_service import PaymentService
+from app.services.pdf_service import InvoicePdfService
+from app.services.report_service import ReportService
+from app.services.room_service import RoomService
+from app.services.snapshot_service import SnapshotService
+from app.services.tenant_service import TenantService
+from sqlalchemy import event
+
+_SCAN_RE = re.compile(r'^SCAN (\w+)')
+
+
+def _hot_queries(month, year):
+    """
+    Các query cần kiểm tra: (tên, hàm không tham số, bảng được phép quét toàn bộ)
+    
+    Chỉ cho phép quét toàn bảng khi đó là bản chất của query
+    (đếm/liệt kê cả bảng, điều kiện có độ chọn lọc thấp).
+    """
+    return [
+        ('RoomService.get_all_rooms', lambda: RoomService.get_all_rooms(status='available'), ()),
+        ('RoomService.get_available_rooms', RoomService.get_available_rooms, ()),
+        ('RoomService.get_room_statistics', RoomService.get_room_statistics, ()),
+        # status chỉ có 2 giá trị (active/moved_out): index không giúp được nhiều
+        ('TenantService.get_all_tenants', lambda: TenantService.get_all_tenants(status='active'), ('tenants',)),
+        ('TenantService.get_active_tenants', TenantService.get_active_tenants, ('tenants',)),
+        ('TenantService.get_tenant_statistics', TenantService.get_tenant_statistics, ()),
+        ('InvoiceService.get_all_invoices',
+         lambda: InvoiceService.get_all_invoices(filters={'status': 'unpaid', 'month': month, 'year': year}), ()),
+        ('InvoiceService.get_overdue_invoices', InvoiceService.get_overdue_invoices, ()),
+        ('InvoiceService.get_invoice_statistics', lambda: InvoiceService.get_invoice_statistics(month, year), ()),
+        ('InvoiceService.get_rooms_without_invoice',
+         lambda: InvoiceService.get_rooms_without_invoice(month, year), ()),
+        ('MeterReadingService.get_latest_readings', lambda: MeterReadingService.get_latest_readings(month, year), ()),
+        ('MeterReadingService.get_previous_reading',
+         lambda: MeterReadingService.get_previous_reading(1, month, year), ()),
+        ('PaymentService.get_payments_by_invoice', lambda: PaymentService.get_payments_by_invoice(1), ()),
+        ('PaymentService.get_payment_statistics', lambda: PaymentService.get_payment_statistics(month, year), ()),
+        ('PaymentService.get_debt_report', lambda: PaymentService.get_debt_report(month, year), ()),
+        ('PaymentService.get_collection_summary', lambda: PaymentService.get_collection_summary(month, year), ()),
+        ('ReportService.get_revenue_report', lambda: ReportService.get_revenue_report(year, month), ()),
+        # Thống kê theo tầng: GROUP BY trên toàn bộ phòng
+        ('ReportService.get_occupancy_report', ReportService.get_occupancy_report, ('rooms',)),
+        ('ReportService.get_overdue_report', ReportService.get_overdue_report, ()),
+        # Khách mới trong 30 ngày: lọc theo move_in_date trên bảng nhỏ
+        ('ReportService.get_tenant_report', ReportService.get_tenant_report, ('tenants',)),
+        ('ReportService.get_dashboard_summary', ReportService.get_dashboard_summary, ()),
+        # Làm mới snapshot: đếm khách/phòng tại cuối tháng theo ngày (chỉ chạy khi ghi)
+        ('SnapshotService.compute',
+         lambda: SnapshotService.compute(db.session.connection(), year, month), ('tenants', 'rooms')),
+        # 5 hóa đơn mới nhất: ORDER BY created_at DESC LIMIT 5
+        ('DashboardStats.compute', lambda: DashboardStats.compute(month, year), ('invoices',)),
+        ('ExportService.invoice_rows', lambda: list(ExportService.invoice_rows(month=month, year=year)), ()),
+        ('ExportService.payment_rows', lambda: list(ExportService.payment_rows(month=month, year=year)), ()),
+        ('InvoicePdfService.get_payloads', lambda: InvoicePdfService.get_payloads(month, year), ()),
+    ]
+
+
+class QueryPlanService:
+    """Service phân tích query plan (EXPLAIN QUERY PLAN)"""
+    
+    @staticmethod
+    @contextmanager
+    def capture():
+        """
+        Bắt các câu SELECT gửi xuống database trong khối with
+        
+        Usage:
+            with QueryPlanService.capture() as statements:
+                RoomService.get_available_rooms()
+            # statements: list tuple (sql, parameters)
+        """
+        statements = []
+        
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                statements.append((statement, parameters))
+        
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    
+    @staticmethod
+    def explain(statement, parameters=()):
+        """
+        Query plan của 1 câu SQL (chỉ SQLite)
+        
+        Returns:
+            List chuỗi mô tả (cột detail của EXPLAIN QUERY PLAN)
+        """
+        rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+        return [row[3] for row in rows]
+    
+    @staticmethod
+    def full_scans(plan):
+        """
+        Các bảng bị quét toàn bộ trong plan
+        
+        Bỏ qua quét subquery/CTE và quét theo index ("SCAN t USING INDEX ...").
+        Alias dạng rooms_1 được quy về tên bảng.
+        
+        Returns:
+            List tên bảng
+        """
+        tables = db.metadata.tables
+        scans = []
+        for detail in plan:
+            match = _SCAN_RE.match(detail)
+            if not match or ' USING ' in detail:
+                continue
+            name = match.group(1)
+            if name not in tables:
+                name = re.sub(r'_\d+$', '', name)
+            if name in tables:
+                scans.append(name)
+        return scans
+    
+    @staticmethod
+    def check(now=None):
+        """
+        Chạy EXPLAIN QUERY PLAN cho mọi câu SQL của các query nóng
+        
+        Dữ liệu không bị thay đổi: transaction được rollback sau mỗi hàm.
+        
+        Returns:
+            List dict: name, sql, plan, scans (bảng quét toàn bộ ngoài danh sách cho phép),
+            allowed (bảng quét toàn bộ được cho phép), error (nếu hàm lỗi)
+        """
+        if db.engine.dialect.name != 'sqlite':
+            raise RuntimeError('EXPLAIN QUERY PLAN chỉ hỗ trợ SQLite')
+        
+        now = now or datetime.now()
+        results = []
+        for name, func, allow in _hot_queries(now.month, now.year):
+            try:
+                with QueryPlanService.capture() as statements:
+                    func()
+            except Exception as e:
+                db.session.rollback()
+                results.append({'name': name, 'sql': None, 'plan': [], 'scans': [], 'allowed': [],
+                                'error': str(e)})
+                continue
+            
+            for statement, parameters in statements:
+                plan = QueryPlanService.explain(statement, parameters)
+                scans = QueryPlanService.full_scans(plan)
+                results.append({
+                    'name': name,
+                    'sql': statement,
+                    'plan': plan,
+                    'scans': [table for table in scans if table not in allow],
+                    'allowed': [table for table in scans if table in allow],
+                    'error': None
+                })
+            db.session.rollback()
+        return results
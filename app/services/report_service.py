@@ -3,8 +3,16 @@ Report Service - Business logic cho báo cáo thống kê
 """
 from app import db
 from app.models import Invoice, Payment, Room, Tenant
-from datetime import datetime, timedelta
-from sqlalchemy import extract, func
+from app.services.snapshot_service import SnapshotService
+from datetime import datetime
+from sqlalchemy import case, func
+
+
+def _revenue_figures(snapshot):
+    """(số hóa đơn, phải thu, đã thu) của 1 snapshot (None = tháng tương lai)"""
+    if snapshot is None:
+        return 0, 0, 0
+    return snapshot.invoices_total, snapshot.receivable, snapshot.collected
 
 
 class ReportService:
@@ -15,6 +23,9 @@ class ReportService:
         """
         Báo cáo doanh thu
         
+        Đọc từ bảng monthly_snapshots (SnapshotService), không tổng hợp lại
+        hóa đơn mỗi lần xem.
+        
         Args:
             year: Năm
             month: Tháng (optional, nếu None thì báo cáo cả năm)
@@ -24,11 +35,8 @@ class ReportService:
         """
         if month:
             # Báo cáo theo tháng
-            invoices = Invoice.query.filter_by(year=year, month=month).all()
-            
-            total_invoices = len(invoices)
-            total_amount = sum(inv.total_amount for inv in invoices)
-            paid_amount = sum(inv.paid_amount for inv in invoices)
+            snapshot = SnapshotService.get_month(year, month)
+            total_invoices, total_amount, paid_amount = _revenue_figures(snapshot)
             
             return {
                 'period': f'{month:02d}/{year}',
@@ -40,17 +48,15 @@ class ReportService:
             }
         else:
             # Báo cáo cả năm, chia theo tháng
+            snapshots = SnapshotService.get_year(year)
             monthly_data = []
             
             for m in range(1, 13):
-                invoices = Invoice.query.filter_by(year=year, month=m).all()
-                
-                total_amount = sum(inv.total_amount for inv in invoices)
-                paid_amount = sum(inv.paid_amount for inv in invoices)
+                count, total_amount, paid_amount = _revenue_figures(snapshots[m])
                 
                 monthly_data.append({
                     'month': m,
-                    'total_invoices': len(invoices),
+                    'total_invoices': count,
                     'total_amount': total_amount,
                     'paid_amount': paid_amount,
                     'unpaid_amount': total_amount - paid_amount
@@ -77,18 +83,14 @@ class ReportService:
         Returns:
             Dictionary chứa dữ liệu báo cáo
         """
-        total_rooms = Room.query.count()
-        occupied_rooms = Room.query.filter_by(status='occupied').count()
-        available_rooms = Room.query.filter_by(status='available').count()
-        maintenance_rooms = Room.query.filter_by(status='maintenance').count()
-        
-        occupancy_rate = (occupied_rooms / total_rooms * 100) if total_rooms > 0 else 0
+        # Số liệu tháng hiện tại từ monthly_snapshots
+        snapshot = SnapshotService.get_current()
         
         # Thống kê theo tầng
         floors_data = db.session.query(
             Room.floor,
             func.count(Room.id).label('total'),
-            func.sum(func.case((Room.status == 'occupied', 1), else_=0)).label('occupied')
+            func.sum(case((Room.status == 'occupied', 1), else_=0)).label('occupied')
         ).group_by(Room.floor).order_by(Room.floor).all()
         
         floors = []
@@ -103,11 +105,11 @@ class ReportService:
             })
         
         return {
-            'total_rooms': total_rooms,
-            'occupied_rooms': occupied_rooms,
-            'available_rooms': available_rooms,
-            'maintenance_rooms': maintenance_rooms,
-            'occupancy_rate': occupancy_rate,
+            'total_rooms': snapshot.total_rooms,
+            'occupied_rooms': snapshot.occupied_rooms,
+            'available_rooms': snapshot.available_rooms,
+            'maintenance_rooms': snapshot.maintenance_rooms,
+            'occupancy_rate': snapshot.occupancy_rate,
             'floors': floors
         }
     
@@ -174,15 +176,8 @@ class ReportService:
         Returns:
             Dictionary chứa dữ liệu báo cáo
         """
-        total_tenants = Tenant.query.count()
-        active_tenants = Tenant.query.filter_by(status='active').count()
-        moved_out_tenants = Tenant.query.filter_by(status='moved_out').count()
-        
-        # Khách thuê mới trong 30 ngày
-        thirty_days_ago = datetime.now().date() - timedelta(days=30)
-        new_tenants = Tenant.query.filter(
-            Tenant.move_in_date >= thirty_days_ago
-        ).count()
+        # Số liệu tháng hiện tại từ monthly_snapshots
+        snapshot = SnapshotService.get_current()
         
         # Thống kê theo phòng
         rooms_with_tenants = db.session.query(
@@ -194,10 +189,10 @@ class ReportService:
          .order_by(Room.room_number).all()
         
         return {
-            'total_tenants': total_tenants,
-            'active_tenants': active_tenants,
-            'moved_out_tenants': moved_out_tenants,
-            'new_tenants_30_days': new_tenants,
+            'total_tenants': snapshot.total_tenants,
+            'active_tenants': snapshot.active_tenants,
+            'moved_out_tenants': snapshot.moved_out_tenants,
+            'new_tenants_month': snapshot.new_tenants,
             'rooms_with_tenants': [
                 {'room': room, 'count': count}
                 for room, count in rooms_with_tenants
@@ -3,7 +3,7 @@ Room Service - Business logic cho quản lý phòng
 """
 from app import db
 from app.models import Room, Tenant
-from sqlalchemy import or_, and_
+from app.services.search_service import SearchService
 
 
 class RoomService:
@@ -23,22 +23,18 @@ class RoomService:
         Returns:
             Pagination object
         """
-        query = Room.query
+        # Nạp sẵn khách hiện tại cho cả trang (tránh N+1)
+        query = Room.query.options(Room.current_tenant_loader())
         
         # Áp dụng filter
-        if search:
-            query = query.filter(
-                or_(
-                    Room.room_number.ilike(f'%{search}%'),
-                    Room.description.ilike(f'%{search}%')
-                )
-            )
-        
         if status:
             query = query.filter(Room.status == status)
         
-        # Sắp xếp và phân trang
-        return query.order_by(Room.room_number).paginate(
+        # Tìm kiếm full-text (không dấu), xếp theo độ khớp rồi số phòng
+        query = SearchService.apply(query, 'rooms', search, Room.room_number)
+        
+        # Phân trang
+        return query.paginate(
             page=page, per_page=per_page, error_out=False
         )
     
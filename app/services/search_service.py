@@ -0,0 +1,275 @@
+"""
+Search Service - Tìm kiếm khách thuê / phòng bằng full-text index
+
+- Văn bản được chuẩn hóa trước khi đưa vào index và khi tìm:
+  chữ thường, bỏ dấu tiếng Việt (kể cả đ → d) → "Nguyen" khớp "Nguyễn"
+- SQLite: bảng ảo FTS5 tokenizer trigram (khớp chuỗi con như số điện thoại,
+  CCCD), xếp hạng bằng bm25 có trọng số theo cột
+- PostgreSQL: bảng thường + GIN index pg_trgm, xếp hạng bằng word_similarity
+- Dialect khác (MySQL...): không có bảng index, tìm bằng ILIKE trên bảng gốc
+  (không xếp hạng), mapper events không ghi gì
+- Đồng bộ bằng mapper events (after_insert/update/delete) trong cùng transaction
+  với thay đổi dữ liệu. Thao tác hàng loạt bỏ qua ORM → chạy `flask search-reindex`
+"""
+import re
+import unicodedata
+
+from app import db
+from app.models import Room, Tenant
+from sqlalchemy import and_, column, event, func, inspect, literal_column, or_, select, table, text
+
+# Trigram cần ít nhất 3 ký tự, từ ngắn hơn thì lọc bằng LIKE
+MIN_TRIGRAM_LENGTH = 3
+
+# Dialect có bảng index (create_tables)
+INDEXED_DIALECTS = ('sqlite', 'postgresql')
+
+
+class SearchIndex:
+    """Khai báo index tìm kiếm của 1 model: tên bảng index, các cột, trọng số xếp hạng"""
+    
+    def __init__(self, model, table_name, fields, weights):
+        self.model = model
+        self.table_name = table_name
+        self.fields = fields
+        self.weights = weights
+        self.table = table(table_name, column('rowid'), column('document'), *(column(f) for f in fields))
+    
+    def source(self, obj):
+        """Giá trị (chưa chuẩn hóa) của các cột cần index"""
+        return {field: getattr(obj, field) for field in self.fields}
+
+
+SEARCH_INDEXES = {
+    'tenants': SearchIndex(Tenant, 'tenants_search', ('full_name', 'id_number', 'phone'), (10.0, 4.0, 4.0)),
+    'rooms': SearchIndex(Room, 'rooms_search', ('room_number', 'description'), (10.0, 1.0)),
+}
+
+
+class SearchService:
+    """Service tìm kiếm full-text"""
+    
+    @staticmethod
+    def normalize(value):
+        """
+        Chuẩn hóa văn bản để so khớp: chữ thường, bỏ dấu, gộp khoảng trắng
+        
+        Usage:
+            SearchService.normalize('Nguyễn Văn Đức')  # 'nguyen van duc'
+        """
+        if not value:
+            return ''
+        value = str(value).replace('đ', 'd').replace('Đ', 'D')
+        value = unicodedata.normalize('NFD', value)
+        value = ''.join(char for char in value if not unicodedata.combining(char))
+        return ' '.join(value.lower().split())
+    
+    @staticmethod
+    def terms(query):
+        """Tách chuỗi tìm kiếm thành các từ đã chuẩn hóa (bỏ ký tự đặc biệt của FTS)"""
+        return [term for term in re.split(r'[\s"]+', SearchService.normalize(query)) if term]
+    
+    # ============================================
+    # TẠO / ĐỒNG BỘ INDEX
+    # ============================================
+    @staticmethod
+    def is_indexed(connection):
+        """Dialect của connection / engine có bảng index hay không"""
+        return connection.dialect.name in INDEXED_DIALECTS
+    
+    @staticmethod
+    def create_tables(connection, rebuild_new=True):
+        """
+        Tạo các bảng index nếu chưa có; bảng vừa tạo được nạp dữ liệu hiện có
+        
+        Args:
+            connection: Connection (trong transaction)
+            rebuild_new: Nạp dữ liệu cho bảng mới tạo (database cũ đã có dữ liệu)
+        """
+        dialect = connection.dialect.name
+        if not SearchService.is_indexed(connection):
+            return
+        if dialect == 'postgresql':
+            connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        
+        existing = set(inspect(connection).get_table_names())
+        for index in SEARCH_INDEXES.values():
+            if index.table_name in existing:
+                continue
+            
+            if dialect == 'sqlite':
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE {index.table_name} "
+                    f"USING fts5({', '.join(index.fields)}, tokenize='trigram')"
+                ))
+            else:
+                connection.execute(text(
+                    f"CREATE TABLE {index.table_name} (rowid INTEGER PRIMARY KEY, "
+                    f"{', '.join(f'{field} TEXT' for field in index.fields)}, document TEXT NOT NULL)"
+                ))
+                connection.execute(text(
+                    f"CREATE INDEX ix_{index.table_name}_trgm ON {index.table_name} "
+                    f"USING gin (document gin_trgm_ops)"
+                ))
+            
+            if rebuild_new:
+                SearchService.rebuild(connection, [index])
+    
+    @staticmethod
+    def rebuild(connection=None, indexes=None):
+        """
+        Dựng lại toàn bộ index từ bảng gốc (sau import/xóa hàng loạt)
+        
+        Returns:
+            Số dòng đã index (0 nếu dialect không có bảng index)
+        """
+        connection = connection or db.session.connection()
+        if not SearchService.is_indexed(connection):
+            return 0
+        total = 0
+        for index in indexes or SEARCH_INDEXES.values():
+            connection.execute(index.table.delete())
+            rows = connection.execute(select(index.model.id, *(getattr(index.model, f) for f in index.fields)))
+            for row in rows.all():
+                SearchService._write(connection, index, row.id, row._mapping)
+                total += 1
+        return total
+    
+    @staticmethod
+    def _write(connection, index, rowid, source):
+        values = {field: SearchService.normalize(source[field]) for field in index.fields}
+        if connection.dialect.name == 'postgresql':
+            values['document'] = ' '.join(values.values())
+        connection.execute(index.table.insert().values(rowid=rowid, **values))
+    
+    @staticmethod
+    def _delete(connection, index, rowid):
+        connection.execute(index.table.delete().where(index.table.c.rowid == rowid))
+    
+    # ============================================
+    # TÌM KIẾM
+    # ============================================
+    @staticmethod
+    def matches(name, query):
+        """
+        Subquery (id, rank) các bản ghi khớp chuỗi tìm kiếm
+        
+        Mọi từ đều phải khớp (AND). rank nhỏ hơn = khớp tốt hơn.
+        
+        Args:
+            name: 'tenants' hoặc 'rooms'
+            query: Chuỗi người dùng nhập
+        
+        Returns:
+            Subquery có cột id, rank; hoặc None nếu chuỗi rỗng
+        """
+        terms = SearchService.terms(query)
+        if not terms:
+            return None
+        
+        index = SEARCH_INDEXES[name]
+        if not SearchService.is_indexed(db.engine):
+            return SearchService._like_matches(index, terms)
+        
+        fts = index.table
+        long_terms = [t for t in terms if len(t) >= MIN_TRIGRAM_LENGTH]
+        short_terms = [t for t in terms if len(t) < MIN_TRIGRAM_LENGTH]
+        
+        if db.engine.dialect.name == 'postgresql':
+            rank = -func.word_similarity(' '.join(terms), fts.c.document)
+            conditions = [fts.c.document.contains(term, autoescape=True) for term in terms]
+        else:
+            conditions = [
+                or_(*(fts.c[field].contains(term, autoescape=True) for field in index.fields))
+                for term in short_terms
+            ]
+            if long_terms:
+                match = ' AND '.join(f'"{term}"' for term in long_terms)
+                conditions.append(literal_column(index.table_name).match(match))
+                rank = func.bm25(literal_column(index.table_name), *index.weights)
+            else:
+                rank = literal_column('0')
+        
+        return select(fts.c.rowid.label('id'), rank.label('rank'))\
+            .where(and_(*conditions))\
+            .subquery(f'{index.table_name}_matches')
+    
+    @staticmethod
+    def _like_matches(index, terms):
+        """Không có bảng index: mọi từ khớp (ILIKE) ít nhất 1 cột của bảng gốc, không xếp hạng"""
+        model = index.model
+        conditions = [
+            or_(*(getattr(model, field).icontains(term, autoescape=True) for field in index.fields))
+            for term in terms
+        ]
+        return select(model.id.label('id'), literal_column('0').label('rank'))\
+            .where(and_(*conditions))\
+            .subquery(f'{index.table_name}_matches')
+    
+    @staticmethod
+    def filter(query, name, search):
+        """
+        Lọc query theo chuỗi tìm kiếm (không sắp xếp)
+        
+        Returns:
+            (query, cột rank) - rank là None nếu chuỗi rỗng (không lọc)
+        """
+        matches = SearchService.matches(name, search)
+        if matches is None:
+            return query, None
+        
+        model = SEARCH_INDEXES[name].model
+        return query.join(matches, matches.c.id == model.id), matches.c.rank
+    
+    @staticmethod
+    def apply(query, name, search, *order_by):
+        """
+        Lọc query theo chuỗi tìm kiếm, kết quả xếp theo độ khớp rồi tới order_by
+        
+        Args:
+            query: Query của model tương ứng (Tenant.query, Room.query...)
+            name: 'tenants' hoặc 'rooms'
+            search: Chuỗi tìm kiếm (rỗng = không lọc)
+            order_by: Thứ tự phụ (hoặc thứ tự chính khi không tìm kiếm)
+        
+        Usage:
+            query = SearchService.apply(Tenant.query, 'tenants', 'nguyen 0901', Tenant.full_name)
+        """
+        query, rank = SearchService.filter(query, name, search)
+        if rank is None:
+            return query.order_by(*order_by)
+        return query.order_by(rank, *order_by)
+
+
+# ============================================
+# ĐỒNG BỘ THEO MODEL EVENTS
+# ============================================
+def _register(index):
+    @event.listens_for(index.model, 'after_insert')
+    def _after_insert(mapper, connection, target):
+        if SearchService.is_indexed(connection):
+            SearchService._write(connection, index, target.id, index.source(target))
+    
+    @event.listens_for(index.model, 'after_update')
+    def _after_update(mapper, connection, target):
+        if not SearchService.is_indexed(connection):
+            return
+        state = inspect(target)
+        if any(state.attrs[field].history.has_changes() for field in index.fields):
+            SearchService._delete(connection, index, target.id)
+            SearchService._write(connection, index, target.id, index.source(target))
+    
+    @event.listens_for(index.model, 'after_delete')
+    def _after_delete(mapper, connection, target):
+        if SearchService.is_indexed(connection):
+            SearchService._delete(connection, index, target.id)
+
+
+for _index in SEARCH_INDEXES.values():
+    _register(_index)
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_tables(target, connection, **kw):
+    """db.create_all() cũng tạo bảng index (database mới hoặc database cũ chưa có index)"""
+    SearchService.create_tables(connection)
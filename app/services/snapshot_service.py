@@ -0,0 +1,332 @@
+"""
+Snapshot Service - Bảng monthly_snapshots: số liệu báo cáo đã tính sẵn theo tháng
+
+- Báo cáo doanh thu / công suất / khách thuê đọc từ snapshot thay vì tổng hợp
+  lại toàn bộ hóa đơn, khách thuê, phòng mỗi lần xem
+- Ghi hóa đơn (kể cả thanh toán: apply_payment cập nhật hóa đơn) → đánh dấu
+  (dirty) tháng của kỳ hóa đơn; ghi khách thuê / phòng → đánh dấu từ tháng của
+  ngày vào ở / chuyển đi / tạo phòng bị đổi (cũ hoặc mới) tới tháng hiện tại.
+  Đánh dấu bằng 1 câu UPDATE ngay trước COMMIT của transaction ghi (before_commit,
+  như data_versions): cờ commit / rollback cùng dữ liệu, transaction ghi (thanh
+  toán) không tính lại và chỉ giữ lock dòng snapshot trong lúc commit
+- Tháng bị đánh dấu được tính lại ở lần đọc kế tiếp (get_months), ghi bằng upsert
+- Tháng đã qua được chốt (closed) ở lần đọc đầu tiên sau khi hết tháng và không
+  bị tính lại khi đọc nữa. Thanh toán trễ cho hóa đơn của tháng đã chốt vẫn
+  đánh dấu tháng đó (để doanh thu khớp với hóa đơn)
+- Thay đổi bỏ qua ORM (SQL trực tiếp, import) → chạy `flask snapshots-rebuild`
+"""
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models import Invoice, MonthlySnapshot, Room, Tenant
+from app.utils.db import upsert
+from sqlalchemy import and_, case, event, func, inspect, or_, select
+from sqlalchemy.orm import Session
+
+# session.info: các tháng bị thay đổi trong transaction hiện tại (đánh dấu khi commit)
+_TOUCHED_KEY = 'snapshot_touched_months'
+
+_SNAPSHOT_FIELDS = (
+    'receivable', 'collected', 'paid_revenue', 'invoices_total', 'invoices_paid', 'invoices_partial', 'invoices_unpaid',
+    'total_rooms', 'occupied_rooms', 'maintenance_rooms', 'total_tenants', 'active_tenants', 'new_tenants'
+)
+
+
+def _month_start(year, month):
+    return date(year, month, 1)
+
+
+def _next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+class SnapshotService:
+    """Service quản lý số liệu tổng hợp theo tháng"""
+    
+    @staticmethod
+    def is_past(year, month, now=None):
+        """Tháng đã kết thúc chưa"""
+        now = now or datetime.now()
+        return (year, month) < (now.year, now.month)
+    
+    @staticmethod
+    def compute(connection, year, month, now=None):
+        """
+        Tính số liệu 1 tháng từ dữ liệu gốc (3 câu query)
+        
+        Phòng/khách thuê tính tại cuối tháng (tháng hiện tại: tại thời điểm tính)
+        theo ngày vào ở / chuyển đi.
+        
+        Args:
+            connection: Connection (trong transaction hiện tại)
+            year, month: Kỳ cần tính
+        
+        Returns:
+            Dict các cột của MonthlySnapshot
+        """
+        now = now or datetime.now()
+        start = _month_start(year, month)
+        end = _month_start(*_next_month(year, month))
+        if not SnapshotService.is_past(year, month, now):
+            end = min(end, now.date() + timedelta(days=1))
+        
+        # Hóa đơn của kỳ (index ix_invoices_year_month)
+        invoices = connection.execute(
+            select(
+                func.coalesce(func.sum(Invoice.total_amount), 0),
+                func.coalesce(func.sum(Invoice.paid_amount), 0),
+                func.coalesce(func.sum(case((Invoice.status == 'paid', Invoice.total_amount))), 0),
+                func.count(Invoice.id),
+                func.count(case((Invoice.status == 'paid', 1))),
+                func.count(case((Invoice.status == 'partial', 1))),
+                func.count(case((Invoice.status == 'unpaid', 1)))
+            ).where(Invoice.year == year, Invoice.month == month)
+        ).one()
+        
+        # Khách đang ở tại cuối tháng: đã vào ở, chưa chuyển đi
+        moved_in = Tenant.move_in_date < end
+        active = and_(moved_in, or_(
+            Tenant.move_out_date >= end,
+            and_(Tenant.move_out_date.is_(None), Tenant.status == 'active')
+        ))
+        tenants = connection.execute(
+            select(
+                func.count(case((moved_in, 1))),
+                func.count(case((active, 1))),
+                func.count(func.distinct(case((active, Tenant.room_id)))),
+                func.count(case((and_(Tenant.move_in_date >= start, moved_in), 1)))
+            )
+        ).one()
+        
+        # Phòng đã có tại cuối tháng; trạng thái sửa chữa chỉ có giá trị hiện tại
+        rooms = connection.execute(
+            select(
+                func.count(case((or_(Room.created_at.is_(None), Room.created_at < end), 1))),
+                func.count(case((Room.status == 'maintenance', 1)))
+            )
+        ).one()
+        
+        return dict(zip(_SNAPSHOT_FIELDS, (
+            int(invoices[0]), int(invoices[1]), int(invoices[2]),
+            invoices[3], invoices[4], invoices[5], invoices[6],
+            rooms[0], tenants[2], rooms[1], tenants[0], tenants[1], tenants[3]
+        )))
+    
+    @staticmethod
+    def refresh(year, month, connection=None, close=None, now=None):
+        """
+        Tính lại và ghi (upsert) snapshot của 1 tháng
+        
+        Dòng snapshot được giữ chỗ và xóa cờ dirty TRƯỚC khi tính: ghi nào commit
+        sau câu đó sẽ đánh dấu lại tháng (PostgreSQL: chờ lock dòng tới khi
+        transaction này commit), nên không mất thay đổi.
+        
+        Args:
+            year, month: Kỳ cần làm mới
+            connection: Connection (mặc định: transaction của db.session)
+            close: Chốt tháng (mặc định: chốt nếu tháng đã qua)
+        """
+        now = now or datetime.now()
+        connection = connection if connection is not None else db.session.connection()
+        table = MonthlySnapshot.__table__
+        upsert(connection, table, ['year', 'month'],
+               {'year': year, 'month': month, 'dirty': False}, {'dirty': False})
+        
+        values = SnapshotService.compute(connection, year, month, now)
+        values['closed'] = SnapshotService.is_past(year, month, now) if close is None else close
+        values['refreshed_at'] = datetime.utcnow()
+        connection.execute(
+            table.update().where(table.c.year == year, table.c.month == month).values(**values)
+        )
+        return values
+    
+    @staticmethod
+    def refresh_months(months, connection=None, now=None):
+        """Làm mới các tháng bị thay đổi (bỏ qua tháng chưa có hóa đơn/khách)"""
+        for year, month in sorted(months):
+            if year and month:
+                SnapshotService.refresh(year, month, connection=connection, now=now)
+    
+    @staticmethod
+    def touch(session, months):
+        """
+        Ghi nhận các tháng bị thay đổi trong transaction của session; đánh dấu
+        dirty lúc commit, trong cùng transaction (rollback thì bỏ)
+        
+        Dùng cho thao tác bỏ qua flush (INSERT hàng loạt qua session.execute).
+        """
+        session.info.setdefault(_TOUCHED_KEY, set()).update(
+            (year, month) for year, month in months if year and month
+        )
+    
+    @staticmethod
+    def mark_dirty(months, connection):
+        """Đánh dấu các tháng cần tính lại (tháng chưa có snapshot sẽ được tạo khi đọc)"""
+        table = MonthlySnapshot.__table__
+        connection.execute(
+            table.update()
+            .where(or_(*(and_(table.c.year == year, table.c.month == month) for year, month in months)))
+            .values(dirty=True)
+        )
+    
+    # ============================================
+    # ĐỌC SNAPSHOT
+    # ============================================
+    @staticmethod
+    def get_months(months, now=None):
+        """
+        Snapshot của các tháng, tự tạo tháng còn thiếu, tính lại tháng bị đánh
+        dấu và chốt tháng đã qua
+        
+        Tháng tương lai không được tạo (trả về None).
+        
+        Args:
+            months: List tuple (year, month)
+        
+        Returns:
+            Dict {(year, month): MonthlySnapshot hoặc None}
+        """
+        now = now or datetime.now()
+        months = list(months)
+        years = {year for year, _ in months}
+        
+        def load():
+            rows = MonthlySnapshot.query.filter(MonthlySnapshot.year.in_(years)).all()
+            return {(row.year, row.month): row for row in rows}
+        
+        snapshots = load()
+        stale = [
+            (year, month) for year, month in months
+            if (year, month) <= (now.year, now.month)
+            and ((year, month) not in snapshots
+                 or snapshots[(year, month)].dirty
+                 or (not snapshots[(year, month)].closed and SnapshotService.is_past(year, month, now)))
+        ]
+        if stale:
+            SnapshotService.refresh_months(stale, now=now)
+            db.session.commit()
+            snapshots = load()
+        
+        return {key: snapshots.get(key) for key in months}
+    
+    @staticmethod
+    def get_month(year, month, now=None):
+        """Snapshot của 1 tháng (None nếu là tháng tương lai)"""
+        return SnapshotService.get_months([(year, month)], now=now)[(year, month)]
+    
+    @staticmethod
+    def get_current(now=None):
+        """Snapshot tháng hiện tại"""
+        now = now or datetime.now()
+        return SnapshotService.get_month(now.year, now.month, now=now)
+    
+    @staticmethod
+    def get_year(year, now=None):
+        """Snapshot 12 tháng của 1 năm: {month: MonthlySnapshot hoặc None}"""
+        snapshots = SnapshotService.get_months([(year, m) for m in range(1, 13)], now=now)
+        return {month: snapshots[(year, month)] for month in range(1, 13)}
+    
+    # ============================================
+    # BACKFILL
+    # ============================================
+    @staticmethod
+    def rebuild(force=False, now=None):
+        """
+        Tính snapshot cho mọi tháng từ dữ liệu sớm nhất tới tháng hiện tại
+        
+        Args:
+            force: Tính lại cả các tháng đã chốt
+        
+        Returns:
+            Số tháng đã tính
+        """
+        now = now or datetime.now()
+        first_invoice = db.session.query(Invoice.year, Invoice.month)\
+            .order_by(Invoice.year, Invoice.month).first()
+        first_move_in = db.session.query(func.min(Tenant.move_in_date)).scalar()
+        
+        candidates = [(now.year, now.month)]
+        if first_invoice:
+            candidates.append((first_invoice.year, first_invoice.month))
+        if first_move_in:
+            candidates.append((first_move_in.year, first_move_in.month))
+        
+        closed = set() if force else {
+            (row.year, row.month)
+            for row in db.session.query(MonthlySnapshot.year, MonthlySnapshot.month)
+            .filter(MonthlySnapshot.closed.is_(True))
+        }
+        
+        year, month = min(candidates)
+        count = 0
+        while (year, month) <= (now.year, now.month):
+            if (year, month) not in closed:
+                SnapshotService.refresh(year, month, now=now)
+                count += 1
+            year, month = _next_month(year, month)
+        
+        db.session.commit()
+        return count
+
+
+# ============================================
+# LÀM MỚI KHI GHI DỮ LIỆU
+# ============================================
+# Cột ngày quyết định khách thuê / phòng được tính vào những tháng nào
+_DATE_FIELDS = {Tenant: ('move_in_date', 'move_out_date'), Room: ('created_at',)}
+
+
+def _changed_dates(obj, fields, whole):
+    """Giá trị cũ + mới của các cột ngày bị đổi (whole: mọi cột - thêm / xóa dòng)"""
+    attrs = inspect(obj).attrs
+    for field in fields:
+        history = attrs[field].history
+        if whole or history.has_changes():
+            yield from (value for value in history.sum() if value)
+
+
+def _months_since(start, now):
+    """Các tháng từ tháng của ngày start tới tháng hiện tại"""
+    year, month = start.year, start.month
+    while (year, month) < (now.year, now.month):
+        yield year, month
+        year, month = _next_month(year, month)
+    yield now.year, now.month
+
+
+@event.listens_for(Session, 'after_flush')
+def _touch_flushed_months(session, flush_context):
+    """
+    Ghi nhận tháng bị ảnh hưởng bởi hóa đơn / khách thuê / phòng vừa thay đổi (không chạy SQL)
+    
+    Khách thuê / phòng: mọi tháng từ ngày sớm nhất (cũ hoặc mới) trong các cột
+    ngày bị đổi tới tháng hiện tại - VD: nhập chuyển đi 15/8 vào tháng 10 đánh
+    dấu cả tháng 8, 9 đã chốt. Thay đổi khác chỉ đánh dấu tháng hiện tại.
+    """
+    now = datetime.now()
+    months = set()
+    deleted = set(session.deleted)
+    for obj in (*session.new, *session.dirty, *deleted):
+        if isinstance(obj, Invoice):
+            months.add((obj.year, obj.month))
+        elif isinstance(obj, (Tenant, Room)):
+            whole = obj in deleted or obj in session.new
+            dates = list(_changed_dates(obj, _DATE_FIELDS[type(obj)], whole))
+            months.update(_months_since(min(dates, default=now), now))
+    
+    if months:
+        SnapshotService.touch(session, months)
+
+
+@event.listens_for(Session, 'before_commit')
+def _mark_touched_months(session):
+    """Đánh dấu dirty trong transaction sắp commit: cờ commit / rollback cùng dữ liệu"""
+    session.flush()  # flush cuối của commit() chạy SAU before_commit
+    months = session.info.pop(_TOUCHED_KEY, None)
+    if months:
+        SnapshotService.mark_dirty(months, session.connection())
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_touched_months(session):
+    session.info.pop(_TOUCHED_KEY, None)
@@ -4,7 +4,8 @@ Tenant Service - Business logic cho quản lý khách thuê
 from app import db
 from app.models import Tenant, Room
 from datetime import datetime
-from sqlalchemy import or_
+from app.services.search_service import SearchService
+from sqlalchemy.orm import joinedload
 
 
 class TenantService:
@@ -24,23 +25,18 @@ class TenantService:
         Returns:
             Pagination object
         """
-        query = Tenant.query
+        # Nạp sẵn phòng cho cả trang (tránh N+1)
+        query = Tenant.query.options(joinedload(Tenant.room))
         
         # Áp dụng filter
-        if search:
-            query = query.filter(
-                or_(
-                    Tenant.full_name.ilike(f'%{search}%'),
-                    Tenant.id_number.ilike(f'%{search}%'),
-                    Tenant.phone.ilike(f'%{search}%')
-                )
-            )
-        
         if status:
             query = query.filter(Tenant.status == status)
         
-        # Sắp xếp và phân trang
-        return query.order_by(Tenant.created_at.desc()).paginate(
+        # Tìm kiếm full-text (không dấu), xếp theo độ khớp rồi ngày tạo
+        query = SearchService.apply(query, 'tenants', search, Tenant.created_at.desc())
+        
+        # Phân trang
+        return query.paginate(
             page=page, per_page=per_page, error_out=False
         )
     
@@ -0,0 +1,109 @@
+"""
+Data Version Service - Số phiên bản ghi của từng bảng (write version counter)
+
+Các bảng có thêm/sửa/xóa object (và INSERT/UPDATE/DELETE hàng loạt) trong
+transaction được ghi nhận khi flush, rồi tăng version 1 lần lúc commit
+(before_commit, ngay trước COMMIT): lock dòng data_versions chỉ giữ trong lúc
+commit, không suốt transaction ghi. Đọc version tốn 1 query theo khóa chính, nên API dùng làm ETag:
+dữ liệu không đổi → ETag không đổi → 304 mà không cần query dữ liệu.
+
+Khác max(updated_at): bắt được cả thao tác xóa, và mọi bảng đều dùng được
+(chỉ rooms có cột updated_at).
+"""
+import hashlib
+
+from app import db
+from app.models import DataVersion
+from app.utils.db import upsert
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# session.info: các bảng bị ghi trong transaction hiện tại (tăng version khi commit)
+_CHANGED_KEY = 'data_versions_changed'
+
+
+class DataVersionService:
+    """Service đọc / tăng số phiên bản ghi"""
+    
+    @staticmethod
+    def get(names):
+        """
+        Version hiện tại của các bảng
+        
+        Args:
+            names: Tên bảng (VD: ['invoices', 'rooms'])
+            
+        Returns:
+            Dict {tên bảng: version} (bảng chưa từng ghi = 0)
+        """
+        names = list(names)
+        rows = db.session.query(DataVersion.name, DataVersion.version)\
+            .filter(DataVersion.name.in_(names)).all()
+        versions = dict.fromkeys(names, 0)
+        versions.update(rows)
+        return versions
+    
+    @staticmethod
+    def etag(names, *parts):
+        """
+        ETag từ version của các bảng + các thành phần khác (URL, ngày...)
+        
+        Usage:
+            DataVersionService.etag(['invoices', 'rooms'], request.full_path)
+        """
+        versions = DataVersionService.get(names)
+        key = '|'.join([*(f'{name}:{versions[name]}' for name in sorted(versions)), *map(str, parts)])
+        return hashlib.sha1(key.encode()).hexdigest()[:20]
+    
+    @staticmethod
+    def bump(connection, names):
+        """Tăng version của các bảng (trong transaction của connection)"""
+        table = DataVersion.__table__
+        # Thứ tự cố định: tránh deadlock giữa 2 transaction (PostgreSQL)
+        for name in sorted(names):
+            upsert(connection, table, ['name'], {'name': name, 'version': 1}, {'version': table.c.version + 1})
+
+
+# ============================================
+# TĂNG VERSION KHI GHI DỮ LIỆU
+# ============================================
+_UNTRACKED = {DataVersion.__tablename__}
+
+
+def _record(session, names):
+    session.info.setdefault(_CHANGED_KEY, set()).update(names)
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_flushed(session, flush_context):
+    """Ghi nhận các bảng có object vừa được thêm / sửa / xóa"""
+    changed = [*session.new, *session.deleted]
+    changed += [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    names = {obj.__table__.name for obj in changed if hasattr(obj, '__table__')} - _UNTRACKED
+    if names:
+        _record(session, names)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_statement(orm_execute_state):
+    """INSERT/UPDATE/DELETE qua session.execute (hàng loạt, bỏ qua flush): ghi nhận bảng bị ghi"""
+    state = orm_execute_state
+    if not (state.is_insert or state.is_update or state.is_delete) or state.bind_mapper is None:
+        return
+    name = state.bind_mapper.local_table.name
+    if name not in _UNTRACKED:
+        _record(state.session, {name})
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_committed(session):
+    """Tăng version 1 lần cho mỗi bảng bị ghi, trong transaction sắp commit"""
+    session.flush()  # flush cuối của commit() chạy SAU before_commit
+    names = session.info.pop(_CHANGED_KEY, None)
+    if names:
+        DataVersionService.bump(session.connection(), names)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changes(session):
+    session.info.pop(_CHANGED_KEY, None)
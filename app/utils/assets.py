@@ -0,0 +1,582 @@
+"""
+Static Assets - Build và phục vụ CSS/JS đã minify, gắn hash, nén sẵn
+
+Vendor (python build_assets.py --vendor):
+    Tải Bootstrap, bootstrap-icons, flatpickr, Chart.js (bản cố định) về app/static/vendor/
+
+Build (python build_assets.py):
+    Mỗi bundle trong ASSET_BUNDLES → app/static/dist/<tên>.<hash>.<ext> (+ .gz, .br)
+    - css/bundle.css = Bootstrap (chỉ giữ class templates có dùng) + icons + flatpickr + style.css
+    - js/bundle.js   = Bootstrap JS + flatpickr + main.js
+    app/static/dist/manifest.json: {"css/bundle.css": "dist/css/bundle.<hash>.css", ...}
+
+Runtime (init_assets):
+    - Jinja helper asset_url('css/style.css') đọc manifest; chưa build thì trả
+      file gốc (hoặc CDN với thư viện ngoài chưa vendor)
+    - has_asset('css/bundle.css'): base.html chọn bundle local hay CDN
+    - File trong dist/ được cache 1 năm (immutable) vì tên file đổi khi nội dung đổi
+    - Gửi bản .br/.gz nén sẵn nếu trình duyệt hỗ trợ (Accept-Encoding)
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import urllib.request
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # tùy chọn: không có thì chỉ tạo bản .gz
+    brotli = None
+
+CDN = 'https://cdn.jsdelivr.net/npm'
+
+# Thư viện ngoài (phiên bản cố định): đường dẫn trong app/static/vendor → URL tải về
+VENDOR_DIR = 'vendor'
+VENDOR_FILES = {
+    'bootstrap/bootstrap.min.css': f'{CDN}/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'bootstrap/bootstrap.bundle.min.js': f'{CDN}/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'bootstrap-icons/bootstrap-icons.css': f'{CDN}/bootstrap-icons@1.11.0/font/bootstrap-icons.css',
+    'bootstrap-icons/fonts/bootstrap-icons.woff2': f'{CDN}/bootstrap-icons@1.11.0/font/fonts/bootstrap-icons.woff2',
+    'bootstrap-icons/fonts/bootstrap-icons.woff': f'{CDN}/bootstrap-icons@1.11.0/font/fonts/bootstrap-icons.woff',
+    'flatpickr/flatpickr.min.css': f'{CDN}/flatpickr@4.6.13/dist/flatpickr.min.css',
+    'flatpickr/flatpickr.min.js': f'{CDN}/flatpickr@4.6.13/dist/flatpickr.min.js',
+    'chart.js/chart.umd.min.js': f'{CDN}/chart.js@4.4.0/dist/chart.umd.min.js',
+}
+
+# Các file build ra: tên logic → danh sách file nguồn (trong app/static), nối theo thứ tự
+ASSET_BUNDLES = {
+    'css/style.css': ['css/style.css'],
+    'js/main.js': ['js/main.js'],
+    'css/bundle.css': [
+        'vendor/bootstrap/bootstrap.min.css',
+        'vendor/bootstrap-icons/bootstrap-icons.css',
+        'vendor/flatpickr/flatpickr.min.css',
+        'css/style.css',
+    ],
+    'js/bundle.js': [
+        'vendor/bootstrap/bootstrap.bundle.min.js',
+        'vendor/flatpickr/flatpickr.min.js',
+        'js/main.js',
+    ],
+    'js/chart.js': ['vendor/chart.js/chart.umd.min.js'],
+}
+
+# Các bundle thay cho CDN: đủ cả 3 thì CSP chỉ cần 'self'
+VENDOR_BUNDLES = ('css/bundle.css', 'js/bundle.js', 'js/chart.js')
+
+# Chỉ giữ các rule có class được templates/JS dùng tới
+PURGE_SOURCES = {'vendor/bootstrap/bootstrap.min.css', 'vendor/bootstrap-icons/bootstrap-icons.css'}
+
+# Class do Bootstrap JS tự thêm lúc chạy (không xuất hiện trong templates)
+PURGE_SAFELIST_PREFIXES = (
+    'show', 'hide', 'fade', 'collaps', 'active', 'disabled', 'bs-', 'tooltip', 'popover',
+    'modal', 'toast', 'dropdown', 'offcanvas', 'carousel', 'was-validated', 'is-valid', 'is-invalid',
+)
+
+# Khi chưa vendor/build: thư viện ngoài vẫn lấy từ CDN
+CDN_FALLBACKS = {
+    'js/chart.js': VENDOR_FILES['chart.js/chart.umd.min.js'],
+}
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Thứ tự ưu tiên khi trình duyệt hỗ trợ nhiều kiểu nén
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+IMMUTABLE_MAX_AGE = 31536000  # 1 năm
+
+
+# ============================================
+# MINIFY
+# ============================================
+_CHARSET = re.compile(r'@charset\s+"[^"]*"\s*;')
+
+
+def hoist_charset(css):
+    """@charset chỉ hợp lệ ở đầu file: bỏ mọi @charset (file nối, sau comment bản quyền) rồi đặt 1 cái lên đầu"""
+    match = _CHARSET.search(css)
+    if not match:
+        return css
+    return match.group(0) + _CHARSET.sub('', css)
+
+
+def minify_css(css_content):
+    """Minify CSS: bỏ comment và khoảng trắng thừa"""
+    # Remove comments
+    css_content = re.sub(r'/\*.*?\*/', '', css_content, flags=re.DOTALL)
+
+    # Remove whitespace
+    css_content = re.sub(r'\s+', ' ', css_content)
+
+    # Remove spaces around special characters (không gồm '+' để giữ calc(a + b))
+    css_content = re.sub(r'\s*([{}:;,>~])\s*', r'\1', css_content)
+
+    # Remove trailing semicolons
+    css_content = re.sub(r';}', '}', css_content)
+
+    return css_content.strip()
+
+
+# Token đứng trước mà sau nó '/' mở regex (không phải phép chia)
+_JS_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^}')
+_JS_REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw',
+                      'case', 'do', 'else', 'yield', 'await'}
+
+
+def _js_literal_end(js, start):
+    """Vị trí ngay sau chuỗi '...', "..." hoặc template `...` bắt đầu tại js[start]"""
+    quote, index = js[start], start + 1
+    while index < len(js):
+        char = js[index]
+        if char == '\\':
+            index += 2
+            continue
+        if char == quote:
+            return index + 1
+        if quote == '`' and js.startswith('${', index):
+            index = _js_expression_end(js, index + 2)
+            continue
+        if quote != '`' and char == '\n':
+            return index  # chuỗi không đóng: dừng ở cuối dòng
+        index += 1
+    return len(js)
+
+
+def _js_expression_end(js, start):
+    """Vị trí ngay sau '}' đóng biểu thức ${...} trong template (bỏ qua chuỗi lồng bên trong)"""
+    depth, index = 1, start
+    while index < len(js):
+        char = js[index]
+        if char in '\'"`':
+            index = _js_literal_end(js, index)
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return index + 1
+        index += 1
+    return len(js)
+
+
+def _js_regex_end(js, start):
+    """Vị trí ngay sau regex /.../ bắt đầu tại js[start]; None nếu không đóng trên cùng dòng"""
+    index, in_class = start + 1, False
+    while index < len(js):
+        char = js[index]
+        if char == '\\':
+            index += 2
+            continue
+        if char == '\n':
+            return None
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            return index + 1
+        index += 1
+    return None
+
+
+def minify_js(js_content):
+    """
+    Minify JS an toàn: bỏ comment, thụt lề, khoảng trắng thừa và dòng trống
+
+    Quét theo token: chuỗi, template literal và regex được giữ nguyên (kể cả
+    '/*' hay '//' nằm bên trong). Giữ xuống dòng để không phá cơ chế tự chèn
+    dấu ';' (ASI)
+    """
+    output = []
+    pending = ''    # khoảng trắng / comment vừa bỏ qua: '\n' nếu có xuống dòng, ngược lại ' '
+    previous = ''   # token có nghĩa gần nhất: quyết định '/' là regex hay phép chia
+    index, length = 0, len(js_content)
+
+    while index < length:
+        char = js_content[index]
+        end = None
+
+        if char.isspace() or js_content.startswith(('//', '/*'), index):
+            if char.isspace():
+                end = index + 1
+            elif js_content.startswith('//', index):
+                end = js_content.find('\n', index)
+                end = length if end == -1 else end
+            else:
+                end = js_content.find('*/', index + 2)
+                end = length if end == -1 else end + 2
+            skipped = js_content[index:end]
+            pending = '\n' if pending == '\n' or '\n' in skipped else ' '
+            index = end
+            continue
+
+        if char in '\'"`':
+            end, token = _js_literal_end(js_content, index), 'literal'
+        elif char == '/' and (not previous or previous in _JS_REGEX_AFTER or previous in _JS_REGEX_KEYWORDS):
+            end, token = _js_regex_end(js_content, index), 'literal'
+        if end is None:
+            if char.isalnum() or char in '_$':
+                end = index + 1
+                while end < length and (js_content[end].isalnum() or js_content[end] in '_$'):
+                    end += 1
+            else:
+                end = index + 1
+            token = js_content[index:end]
+
+        if pending and output:
+            output.append(pending)
+        pending = ''
+        output.append(js_content[index:end])
+        previous = token
+        index = end
+
+    return ''.join(output)
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+# ============================================
+# PURGE (bỏ CSS không dùng)
+# ============================================
+def collect_used_classes(roots, extensions=('.html', '.js', '.py')):
+    """
+    Gom các từ có thể là class CSS trong templates/JS/Python
+
+    Lấy mọi từ dạng định danh (thừa còn hơn thiếu) và các tiền tố ghép
+    động như "bg-{{ ... }}" hoặc `bg-${type}`.
+
+    Returns:
+        Tuple (set các từ, set các tiền tố động)
+    """
+    words, prefixes = set(), set()
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in (VENDOR_DIR, DIST_DIR, '__pycache__')]
+            for filename in filenames:
+                if not filename.endswith(extensions):
+                    continue
+                with open(os.path.join(dirpath, filename), 'r', encoding='utf-8') as f:
+                    text = f.read()
+                words.update(re.findall(r'[A-Za-z_][\w-]*', text))
+                prefixes.update(re.findall(r'([A-Za-z][\w-]*-)(?:\{\{|\{%|\$\{)', text))
+    return words, prefixes
+
+
+def _split_top_level(text, separator=','):
+    """Tách theo dấu phẩy không nằm trong ngoặc: a,:is(b,c) → [a, :is(b,c)]"""
+    parts, depth, start = [], 0, 0
+    for index, char in enumerate(text):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:index])
+            start = index + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _find_block_end(css, start):
+    """Vị trí '}' đóng khối mở tại css[start] == '{' (bỏ qua chuỗi trong nháy)"""
+    depth, index, quote = 0, start, None
+    while index < len(css):
+        char = css[index]
+        if quote:
+            if char == '\\':
+                index += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return index
+        index += 1
+    return len(css)
+
+
+def purge_css(css, is_used):
+    """
+    Bỏ các selector có class không dùng tới (dạng PurgeCSS đơn giản)
+
+    - Selector không có class (thẻ, :root, [attr]) luôn được giữ
+    - Class trong ngoặc (:not(.x), :is(.y)) không xét → giữ lại cho chắc
+    - @media/@supports/@layer/@container được lọc đệ quy, at-rule khác giữ nguyên
+
+    Args:
+        css: Nội dung CSS
+        is_used: Hàm(class_name) → bool
+    """
+    # Giữ comment bản quyền /*! ... */, bỏ comment thường
+    licenses = re.findall(r'/\*!.*?\*/', css, flags=re.DOTALL)
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+
+    def selector_used(selector):
+        bare = re.sub(r'\([^()]*\)', '', selector)
+        while '(' in bare:
+            bare = re.sub(r'\([^()]*\)', '', bare)
+        classes = re.findall(r'\.((?:\\.|[\w-])+)', bare)
+        return all(is_used(name.replace('\\', '')) for name in classes)
+
+    def walk(text):
+        output, index = [], 0
+        while index < len(text):
+            brace = text.find('{', index)
+            semicolon = text.find(';', index)
+            if brace == -1:
+                break
+
+            # At-rule dạng câu lệnh: @charset "UTF-8"; @import ...;
+            if text[index:].lstrip().startswith('@') and semicolon != -1 and semicolon < brace:
+                output.append(text[index:semicolon + 1].strip())
+                index = semicolon + 1
+                continue
+
+            end = _find_block_end(text, brace)
+            prelude = text[index:brace].strip()
+            body = text[brace + 1:end]
+            index = end + 1
+
+            if prelude.startswith(('@media', '@supports', '@layer', '@container')):
+                inner = walk(body)
+                if inner:
+                    output.append(f'{prelude}{{{inner}}}')
+            elif prelude.startswith('@'):
+                output.append(f'{prelude}{{{body}}}')
+            else:
+                kept = [s.strip() for s in _split_top_level(prelude) if s.strip() and selector_used(s)]
+                if kept:
+                    output.append(f"{','.join(kept)}{{{body}}}")
+        return ''.join(output)
+
+    return hoist_charset('\n'.join(licenses + [walk(css)]))
+
+
+def make_class_filter(static_dir):
+    """Hàm is_used(class) dựa trên templates, JS và Python của app"""
+    app_dir = os.path.dirname(os.path.abspath(static_dir))
+    words, prefixes = collect_used_classes([app_dir])
+    prefixes = tuple(prefixes) + PURGE_SAFELIST_PREFIXES
+
+    def is_used(name):
+        return name in words or name.startswith(prefixes)
+    return is_used
+
+
+# ============================================
+# BUILD
+# ============================================
+def vendor_assets(static_dir, files=None, timeout=30):
+    """
+    Tải thư viện ngoài (phiên bản cố định trong VENDOR_FILES) về app/static/vendor
+
+    Returns:
+        List tuple (đường dẫn, số byte)
+    """
+    results = []
+    for path, url in (files or VENDOR_FILES).items():
+        target = os.path.join(static_dir, VENDOR_DIR, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            content = response.read()
+        with open(target, 'wb') as f:
+            f.write(content)
+        results.append((f'{VENDOR_DIR}/{path}', len(content)))
+    return results
+
+
+def _rebase_css_urls(css, source, output):
+    """Sửa url(...) tương đối của file nguồn cho đúng khi nằm trong file bundle"""
+    source_dir = os.path.dirname(source)
+    output_dir = os.path.dirname(output)
+
+    def replace(match):
+        quote, url = match.group(1), match.group(2)
+        if re.match(r'^(data:|https?:|/|#)', url):
+            return match.group(0)
+        path, _, suffix = url.partition('?')
+        rebased = os.path.relpath(os.path.normpath(os.path.join(source_dir, path)), output_dir)
+        rebased = rebased.replace(os.sep, '/') + (f'?{suffix}' if suffix else '')
+        return f'url({quote}{rebased}{quote})'
+
+    return re.sub(r'url\(\s*(["\']?)([^"\')]+)\1\s*\)', replace, css)
+
+
+def _build_source(static_dir, source, output, is_used):
+    """Đọc 1 file nguồn: purge/minify (trừ file .min đã minify sẵn), sửa url()"""
+    with open(os.path.join(static_dir, source), 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    ext = os.path.splitext(source)[1]
+    if source in PURGE_SOURCES:
+        content = purge_css(content, is_used)
+    if '.min.' not in os.path.basename(source):
+        content = MINIFIERS.get(ext, lambda text: text)(content)
+    if ext == '.css':
+        content = _rebase_css_urls(content, source, output)
+    return content
+
+
+def build_assets(static_dir, bundles=None, hash_length=10):
+    """
+    Nối + minify, gắn hash nội dung vào tên file và nén sẵn (gzip, brotli)
+
+    Bundle có file nguồn chưa tồn tại (chưa chạy --vendor) sẽ được bỏ qua.
+
+    Args:
+        static_dir: Thư mục static (app/static)
+        bundles: Dict tên → file nguồn (mặc định ASSET_BUNDLES)
+        hash_length: Số ký tự hash trong tên file
+
+    Returns:
+        List dict kết quả: name, output, original, minified, gzip, brotli (bytes),
+        missing (file nguồn còn thiếu, khi bundle bị bỏ qua)
+    """
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    old_manifest = _read_manifest(dist_dir)
+    manifest = {}
+    results = []
+    is_used = None
+
+    for name, sources in (bundles or ASSET_BUNDLES).items():
+        missing = [s for s in sources if not os.path.exists(os.path.join(static_dir, s))]
+        if missing:
+            results.append({'name': name, 'missing': missing})
+            continue
+
+        if is_used is None and PURGE_SOURCES.intersection(sources):
+            is_used = make_class_filter(static_dir)
+
+        base, ext = os.path.splitext(name)
+        separator = '\n' if ext == '.css' else '\n;\n'
+        original = sum(os.path.getsize(os.path.join(static_dir, s)) for s in sources)
+
+        # Tên file output chưa biết (phụ thuộc hash) nhưng cùng thư mục → đủ để sửa url()
+        output_dir = f'{DIST_DIR}/{base}'
+        built = separator.join(_build_source(static_dir, s, output_dir, is_used) for s in sources)
+        if ext == '.css':
+            built = hoist_charset(built)
+        built = built.encode('utf-8')
+
+        digest = hashlib.sha256(built).hexdigest()[:hash_length]
+        output = f'{DIST_DIR}/{base}.{digest}{ext}'
+        output_path = os.path.join(static_dir, output)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        with open(output_path, 'wb') as f:
+            f.write(built)
+
+        gzipped = gzip.compress(built, compresslevel=9, mtime=0)
+        with open(output_path + '.gz', 'wb') as f:
+            f.write(gzipped)
+
+        brotli_size = None
+        if brotli is not None:
+            compressed = brotli.compress(built, quality=11)
+            with open(output_path + '.br', 'wb') as f:
+                f.write(compressed)
+            brotli_size = len(compressed)
+
+        # Xóa bản build cũ của file này (nếu hash đã đổi)
+        previous = old_manifest.get(name)
+        if previous and previous != output:
+            for suffix in ('', '.gz', '.br'):
+                path = os.path.join(static_dir, previous + suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+
+        manifest[name] = output
+        results.append({
+            'name': name,
+            'output': output,
+            'original': original,
+            'minified': len(built),
+            'gzip': len(gzipped),
+            'brotli': brotli_size
+        })
+
+    os.makedirs(dist_dir, exist_ok=True)
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    return results
+
+
+def _read_manifest(dist_dir):
+    path = os.path.join(dist_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# ============================================
+# RUNTIME
+# ============================================
+def has_asset(name):
+    """Đã build file này chưa (VD: base.html chọn bundle local hay CDN)"""
+    return name in current_app.extensions.get('asset_manifest', {})
+
+
+def uses_local_vendor():
+    """Mọi thư viện ngoài đều đã được build thành bundle local (không cần CDN)"""
+    return all(has_asset(name) for name in VENDOR_BUNDLES)
+
+
+def asset_url(filename):
+    """
+    URL của file static, ưu tiên bản đã build trong manifest
+
+    Usage (Jinja):
+        <link rel="stylesheet" href="{{ asset_url('css/style.css') }}">
+    """
+    manifest = current_app.extensions.get('asset_manifest', {})
+    if filename in manifest:
+        return url_for('static', filename=manifest[filename])
+    if filename in CDN_FALLBACKS:
+        return CDN_FALLBACKS[filename]
+    return url_for('static', filename=filename)
+
+
+def _serve_static(filename):
+    """
+    View 'static' thay thế: file trong dist/ được cache immutable 1 năm
+    và gửi bản nén sẵn theo Accept-Encoding
+    """
+    app = current_app
+    if not filename.startswith(DIST_DIR + '/'):
+        return app.send_static_file(filename)
+
+    accepted = request.accept_encodings
+    for encoding, suffix in ENCODINGS:
+        if accepted[encoding] and os.path.isfile(os.path.join(app.static_folder, filename + suffix)):
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(app.static_folder, filename + suffix,
+                                           mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(app.static_folder, filename, max_age=IMMUTABLE_MAX_AGE)
+
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_assets(app):
+    """Nạp manifest, đăng ký asset_url/has_asset cho Jinja và view static có nén sẵn"""
+    app.extensions['asset_manifest'] = _read_manifest(os.path.join(app.static_folder, DIST_DIR))
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.jinja_env.globals['has_asset'] = has_asset
+    app.view_functions['static'] = _serve_static
@@ -0,0 +1,253 @@
+"""
+Cache Utilities - Cache trong bộ nhớ tiến trình (per-process)
+
+- TTLCache: cache key/value có thời hạn (TTL), giới hạn số key, đếm hit/miss
+- EntityCache: cache object theo khóa chính (VD: User cho Flask-Login)
+- invalidate_on_write: xóa cache khi có commit ghi vào các model chỉ định
+- named_caches: các cache có tên (name=...), để xuất hit/miss ra /metrics
+
+Lưu ý: cache nằm trong từng process. Với nhiều worker (gunicorn), các worker
+khác chỉ thấy dữ liệu mới sau khi hết TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+_MISSING = object()
+
+# Key trong session.info chứa các cache cần xóa khi transaction commit
+_PENDING_KEY = '_pending_cache_invalidations'
+
+# Cache có tên: {name: cache} (app/utils/metrics.py đọc stats())
+_NAMED_CACHES = {}
+
+
+def named_caches():
+    """Dict {tên: cache} của các cache tạo với name=..."""
+    return dict(_NAMED_CACHES)
+
+
+class TTLCache:
+    """
+    Cache key/value có thời hạn, an toàn với nhiều thread
+
+    Usage:
+        cache = TTLCache(ttl=30)
+        value = cache.get_or_set('key', compute_value)
+    """
+
+    def __init__(self, ttl=30, maxsize=1024, name=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        if name:
+            _NAMED_CACHES[name] = self
+
+    def get(self, key, default=None):
+        """Lấy giá trị còn hạn, hoặc default nếu không có/đã hết hạn"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """
+        Lưu giá trị vào cache
+
+        Args:
+            key: Key
+            value: Giá trị
+            ttl: Thời hạn (giây), mặc định dùng self.ttl. ttl <= 0 thì không lưu
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Lấy từ cache, nếu miss thì gọi factory() và lưu kết quả"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def delete(self, key):
+        """Xóa một key"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Xóa toàn bộ cache"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        Thống kê cache
+
+        Returns:
+            Dictionary: hits, misses, hit_ratio, size
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits / total) if total else 0,
+                'size': len(self._data)
+            }
+
+
+class EntityCache:
+    """
+    Cache object theo khóa chính, có TTL và số phiên bản (version stamp)
+
+    Lưu bản chụp các cột (dict), không lưu ORM object: object được dựng lại
+    và gắn vào session hiện tại bằng merge(load=False), không chạy query.
+
+    Version stamp: invalidate() tăng version; bản chụp được đọc từ DB trước
+    lần tăng đó sẽ bị bỏ qua, kể cả khi request đang chạy dở ghi vào cache sau.
+
+    Usage:
+        user_cache = EntityCache(User, ttl=60)
+        user = user_cache.get(db.session, user_id)
+        user_cache.invalidate(user_id)   # sau khi commit thay đổi
+    """
+
+    def __init__(self, model, ttl=60, maxsize=1024, name=None):
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self._version = 0
+        self._cache = TTLCache(ttl=ttl, maxsize=maxsize)
+        self._columns = None  # tính khi dùng lần đầu (mapper đã cấu hình xong)
+        if name:
+            _NAMED_CACHES[name] = self
+
+    def get(self, session, ident, ttl=None):
+        """
+        Lấy object theo khóa chính (từ cache nếu còn hạn và đúng version)
+
+        Args:
+            session: Session để gắn object vào
+            ident: Khóa chính
+            ttl: Thời hạn (giây), mặc định dùng TTL của cache. ttl <= 0 thì không cache
+
+        Returns:
+            Object (persistent trong session) hoặc None
+        """
+        entry = self._cache.get(ident)
+        if entry is not None and entry[0] == self._version:
+            self.hits += 1
+            return self._attach(session, entry[1])
+
+        self.misses += 1
+        version = self._version
+        obj = session.get(self.model, ident)
+        if obj is not None:
+            if self._columns is None:
+                self._columns = [attr.key for attr in self.model.__mapper__.column_attrs]
+            snapshot = {key: getattr(obj, key) for key in self._columns}
+            self._cache.set(ident, (version, snapshot), ttl)
+        return obj
+
+    def _attach(self, session, snapshot):
+        obj = self.model()
+        for key, value in snapshot.items():
+            setattr(obj, key, value)
+        make_transient_to_detached(obj)
+        return session.merge(obj, load=False)
+
+    def invalidate(self, ident=None):
+        """Xóa một object (hoặc toàn bộ) khỏi cache"""
+        self._version += 1
+        if ident is None:
+            self._cache.clear()
+        else:
+            self._cache.delete(ident)
+
+    def stats(self):
+        """
+        Thống kê cache
+
+        Returns:
+            Dictionary: hits, misses, hit_ratio, size, version
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': (self.hits / total) if total else 0,
+            'size': self._cache.stats()['size'],
+            'version': self._version
+        }
+
+
+def _mark_pending(session, callback):
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    if callback not in pending:
+        pending.append(callback)
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_pending_invalidations(session):
+    for callback in session.info.pop(_PENDING_KEY, []):
+        callback()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _drop_pending_invalidations(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def invalidate_on_write(callback, *models):
+    """
+    Gọi callback sau khi commit một transaction có ghi vào các model chỉ định
+
+    Bắt cả thay đổi qua ORM (add/sửa/xóa object) và câu lệnh
+    insert/update/delete hàng loạt (query.update(), db.session.execute(insert(...))).
+
+    Args:
+        callback: Hàm không tham số (VD: cache.clear)
+        models: Các model class cần theo dõi
+
+    Usage:
+        invalidate_on_write(cache.clear, Invoice, Payment)
+    """
+    models = tuple(models)
+
+    @event.listens_for(Session, 'after_flush')
+    def _after_flush(session, flush_context):
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, models):
+                _mark_pending(session, callback)
+                return
+
+    @event.listens_for(Session, 'do_orm_execute')
+    def _after_bulk(orm_execute_state):
+        if orm_execute_state.is_select:
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, models):
+            _mark_pending(orm_execute_state.session, callback)
+
+    return callback
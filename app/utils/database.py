@@ -0,0 +1,295 @@
+"""
+Database Engine - Cấu hình engine theo loại database
+
+SQLite:
+- PRAGMA (WAL, synchronous, busy_timeout, cache_size, mmap_size, temp_store) được
+  đặt trên MỌI kết nối mới của pool (event 'connect'), vì phần lớn PRAGMA chỉ có
+  hiệu lực trong kết nối đã chạy nó
+- File database: QueuePool giữ sẵn kết nối (PRAGMA chỉ chạy 1 lần mỗi kết nối);
+  ':memory:': StaticPool (Flask-SQLAlchemy tự chọn), bỏ các tham số pool không hợp lệ
+
+PostgreSQL/MySQL: giữ nguyên SQLALCHEMY_ENGINE_OPTIONS trong config.
+"""
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+# Tham số pool chỉ dùng cho server database (hoặc không hợp lệ với StaticPool)
+_POOL_OPTIONS = ('poolclass', 'pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping')
+
+
+def is_sqlite(uri):
+    """URI có phải SQLite không"""
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def _is_memory(uri):
+    return make_url(uri).database in (None, '', ':memory:')
+
+
+def sqlite_pragmas(config):
+    """
+    Các PRAGMA áp dụng cho mỗi kết nối SQLite (theo thứ tự)
+
+    Args:
+        config: app.config hoặc dict có các key SQLITE_*
+
+    Returns:
+        List tuple (tên, giá trị)
+    """
+    return [
+        # Đặt đầu tiên: các PRAGMA sau có thể phải chờ lock
+        ('busy_timeout', config.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        ('journal_mode', 'WAL'),
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('cache_size', config.get('SQLITE_CACHE_SIZE', -64000)),
+        ('mmap_size', config.get('SQLITE_MMAP_SIZE', 268435456)),
+        ('temp_store', 'MEMORY'),
+    ]
+
+
+def sqlite_engine_options(uri, options, pool_size=10, max_overflow=10):
+    """
+    Engine options cho SQLite: bỏ tham số pool của server database, chọn pool class
+
+    Args:
+        uri: Database URI
+        options: SQLALCHEMY_ENGINE_OPTIONS gốc
+        pool_size: Số kết nối giữ sẵn (file database)
+        max_overflow: Số kết nối tạm thêm khi pool hết
+
+    Returns:
+        Dict engine options mới
+    """
+    options = {key: value for key, value in (options or {}).items() if key not in _POOL_OPTIONS}
+    if not _is_memory(uri):
+        options.update(poolclass=QueuePool, pool_size=pool_size, max_overflow=max_overflow)
+    return options
+
+
+def set_sqlite_pragmas(engine, pragmas):
+    """Đăng ký event 'connect': chạy các PRAGMA trên mỗi kết nối mới của engine"""
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                # journal_mode lưu trong file: chỉ đổi khi cần (đổi phải có lock ghi)
+                if name == 'journal_mode':
+                    current = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+                    if current.lower() in (str(value).lower(), 'memory'):
+                        continue
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    return _apply_pragmas
+
+
+def configure_engine(app):
+    """
+    Chọn engine options theo dialect - gọi TRƯỚC db.init_app(app)
+
+    Với SQLite, thay SQLALCHEMY_ENGINE_OPTIONS bằng profile SQLite
+    (pool_size=10 của config mặc định không dùng được với ':memory:')
+    """
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if is_sqlite(uri):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options(
+            uri, app.config.get('SQLALCHEMY_ENGINE_OPTIONS'),
+            pool_size=app.config.get('SQLITE_POOL_SIZE', 10),
+            max_overflow=app.config.get('SQLITE_MAX_OVERFLOW', 10)
+        )
+
+
+def init_engine(app, db):
+    """Gắn PRAGMA cho engine SQLite - gọi SAU db.init_app(app)"""
+    if is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        with app.app_context():
+            set_sqlite_pragmas(db.engine, sqlite_pragmas(app.config))
+
+
+# ============================================
+# GHI ĐỒNG THỜI (LOCK + THỬ LẠI)
+# ============================================
+# Lỗi có thể hết nếu chạy lại transaction: SQLite bị khóa, PostgreSQL deadlock /
+# serialization failure, MySQL lock wait timeout
+_RETRYABLE_ERRORS = ('database is locked', 'database table is locked', 'deadlock',
+                     'could not serialize', 'lock wait timeout')
+
+
+def is_retryable(error):
+    """Lỗi tranh chấp lock (chạy lại transaction có thể thành công)"""
+    return isinstance(error, OperationalError) and any(
+        text in str(error.orig).lower() for text in _RETRYABLE_ERRORS
+    )
+
+
+def begin_write(session):
+    """
+    Mở transaction ghi, giữ lock ghi ngay từ đầu
+
+    SQLite: BEGIN IMMEDIATE - lấy lock ghi trước khi đọc, nên dữ liệu đọc sau đó
+    không thể bị process khác sửa tới khi commit (chờ tối đa busy_timeout).
+    Nếu kết nối đã ở trong transaction (đã ghi trước đó) thì giữ nguyên -
+    khi bị tranh chấp sẽ báo "database is locked" và được thử lại.
+    Database khác: không làm gì, dùng SELECT ... FOR UPDATE trên dòng cần khóa.
+    """
+    connection = session.connection()
+    if connection.dialect.name == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def run_with_retry(session, work, max_attempts=5, backoff=0.05):
+    """
+    Chạy work() trong transaction ghi rồi commit, thử lại khi tranh chấp lock
+
+    Mỗi lần thử: rollback transaction cũ, begin_write, work(), commit.
+    work phải đọc lại dữ liệu cần khóa (VD: SELECT ... FOR UPDATE) vì mỗi lần
+    thử là 1 transaction mới.
+
+    Args:
+        session: Session (db.session)
+        work: Hàm không tham số, trả về kết quả
+        max_attempts: Số lần thử tối đa
+        backoff: Thời gian chờ cơ sở (giây), tăng gấp đôi mỗi lần, có jitter
+
+    Returns:
+        (kết quả của work, số lần đã thử)
+
+    Raises:
+        OperationalError: Vẫn tranh chấp sau max_attempts lần
+        Exception khác từ work: rollback rồi raise lại, không thử lại
+    """
+    for attempt in range(1, max_attempts + 1):
+        try:
+            begin_write(session)
+            result = work()
+            session.commit()
+            return result, attempt
+        except OperationalError as e:
+            session.rollback()
+            if not is_retryable(e) or attempt == max_attempts:
+                raise
+            time.sleep(backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+        except Exception:
+            session.rollback()
+            raise
+
+
+# ============================================
+# BENCHMARK (ghi đồng thời)
+# ============================================
+def _benchmark_engine(path, profile, pragmas):
+    uri = f'sqlite:///{path}'
+    if profile == 'default':
+        # Như cấu hình cũ: pool mặc định, không PRAGMA (journal DELETE, synchronous FULL)
+        return create_engine(uri)
+    engine = create_engine(uri, **sqlite_engine_options(uri, {}))
+    set_sqlite_pragmas(engine, pragmas)
+    return engine
+
+
+def _benchmark_setup(path, profile, pragmas, invoices):
+    from app import db
+    from app.models import Room, Invoice
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    engine = _benchmark_engine(path, profile, pragmas)
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        for index in range(invoices):
+            room = Room(room_number=f'B{index:04d}', price=1000000)
+            session.add(room)
+            session.flush()
+            session.add(Invoice(room_id=room.id, month=1, year=2000, room_price=1000000,
+                                total_amount=10 ** 12, paid_amount=0, status='unpaid'))
+        session.commit()
+    engine.dispose()
+
+
+def _benchmark_worker(path, profile, pragmas, kind, invoices, deadline, results):
+    """Process ghi (thêm Payment như PaymentService) hoặc đọc (tổng hợp kiểu dashboard)"""
+    from app.models import Invoice, Payment
+
+    engine = _benchmark_engine(path, profile, pragmas)
+    counts = {'writes': 0, 'reads': 0, 'locked': 0, 'errors': 0}
+    rng = random.Random(os.getpid())
+
+    while time.time() < deadline:
+        try:
+            with Session(engine) as session:
+                if kind == 'writer':
+                    invoice = session.get(Invoice, rng.randint(1, invoices))
+                    session.add(Payment(invoice_id=invoice.id, amount=1000, payment_method='cash'))
+                    invoice.apply_payment(1000)
+                    session.commit()
+                    counts['writes'] += 1
+                else:
+                    session.execute(
+                        select(func.sum(Invoice.paid_amount), func.count(Payment.id))
+                        .select_from(Invoice).outerjoin(Payment, Payment.invoice_id == Invoice.id)
+                    ).all()
+                    counts['reads'] += 1
+        except OperationalError as e:
+            counts['locked' if 'locked' in str(e) else 'errors'] += 1
+
+    engine.dispose()
+    results.put(counts)
+
+
+def benchmark_concurrent_writes(writers=4, readers=4, seconds=5.0, invoices=50, config=None):
+    """
+    So sánh cấu hình SQLite cũ (default) và profile mới (tuned) khi ghi đồng thời
+
+    Mỗi writer/reader là 1 process riêng (giống nhiều worker gunicorn) trên
+    1 file database tạm, không đụng tới database thật.
+
+    Returns:
+        List dict: profile, writes, reads, locked, errors, writes_per_second, reads_per_second
+    """
+    pragmas = sqlite_pragmas(config or {})
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'benchmark.db')
+        for profile in ('default', 'tuned'):
+            _benchmark_setup(path, profile, pragmas, invoices)
+
+            queue = multiprocessing.Queue()
+            deadline = time.time() + 1 + seconds  # 1 giây để các process khởi động
+            processes = [
+                multiprocessing.Process(target=_benchmark_worker,
+                                        args=(path, profile, pragmas, kind, invoices, deadline, queue))
+                for kind in ['writer'] * writers + ['reader'] * readers
+            ]
+            for process in processes:
+                process.start()
+
+            total = {'writes': 0, 'reads': 0, 'locked': 0, 'errors': 0}
+            for _ in processes:
+                for key, value in queue.get().items():
+                    total[key] += value
+            for process in processes:
+                process.join()
+
+            results.append({
+                'profile': profile,
+                **total,
+                'writes_per_second': total['writes'] / seconds,
+                'reads_per_second': total['reads'] / seconds
+            })
+
+    return results
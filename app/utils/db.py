@@ -0,0 +1,72 @@
+"""
+Database Helpers - Các hàm tiện ích thao tác database theo dialect
+"""
+from sqlalchemy import insert
+from app import db
+
+
+def insert_ignore(model, index_elements):
+    """
+    Tạo câu INSERT bỏ qua các dòng vi phạm unique constraint
+    
+    - SQLite/PostgreSQL: INSERT ... ON CONFLICT (...) DO NOTHING
+    - MySQL: INSERT IGNORE
+    - Dialect khác: INSERT thường (dữ liệu phải được lọc trùng trước)
+    
+    Args:
+        model: Model class
+        index_elements: Danh sách tên cột của unique constraint
+        
+    Returns:
+        Insert statement (dùng với db.session.execute(stmt, list_of_dicts))
+    """
+    dialect = db.session.get_bind().dialect.name
+    
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    
+    if dialect in ('mysql', 'mariadb'):
+        return insert(model).prefix_with('IGNORE')
+    
+    return insert(model)
+
+
+def upsert(connection, table, index_elements, values, update):
+    """
+    INSERT 1 dòng, trùng unique key thì UPDATE các cột `update` (1 câu, an toàn khi ghi đồng thời)
+    
+    - SQLite/PostgreSQL: INSERT ... ON CONFLICT (...) DO UPDATE
+    - MySQL: INSERT ... ON DUPLICATE KEY UPDATE
+    - Dialect khác: UPDATE, không có dòng nào thì INSERT
+    
+    Args:
+        connection: Connection (trong transaction)
+        table: Table
+        index_elements: Danh sách tên cột của unique constraint
+        values: Dict giá trị của dòng (gồm cả các cột unique)
+        update: Dict {cột: giá trị / biểu thức} khi dòng đã tồn tại
+    """
+    dialect = connection.dialect.name
+    
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table).values(**values)
+        return connection.execute(stmt.on_conflict_do_update(index_elements=index_elements, set_=update))
+    
+    if dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        return connection.execute(mysql_insert(table).values(**values).on_duplicate_key_update(**update))
+    
+    key = [table.c[name] == values[name] for name in index_elements]
+    updated = connection.execute(table.update().where(*key).values(**update))
+    if updated.rowcount == 0:
+        connection.execute(table.insert().values(**values))
+    return updated
@@ -0,0 +1,399 @@
+"""
+Metrics - Endpoint /metrics (Prometheus text exposition format)
+
+Số liệu:
+- roommaster_http_request_duration_seconds{endpoint}: histogram thời gian xử lý request
+- roommaster_http_requests_total{endpoint, status}: số request theo nhóm mã trạng thái (2xx...)
+- roommaster_http_requests_in_flight: số request đang xử lý
+- roommaster_db_pool_checkout_seconds: histogram thời gian chờ lấy kết nối từ pool
+- roommaster_cache_hits_total / _misses_total / _hit_ratio{cache}: cache có tên (app/utils/cache.py)
+
+Thiết kế:
+- Mọi series được cấp phát trước khi khởi động (endpoint lấy từ url_map, bucket cố định),
+  mỗi giá trị là 1 ô float64 ở vị trí cố định trong 1 vùng nhớ (mmap)
+- Mỗi thread ghi vào vùng nhớ riêng (shard) → không có 2 thread ghi cùng 1 ô,
+  nên tăng bộ đếm không cần lock. /metrics cộng dồn tất cả shard khi đọc
+- Thread kết thúc trả shard về danh sách rảnh (finalizer trên giá trị threading.local),
+  thread mới lấy lại shard rảnh trước khi tạo shard mới: số shard không vượt số
+  thread chạy đồng thời lớn nhất, dù dev server / gthread tạo thread mới cho từng request
+- Nhiều process (gunicorn): đặt METRICS_DIR, mỗi shard là 1 file trong thư mục
+  đó; /metrics ở worker nào cũng đọc đủ file của mọi worker. Xóa sạch thư mục
+  khi khởi động master (clear_metrics_dir trong hook on_starting của gunicorn)
+- Gauge (in-flight) chỉ cộng shard của process còn sống; counter/histogram
+  cộng cả shard của worker đã thoát (để không bị giảm khi worker restart)
+
+Chỉ IP trong METRICS_ALLOWED_IPS được đọc /metrics (mặc định localhost); nếu đặt
+METRICS_TOKEN thì còn phải gửi header "Authorization: Bearer <token>".
+Sau reverse proxy: đặt PROXY_FIX_X_FOR (IP thật của client) và chặn /metrics ở proxy.
+"""
+import bisect
+import glob
+import hashlib
+import hmac
+import itertools
+import mmap
+import os
+import struct
+import threading
+import time
+import weakref
+
+from flask import Response, abort, current_app, g, request
+
+from app.utils.cache import named_caches
+
+# Bucket (giây) - cố định, cấp phát trước
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+STATUS_CLASSES = ('1xx', '2xx', '3xx', '4xx', '5xx')
+UNMATCHED = '<unmatched>'  # request không khớp route nào (404)
+
+_SLOT = struct.Struct('d')
+_HEADER = 16  # 8 byte chữ ký layout + 8 byte pid
+
+
+class _Histogram:
+    """Vị trí các ô của 1 histogram: len(buckets) + 1 bucket (ô cuối = +Inf), sum, count"""
+    
+    def __init__(self, first, buckets):
+        self.buckets = buckets
+        self.first = first
+        self.sum = first + len(buckets) + 1
+        self.count = self.sum + 1
+    
+    @property
+    def size(self):
+        return len(self.buckets) + 3
+
+
+class MetricsLayout:
+    """Bảng vị trí ô (slot) của mọi series - giống nhau ở mọi process cùng phiên bản code"""
+    
+    def __init__(self, endpoints, caches):
+        self.endpoints = sorted(set(endpoints) | {UNMATCHED})
+        self.caches = sorted(caches)
+        self.size = 0
+        
+        self.requests = {endpoint: self._histogram(REQUEST_BUCKETS) for endpoint in self.endpoints}
+        self.statuses = {
+            (endpoint, status): self._slot() for endpoint in self.endpoints for status in STATUS_CLASSES
+        }
+        self.in_flight = self._slot()
+        self.pool_checkout = self._histogram(POOL_BUCKETS)
+        self.cache_hits = {name: self._slot() for name in self.caches}
+        self.cache_misses = {name: self._slot() for name in self.caches}
+        
+        # Chữ ký: file của phiên bản code khác (layout khác) bị bỏ qua khi đọc
+        key = repr((self.endpoints, self.caches, REQUEST_BUCKETS, POOL_BUCKETS, STATUS_CLASSES))
+        self.signature = hashlib.sha1(key.encode()).digest()[:8]
+    
+    def _slot(self):
+        self.size += 1
+        return self.size - 1
+    
+    def _histogram(self, buckets):
+        histogram = _Histogram(self.size, buckets)
+        self.size += histogram.size
+        return histogram
+
+
+class _Shard:
+    """Vùng nhớ của 1 thread (hoặc phần dùng chung của process): mảng float64"""
+    
+    def __init__(self, layout, path=None):
+        self.pid = os.getpid()
+        length = _HEADER + layout.size * _SLOT.size
+        if path:
+            with open(path, 'a+b') as f:
+                f.truncate(length)
+                self.buffer = mmap.mmap(f.fileno(), length)
+        else:
+            self.buffer = mmap.mmap(-1, length)
+        self.buffer[:8] = layout.signature
+        struct.pack_into('q', self.buffer, 8, self.pid)
+    
+    def add(self, slot, amount=1.0):
+        offset = _HEADER + slot * _SLOT.size
+        _SLOT.pack_into(self.buffer, offset, _SLOT.unpack_from(self.buffer, offset)[0] + amount)
+    
+    def set(self, slot, value):
+        _SLOT.pack_into(self.buffer, _HEADER + slot * _SLOT.size, value)
+    
+    def observe(self, histogram, value):
+        self.add(histogram.first + bisect.bisect_left(histogram.buckets, value))
+        self.add(histogram.sum, value)
+        self.add(histogram.count)
+
+
+class _Lease:
+    """Giá trị threading.local giữ shard của 1 thread; bị hủy khi thread kết thúc"""
+    
+    __slots__ = ('shard', '__weakref__')
+    
+    def __init__(self, shard):
+        self.shard = shard
+
+
+class MetricsRegistry:
+    """Quản lý shard của process hiện tại và cộng dồn khi đọc"""
+    
+    def __init__(self, layout, directory=None):
+        self.layout = layout
+        self.directory = directory
+        self._local = threading.local()
+        self._lock = threading.RLock()   # chỉ dùng khi cấp / trả shard, không dùng khi ghi
+        self._shards = []                # shard của process (chế độ không có METRICS_DIR)
+        self._free = []                  # shard của thread đã kết thúc, chờ thread mới dùng lại
+        self._names = itertools.count()  # tên file shard (pid đã nằm trong tên)
+        self._process_shard = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    
+    def _new_shard(self, name):
+        path = os.path.join(self.directory, f'roommaster_{os.getpid()}_{name}.db') if self.directory else None
+        shard = _Shard(self.layout, path)
+        with self._lock:
+            self._shards = [s for s in self._shards if s.pid == shard.pid] + [shard]
+        return shard
+    
+    def _acquire(self):
+        """Shard rảnh của process (hoặc shard mới nếu không còn)"""
+        with self._lock:
+            self._free = [shard for shard in self._free if shard.pid == os.getpid()]
+            if self._free:
+                return self._free.pop()
+        return self._new_shard(next(self._names))
+    
+    def _release(self, shard):
+        """Thread kết thúc: trả shard (giữ nguyên số liệu đã ghi) về danh sách rảnh"""
+        with self._lock:
+            if shard.pid == os.getpid():
+                self._free.append(shard)
+    
+    def shard(self):
+        """Shard của thread hiện tại (lấy lại shard rảnh / tạo mới sau fork)"""
+        lease = getattr(self._local, 'lease', None)
+        if lease is None or lease.shard.pid != os.getpid():
+            lease = self._local.lease = _Lease(self._acquire())
+            weakref.finalize(lease, self._release, lease.shard).atexit = False
+        return lease.shard
+    
+    def process_shard(self):
+        """Shard dùng chung của process: chỉ ghi giá trị tuyệt đối (set), không cộng dồn"""
+        shard = self._process_shard
+        if shard is None or shard.pid != os.getpid():
+            with self._lock:
+                shard = self._process_shard
+                if shard is None or shard.pid != os.getpid():
+                    shard = self._process_shard = self._new_shard('process')
+        return shard
+    
+    def sync_caches(self):
+        """Chép hit/miss của các cache có tên vào shard của process"""
+        shard = self.process_shard()
+        for name, cache in named_caches().items():
+            if name in self.layout.cache_hits:
+                stats = cache.stats()
+                shard.set(self.layout.cache_hits[name], stats['hits'])
+                shard.set(self.layout.cache_misses[name], stats['misses'])
+    
+    def _buffers(self):
+        """(pid, bytes) của mọi shard đọc được"""
+        if not self.directory:
+            return [(shard.pid, bytes(shard.buffer)) for shard in self._shards]
+        buffers = []
+        for path in glob.glob(os.path.join(self.directory, 'roommaster_*.db')):
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue
+            if len(data) >= _HEADER and data[:8] == self.layout.signature:
+                buffers.append((struct.unpack_from('q', data, 8)[0], data))
+        return buffers
+    
+    def collect(self):
+        """
+        Cộng dồn mọi shard
+        
+        Returns:
+            (totals, live): totals = list giá trị mọi ô; live = chỉ shard của process còn sống
+        """
+        totals = [0.0] * self.layout.size
+        live = [0.0] * self.layout.size
+        count = self.layout.size
+        for pid, data in self._buffers():
+            values = struct.unpack_from(f'{count}d', data, _HEADER)
+            alive = _pid_alive(pid)
+            for i, value in enumerate(values):
+                if value:
+                    totals[i] += value
+                    if alive:
+                        live[i] += value
+        return totals, live
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def clear_metrics_dir(directory):
+    """
+    Xóa file số liệu cũ - gọi 1 lần khi khởi động master gunicorn
+    
+    Usage (gunicorn_config.py):
+        def on_starting(server):
+            from app.utils.metrics import clear_metrics_dir
+            clear_metrics_dir('/tmp/roommaster-metrics')
+    """
+    for path in glob.glob(os.path.join(directory, 'roommaster_*.db')):
+        os.remove(path)
+
+
+# ============================================
+# EXPOSITION (text format 0.0.4)
+# ============================================
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _histogram_lines(name, histogram, values, **labels):
+    lines = []
+    cumulative = 0.0
+    for i, bound in enumerate((*histogram.buckets, '+Inf')):
+        cumulative += values[histogram.first + i]
+        lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {_number(cumulative)}')
+    lines.append(f'{name}_sum{_labels(**labels) if labels else ""} {values[histogram.sum]!r}')
+    lines.append(f'{name}_count{_labels(**labels) if labels else ""} {_number(values[histogram.count])}')
+    return lines
+
+
+def render(registry):
+    """Toàn bộ số liệu dạng text exposition"""
+    layout = registry.layout
+    registry.sync_caches()
+    values, live = registry.collect()
+    lines = []
+    
+    name = 'roommaster_http_request_duration_seconds'
+    lines += [f'# HELP {name} Request latency by Flask endpoint.', f'# TYPE {name} histogram']
+    for endpoint, histogram in layout.requests.items():
+        if values[histogram.count]:
+            lines += _histogram_lines(name, histogram, values, endpoint=endpoint)
+    
+    name = 'roommaster_http_requests_total'
+    lines += [f'# HELP {name} Requests by Flask endpoint and status class.', f'# TYPE {name} counter']
+    for (endpoint, status), slot in layout.statuses.items():
+        if values[slot]:
+            lines.append(f'{name}{_labels(endpoint=endpoint, status=status)} {_number(values[slot])}')
+    
+    name = 'roommaster_http_requests_in_flight'
+    lines += [f'# HELP {name} Requests currently being handled (live workers).', f'# TYPE {name} gauge',
+              f'{name} {_number(live[layout.in_flight])}']
+    
+    name = 'roommaster_db_pool_checkout_seconds'
+    lines += [f'# HELP {name} Time spent waiting for a pooled database connection.', f'# TYPE {name} histogram']
+    lines += _histogram_lines(name, layout.pool_checkout, values)
+    
+    for name, slots, help_text in (
+        ('roommaster_cache_hits_total', layout.cache_hits, 'Cache hits by named cache.'),
+        ('roommaster_cache_misses_total', layout.cache_misses, 'Cache misses by named cache.'),
+    ):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        lines += [f'{name}{_labels(cache=cache)} {_number(values[slot])}' for cache, slot in slots.items()]
+    
+    name = 'roommaster_cache_hit_ratio'
+    lines += [f'# HELP {name} Cache hit ratio by named cache.', f'# TYPE {name} gauge']
+    for cache in layout.caches:
+        hits, misses = values[layout.cache_hits[cache]], values[layout.cache_misses[cache]]
+        lines.append(f'{name}{_labels(cache=cache)} {(hits / (hits + misses)) if hits + misses else 0.0!r}')
+    
+    return '\n'.join(lines) + '\n'
+
+
+# ============================================
+# FLASK
+# ============================================
+def _time_pool_checkout(pool, registry):
+    """Đo thời gian pool.connect() (gồm cả thời gian chờ khi pool hết kết nối)"""
+    connect = pool.connect
+    
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            registry.shard().observe(registry.layout.pool_checkout, time.perf_counter() - started)
+    
+    pool.connect = timed_connect
+
+
+def _authorized():
+    """IP trong METRICS_ALLOWED_IPS và (nếu có METRICS_TOKEN) đúng bearer token"""
+    if request.remote_addr not in current_app.config['METRICS_ALLOWED_IPS']:
+        return False
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        return True
+    scheme, _, value = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(value.strip().encode(), token.encode())
+
+
+def metrics_view():
+    """GET /metrics - chỉ cho IP trong METRICS_ALLOWED_IPS (kèm METRICS_TOKEN nếu có)"""
+    if not _authorized():
+        abort(404)
+    return Response(render(current_app.extensions['metrics']),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_metrics(app, db):
+    """Cấp phát series cho mọi endpoint, đăng ký hook đo request và route /metrics - gọi SAU khi đăng ký blueprints"""
+    if not app.config.get('METRICS_ENABLED'):
+        return
+    
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    layout = MetricsLayout([rule.endpoint for rule in app.url_map.iter_rules()], named_caches())
+    registry = app.extensions['metrics'] = MetricsRegistry(layout, app.config.get('METRICS_DIR'))
+    
+    with app.app_context():
+        _time_pool_checkout(db.engine.pool, registry)
+    
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        registry.shard().add(layout.in_flight)
+    
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get('metrics_started')
+        if started is not None:
+            endpoint = request.endpoint if request.endpoint in layout.requests else UNMATCHED
+            shard = registry.shard()
+            shard.observe(layout.requests[endpoint], time.perf_counter() - started)
+            status = layout.statuses.get((endpoint, f'{response.status_code // 100}xx'))
+            if status is not None:
+                shard.add(status)
+            registry.sync_caches()
+        return response
+    
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        if g.pop('metrics_started', None) is not None:
+            registry.shard().add(layout.in_flight, -1)
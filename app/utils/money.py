@@ -0,0 +1,87 @@
+"""
+Money - Tiền lưu bằng số nguyên đồng (VNĐ), không dùng float
+
+Float không biểu diễn chính xác mọi số tiền: so sánh `paid >= total`, chênh
+lệch "trong phạm vi 1000đ" và SUM hàng nghìn hóa đơn đều có thể lệch. VNĐ
+không có đơn vị lẻ, nên mọi số tiền được làm tròn về đồng và lưu BIGINT:
+
+- Money: kiểu cột (BIGINT), đọc ra luôn là int, kể cả SUM/COALESCE trong SQL
+- Gán float/Decimal/str vào cột Money → tự làm tròn về int ngay khi gán,
+  nên so sánh / cộng trừ trên object trước khi commit cũng chính xác
+- to_dong: chuyển giá trị nhập (form, CLI...) về đồng; dùng được làm
+  `type=` của request.form.get
+- Chỉ số điện/nước giữ dạng thập phân cố định (Numeric 12,2); tiền điện/nước
+  tính bằng Decimal rồi mới làm tròn (usage_cost)
+
+Usage:
+    price = db.Column(Money, nullable=False)
+    amount = request.form.get('amount', 0, type=to_dong)
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from sqlalchemy import BigInteger, event
+from sqlalchemy.orm import Mapper
+from sqlalchemy.types import TypeDecorator
+
+
+def to_dong(value):
+    """
+    Giá trị tiền bất kỳ → số nguyên đồng (làm tròn 0.5 lên)
+
+    Args:
+        value: int, float, Decimal hoặc chuỗi số (None → None)
+
+    Returns:
+        int (hoặc None)
+
+    Raises:
+        ValueError: Không phải số hợp lệ
+    """
+    if value is None or isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        value = value.strip().replace(',', '')
+    try:
+        return int(Decimal(str(value)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'Số tiền không hợp lệ: {value!r}')
+
+
+def usage_cost(old_reading, new_reading, unit_price):
+    """
+    Tiền điện/nước = max(0, số mới - số cũ) × đơn giá, tính bằng Decimal rồi làm tròn về đồng
+
+    Returns:
+        int
+    """
+    usage = Decimal(str(new_reading or 0)) - Decimal(str(old_reading or 0))
+    return to_dong(max(usage, Decimal(0)) * (unit_price or 0))
+
+
+class Money(TypeDecorator):
+    """Cột tiền: BIGINT số đồng, giá trị Python luôn là int"""
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return to_dong(value)
+
+    def process_result_value(self, value, dialect):
+        # SUM(bigint) trên PostgreSQL trả về numeric → Decimal
+        return None if value is None else int(value)
+
+
+# ============================================
+# LÀM TRÒN KHI GÁN THUỘC TÍNH
+# ============================================
+def _coerce_money(target, value, oldvalue, initiator):
+    return to_dong(value)
+
+
+@event.listens_for(Mapper, 'mapper_configured')
+def _instrument_money_columns(mapper, class_):
+    """Gắn listener 'set' cho mọi thuộc tính có cột kiểu Money"""
+    for prop in mapper.column_attrs:
+        if any(isinstance(column.type, Money) for column in prop.columns):
+            event.listen(getattr(class_, prop.key), 'set', _coerce_money, retval=True)
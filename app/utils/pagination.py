@@ -0,0 +1,214 @@
+"""
+Keyset Pagination - Phân trang theo khóa (seek) thay cho OFFSET/LIMIT
+
+OFFSET N buộc database đọc rồi bỏ N dòng đầu, và paginate() còn chạy thêm
+COUNT(*) mỗi lần xem trang → trang càng sâu càng chậm. Keyset pagination
+lọc "sau dòng cuối của trang trước" theo bộ khóa sắp xếp (có index), nên
+trang nào cũng tốn như trang đầu.
+
+- Bộ khóa phải xác định thứ tự duy nhất (kết thúc bằng id) và không NULL
+- Cursor là chuỗi mờ (base64 JSON), cursor sai/hỏng → quay về trang đầu
+- Tổng số dòng là tùy chọn và có giới hạn (count_limit): chỉ đếm ở trang đầu
+  rồi mang theo trong cursor
+
+Usage:
+    page = keyset_paginate(Invoice.query, [Invoice.year.desc(), Invoice.id.desc()],
+                           cursor=request.args.get('cursor'), per_page=15)
+    page.items, page.next_cursor, page.prev_cursor
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from sqlalchemy import and_, func, inspect, or_, select, tuple_
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+
+class KeysetPage:
+    """1 trang kết quả keyset pagination"""
+
+    def __init__(self, items, per_page, offset, next_cursor, prev_cursor, total, total_is_exact):
+        self.items = items
+        self.per_page = per_page
+        self.offset = offset                # Vị trí dòng đầu trang (đánh số thứ tự)
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total                  # None nếu không đếm
+        self.total_is_exact = total_is_exact
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def first_index(self):
+        """Số thứ tự (từ 1) của dòng đầu trang"""
+        return self.offset + 1
+
+
+# ============================================
+# CURSOR
+# ============================================
+def encode_cursor(payload):
+    """Dict → chuỗi base64 an toàn cho URL"""
+    raw = json.dumps(payload, separators=(',', ':'), default=_json_value).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor):
+    """Chuỗi cursor → dict, hoặc None nếu rỗng/không hợp lệ"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get('k'), list):
+        return None
+    return payload
+
+
+def _read_cursor(cursor, keys):
+    """Giải mã cursor cho bộ khóa keys; None nếu không dùng được (trang đầu)"""
+    payload = decode_cursor(cursor)
+    if payload is None or len(payload['k']) != len(keys):
+        return None  # Cursor hỏng hoặc của danh sách / bộ lọc khác
+    try:
+        return {
+            'values': [_python_value(expr, value) for (expr, _), value in zip(keys, payload['k'])],
+            'backwards': payload.get('d') == 'prev',
+            'offset': max(int(payload.get('o', 0)), 0),
+            'total': None if payload.get('n') is None else int(payload['n']),
+            'total_is_exact': bool(payload.get('x', True))
+        }
+    except (TypeError, ValueError):
+        return None
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Không mã hóa được giá trị khóa kiểu {type(value).__name__}')
+
+
+def _python_value(expr, value):
+    """Khôi phục kiểu Python của giá trị khóa đọc từ cursor (ngày giờ lưu dạng ISO)"""
+    try:
+        python_type = expr.type.python_type
+    except NotImplementedError:
+        return value
+    if value is not None and python_type in (datetime, date):
+        return python_type.fromisoformat(value)
+    return value
+
+
+# ============================================
+# SEEK
+# ============================================
+def _parse_key(key):
+    """Biểu thức order_by → (cột, giảm dần?)"""
+    if isinstance(key, UnaryExpression) and key.modifier in (operators.desc_op, operators.asc_op):
+        return key.element, key.modifier is operators.desc_op
+    return key, False
+
+
+def _seek(keys, values, backwards):
+    """Điều kiện "đứng sau" (hoặc "đứng trước" khi lùi trang) bộ giá trị khóa"""
+    def after(expr, descending, value):
+        return expr < value if descending != backwards else expr > value
+
+    directions = {descending for _, descending in keys}
+    if len(directions) == 1:
+        # Cùng chiều: so sánh row value (year, month, id) < (?, ?, ?) - dùng được index
+        descending = directions.pop()
+        return after(tuple_(*(expr for expr, _ in keys)), descending, tuple_(*values))
+
+    # Khác chiều: (k1 sau v1) OR (k1 = v1 AND k2 sau v2) OR ...
+    conditions = []
+    for i, (expr, descending) in enumerate(keys):
+        equal = [keys[j][0] == values[j] for j in range(i)]
+        conditions.append(and_(*equal, after(expr, descending, values[i])))
+    return or_(*conditions)
+
+
+def _count(query, limit):
+    """Đếm tối đa limit + 1 dòng → (tổng, chính xác?)"""
+    entity = query.column_descriptions[0]['entity']
+    subquery = query.order_by(None).with_entities(*inspect(entity).primary_key)
+    if limit:
+        subquery = subquery.limit(limit + 1)
+    total = query.session.execute(select(func.count()).select_from(subquery.subquery())).scalar()
+    if limit and total > limit:
+        return limit, False
+    return total, True
+
+
+def keyset_paginate(query, order_by, cursor=None, per_page=20, count_limit=None, with_count=False):
+    """
+    Lấy 1 trang theo keyset
+
+    Args:
+        query: Query ORM (chưa order_by), entity đầu tiên là đối tượng cần liệt kê
+        order_by: List biểu thức sắp xếp, kết thúc bằng khóa duy nhất
+                  (VD: [Invoice.year.desc(), Invoice.month.desc(), Invoice.id.desc()])
+        cursor: Cursor từ trang trước (None = trang đầu)
+        per_page: Số dòng mỗi trang
+        count_limit: Đếm tối đa bao nhiêu dòng (None = đếm hết)
+        with_count: Có đếm tổng số dòng không (chỉ đếm ở trang đầu)
+
+    Returns:
+        KeysetPage
+    """
+    keys = [_parse_key(key) for key in order_by]
+    state = _read_cursor(cursor, keys)
+    backwards = bool(state) and state['backwards']
+    offset = state['offset'] if state else 0
+
+    if state:
+        total, total_is_exact = state['total'], state['total_is_exact']
+    elif with_count:
+        total, total_is_exact = _count(query, count_limit)
+    else:
+        total, total_is_exact = None, True
+
+    page_query = query.order_by(None)
+    if state:
+        page_query = page_query.filter(_seek(keys, state['values'], backwards))
+
+    ordering = [expr.desc() if descending != backwards else expr.asc() for expr, descending in keys]
+    rows = page_query.add_columns(*(expr.label(f'_keyset_{i}') for i, (expr, _) in enumerate(keys)))\
+        .order_by(*ordering)\
+        .limit(per_page + 1)\
+        .all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+        if not has_more:
+            offset = 0  # Đã lùi tới đầu danh sách
+
+    items = [row[0] for row in rows]
+    if not rows:
+        return KeysetPage(items, per_page, offset, None, None, total, total_is_exact)
+
+    def make_cursor(row, direction, position):
+        return encode_cursor({'k': list(row[1:]), 'd': direction, 'o': position,
+                              'n': total, 'x': total_is_exact})
+
+    has_next = has_more if not backwards else True
+    has_prev = has_more if backwards else bool(state)
+    return KeysetPage(
+        items, per_page, offset,
+        next_cursor=make_cursor(rows[-1], 'next', offset + len(rows)) if has_next else None,
+        prev_cursor=make_cursor(rows[0], 'prev', max(offset - per_page, 0)) if has_prev else None,
+        total=total,
+        total_is_exact=total_is_exact
+    )
@@ -0,0 +1,199 @@
+"""
+SQL Profiler - Đếm query, thời gian DB và phát hiện N+1 theo từng request
+
+Bật bằng SQL_PROFILER=1 (mặc định tắt: không gắn event nào vào engine).
+Mỗi request ghi nhận:
+- Số câu SQL và tổng thời gian DB
+- Các câu chậm nhất (SQL_PROFILER_SLOWEST)
+- Các câu lặp lại theo fingerprint (bỏ tham số): cùng 1 câu chạy từ
+  SQL_PROFILER_REPEAT_THRESHOLD lần trở lên → nghi N+1
+
+Kết quả:
+- Header Server-Timing (xem trong tab Network / Timing của trình duyệt)
+- File JSON lines xoay vòng (SQL_PROFILER_LOG, mặc định logs/sql_profile.log)
+- Cảnh báo trong log ứng dụng khi có nghi vấn N+1
+
+Dùng ngoài request (script, benchmark, pytest):
+    with profile() as stats:
+        client.get('/invoices/')
+    stats.count, stats.total_ms, stats.repeated(5)
+"""
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Các bộ đếm đang hoạt động (request, các khối profile() lồng nhau): mỗi câu SQL ghi vào tất cả
+_active = ContextVar('sql_profiler_stats', default=())
+
+_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),                  # chuỗi
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),               # số
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?)'),    # IN (?, ?, ?) → IN (?)
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def fingerprint(statement):
+    """Câu SQL bỏ tham số/hằng số: các lần chạy cùng 1 câu với giá trị khác nhau → cùng fingerprint"""
+    for pattern, replacement in _LITERALS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+class QueryStats:
+    """Thống kê SQL của 1 request (hoặc 1 khối profile())"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements = []            # [(sql, ms)]
+        self.fingerprints = Counter()
+
+    def record(self, statement, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.statements.append((statement, elapsed_ms))
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def slowest(self, limit=5):
+        """Các câu chậm nhất: list (sql, ms)"""
+        return sorted(self.statements, key=lambda item: item[1], reverse=True)[:limit]
+
+    def repeated(self, threshold=5):
+        """Câu lặp lại >= threshold lần (nghi N+1): list (fingerprint, số lần), nhiều nhất trước"""
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count >= threshold]
+
+    def summary(self, slowest=5, threshold=5):
+        """Dict để ghi log / hiển thị"""
+        return {
+            'queries': self.count,
+            'db_ms': round(self.total_ms, 2),
+            'slowest': [{'sql': _shorten(sql), 'ms': round(ms, 2)} for sql, ms in self.slowest(slowest)],
+            'repeated': [{'sql': _shorten(sql), 'count': count} for sql, count in self.repeated(threshold)]
+        }
+
+
+def _shorten(statement, limit=500):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + '...'
+
+
+# ============================================
+# ENGINE EVENTS
+# ============================================
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active.get():
+        conn.info.setdefault('_profiler_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    active = _active.get()
+    starts = conn.info.get('_profiler_start')
+    if active and starts:
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+        for stats in active:
+            stats.record(statement, elapsed_ms)
+
+
+def install():
+    """Gắn event đo thời gian vào mọi Engine (gọi nhiều lần không sao)"""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+@contextmanager
+def profile():
+    """
+    Đo các câu SQL chạy trong khối with (mọi engine, cùng thread / context)
+
+    Usage:
+        with profile() as stats:
+            InvoiceService.get_all_invoices()
+        print(stats.count)
+    """
+    install()
+    stats = QueryStats()
+    token = _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+
+# ============================================
+# FLASK
+# ============================================
+def _profile_logger(app):
+    """Logger JSON lines xoay vòng, đặt cạnh logs/roommaster.log"""
+    path = app.config['SQL_PROFILER_LOG']
+    logger = logging.getLogger('roommaster.sql_profile')
+    if not any(getattr(handler, 'baseFilename', None) == os.path.abspath(path) for handler in logger.handlers):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=10 * 1024 * 1024, backupCount=5)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def init_profiler(app):
+    """Bật profiler cho app nếu SQL_PROFILER = True"""
+    if not app.config.get('SQL_PROFILER'):
+        return
+
+    install()
+    slowest = app.config['SQL_PROFILER_SLOWEST']
+    threshold = app.config['SQL_PROFILER_REPEAT_THRESHOLD']
+    logger = _profile_logger(app)
+
+    @app.before_request
+    def start_sql_profile():
+        g.sql_profile = QueryStats()
+        g.sql_profile_token = _active.set(_active.get() + (g.sql_profile,))
+        g.sql_profile_started = time.perf_counter()
+
+    @app.after_request
+    def finish_sql_profile(response):
+        stats = g.get('sql_profile')
+        if stats is None:
+            return response
+        total_ms = (time.perf_counter() - g.sql_profile_started) * 1000
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries", app;dur={total_ms:.2f}'
+        )
+
+        summary = stats.summary(slowest, threshold)
+        if summary['repeated']:
+            app.logger.warning('Nghi N+1 tại %s %s: %s', request.method, request.path,
+                               ', '.join(f"{item['count']}× {item['sql'][:80]}" for item in summary['repeated']))
+        logger.info(json.dumps({
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            **summary
+        }, ensure_ascii=False))
+        return response
+
+    @app.teardown_request
+    def stop_sql_profile(exc):
+        # Luôn chạy, kể cả khi view lỗi (after_request bị bỏ qua)
+        token = g.pop('sql_profile_token', None)
+        if token is not None:
+            _active.reset(token)
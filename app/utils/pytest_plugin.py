@@ -0,0 +1,66 @@
+"""
+Pytest Plugin - Query budget: test fail khi endpoint chạy quá số câu SQL cho phép
+
+Bật plugin:
+    pytest -p app.utils.pytest_plugin
+    # hoặc trong conftest.py: pytest_plugins = ['app.utils.pytest_plugin']
+
+Marker (đếm các câu SQL trong thân test, không tính fixture):
+    @pytest.mark.query_budget(12)               # tối đa 12 câu
+    @pytest.mark.query_budget(12, repeats=5)    # và không câu nào lặp >= 5 lần (N+1)
+
+Fixture:
+    def test_list_invoices(client, query_budget):
+        with query_budget(8, repeats=3):
+            client.get('/invoices/')
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from app.utils.profiler import profile
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_budget(max_queries, repeats=None): fail nếu test chạy quá max_queries câu SQL '
+        'hoặc có câu lặp >= repeats lần'
+    )
+
+
+def check_budget(stats, max_queries=None, repeats=None, label='Test'):
+    """pytest.fail kèm chi tiết nếu stats vượt budget"""
+    problems = []
+    if max_queries is not None and stats.count > max_queries:
+        problems.append(f'{stats.count} câu SQL (giới hạn {max_queries}), DB {stats.total_ms:.1f} ms')
+    if repeats:
+        problems += [f'lặp {count} lần (nghi N+1): {sql}' for sql, count in stats.repeated(repeats)]
+    if problems:
+        slowest = '\n'.join(f'    {ms:7.2f} ms  {" ".join(sql.split())[:200]}' for sql, ms in stats.slowest(5))
+        pytest.fail(f'{label} vượt query budget:\n  ' + '\n  '.join(problems)
+                    + f'\n  Câu chậm nhất:\n{slowest}', pytrace=False)
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker('query_budget')
+    if marker is None:
+        return (yield)
+
+    max_queries = marker.args[0] if marker.args else marker.kwargs.get('max_queries')
+    with profile() as stats:
+        result = yield
+    check_budget(stats, max_queries, marker.kwargs.get('repeats'), label=item.nodeid)
+    return result
+
+
+@pytest.fixture
+def query_budget():
+    """Context manager giới hạn số câu SQL của 1 khối code"""
+    @contextmanager
+    def budget(max_queries=None, repeats=None):
+        with profile() as stats:
+            yield stats
+        check_budget(stats, max_queries, repeats, label='Khối query_budget')
+    return budget
@@ -1,65 +1,233 @@
 """
 Backup database script for production
+
+Online backup through the sqlite3 backup API:
+- Pages are copied in batches (pages=) from one read snapshot; in WAL mode
+  the app keeps writing while the backup runs and the copy never restarts
+- The snapshot is compressed with zstd (if `zstandard` is installed) or gzip
+- Restore decompresses in a stream and copies back through the backup API
 """
+import argparse
+import gzip
 import os
 import shutil
+import sqlite3
+import time
 from datetime import datetime
 from pathlib import Path
 
-def backup_database():
-    """Backup SQLite database with timestamp"""
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+BASE_DIR = Path(__file__).parent
+BACKUP_DIR = BASE_DIR / 'backups'
+BACKUP_PREFIX = 'roommaster_backup_'
+
+# Pages copied per backup step (4 KB pages → 4 MB per step)
+DEFAULT_PAGES = 1024
+# Wait before retrying a step that hit a locked database
+STEP_SLEEP = 0.005
+# Read/write chunk when (de)compressing
+CHUNK_SIZE = 1024 * 1024
+
+EXTENSIONS = {'zstd': '.db.zst', 'gzip': '.db.gz', 'none': '.db'}
+
+
+def default_db_path():
+    """roommaster.db, or the file in DATABASE_URL when it is a SQLite URL"""
+    url = os.environ.get('DATABASE_URL', '')
+    if url.startswith('sqlite:///'):
+        return Path(url[len('sqlite:///'):])
+    return BASE_DIR / 'roommaster.db'
+
+
+def default_compression():
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+def _compression_of(path):
+    name = str(path)
+    if name.endswith('.zst'):
+        return 'zstd'
+    if name.endswith('.gz'):
+        return 'gzip'
+    return 'none'
+
+
+def _open_writer(path, compression):
+    """Binary file object that compresses what is written to it"""
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstd compression needs the `zstandard` package')
+        raw = open(path, 'wb')
+        return zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(raw, closefd=True)
+    if compression == 'gzip':
+        return gzip.open(path, 'wb', compresslevel=3)
+    return open(path, 'wb')
+
+
+def _open_reader(path):
+    """Binary file object that decompresses what is read from it"""
+    compression = _compression_of(path)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstd backups need the `zstandard` package')
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _print_progress(status, remaining, total):
+    """progress callback of Connection.backup"""
+    if total:
+        done = (total - remaining) * 100 // total
+        print(f"\r   Copying pages: {done:3d}% ({total - remaining}/{total})", end='', flush=True)
+
+
+def online_copy(source_path, target_path, pages=DEFAULT_PAGES, progress=None, sleep=STEP_SLEEP,
+                snapshot=True):
+    """
+    Copy a live SQLite database to target_path with the backup API
+    
+    WAL mode: the source holds one read transaction for the whole copy, so
+    every step reads the same snapshot. Writers are not blocked (WAL readers
+    never block writers) and their commits do not restart the copy.
+    
+    Rollback-journal mode: the read lock is released after each step of
+    `pages` pages so writers can commit in between; a write makes SQLite
+    restart the copy, so a bigger `pages` finishes in fewer steps.
+    
+    snapshot=True turns the copy into a single self-contained file
+    (journal_mode=DELETE); restore into a live database uses snapshot=False
+    so the app keeps its WAL mode.
+    
+    Returns the number of pages copied
+    """
+    source = sqlite3.connect(str(source_path), timeout=30)
+    target = sqlite3.connect(str(target_path), timeout=30)
+    try:
+        wal = source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        if wal:
+            # Move committed WAL frames into the main file without waiting for readers/writers
+            source.execute('PRAGMA wal_checkpoint(PASSIVE)')
+            # Pin one read snapshot for all steps
+            source.execute('BEGIN')
+            source.execute('SELECT count(*) FROM sqlite_master').fetchone()
+        
+        copied = {'pages': 0}
+        
+        def on_progress(status, remaining, total):
+            copied['pages'] = total
+            if progress:
+                progress(status, remaining, total)
+        
+        source.backup(target, pages=pages, progress=on_progress, sleep=sleep)
+        if wal:
+            source.execute('COMMIT')
+        
+        # The snapshot is a single self-contained file (no -wal/-shm next to it)
+        if snapshot:
+            target.execute('PRAGMA journal_mode=DELETE')
+        return copied['pages']
+    finally:
+        target.close()
+        source.close()
+
+
+def compress_file(source_path, target_path, compression):
+    """Stream source_path into a compressed target_path"""
+    with open(source_path, 'rb') as source, _open_writer(target_path, compression) as target:
+        shutil.copyfileobj(source, target, CHUNK_SIZE)
+
+
+def backup_database(db_path=None, backup_dir=None, compression=None, pages=DEFAULT_PAGES,
+                    verify=False, keep=10, label=BACKUP_PREFIX, quiet=False):
+    """
+    Backup SQLite database with timestamp
     
-    # Paths
-    base_dir = Path(__file__).parent
-    db_path = base_dir / 'roommaster.db'
-    backup_dir = base_dir / 'backups'
+    Returns the backup path, or None on failure
+    """
+    db_path = Path(db_path or default_db_path())
+    backup_dir = Path(backup_dir or BACKUP_DIR)
+    compression = compression or default_compression()
     
     # Create backup directory if not exists
     backup_dir.mkdir(exist_ok=True)
     
     if not db_path.exists():
         print("❌ Database file not found!")
-        return False
+        return None
     
     # Backup filename with timestamp
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_name = f'roommaster_backup_{timestamp}.db'
-    backup_path = backup_dir / backup_name
+    backup_path = backup_dir / f'{label}{timestamp}{EXTENSIONS[compression]}'
+    snapshot_path = backup_dir / f'.{label}{timestamp}.db.tmp'
     
+    started = time.perf_counter()
     try:
-        # Copy database
-        shutil.copy2(db_path, backup_path)
+        online_copy(db_path, snapshot_path, pages=pages,
+                    progress=None if quiet else _print_progress)
+        if not quiet:
+            print()
         
-        # Get file sizes
-        db_size = db_path.stat().st_size / 1024  # KB
-        backup_size = backup_path.stat().st_size / 1024  # KB
+        if verify:
+            with sqlite3.connect(str(snapshot_path)) as conn:
+                result = conn.execute('PRAGMA quick_check').fetchone()[0]
+            if result != 'ok':
+                raise RuntimeError(f'quick_check failed: {result}')
         
-        print("=" * 60)
-        print("✅ Database backup successful!")
-        print("=" * 60)
-        print(f"Original: {db_path} ({db_size:.2f} KB)")
-        print(f"Backup:   {backup_path} ({backup_size:.2f} KB)")
-        print(f"Time:     {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        if compression == 'none':
+            snapshot_path.replace(backup_path)
+        else:
+            compress_file(snapshot_path, backup_path, compression)
         
-        # Clean old backups (keep last 10)
-        clean_old_backups(backup_dir, keep=10)
+        elapsed = time.perf_counter() - started
         
-        return True
+        if not quiet:
+            # Get file sizes
+            db_size = db_path.stat().st_size / 1024  # KB
+            backup_size = backup_path.stat().st_size / 1024  # KB
+            
+            print("=" * 60)
+            print("✅ Database backup successful!")
+            print("=" * 60)
+            print(f"Original: {db_path} ({db_size:.2f} KB)")
+            print(f"Backup:   {backup_path} ({backup_size:.2f} KB, {compression})")
+            print(f"Time:     {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ({elapsed:.2f}s)")
         
+        # Clean old backups (keep last N)
+        if keep:
+            clean_old_backups(backup_dir, keep=keep)
+        
+        return backup_path
+    
     except Exception as e:
         print(f"❌ Backup failed: {e}")
-        return False
+        if backup_path.exists():
+            backup_path.unlink()
+        return None
+    
+    finally:
+        if snapshot_path.exists():
+            snapshot_path.unlink()
+
+
+def _backup_files(backup_dir, label=BACKUP_PREFIX):
+    return sorted(
+        (p for p in backup_dir.glob(f'{label}*') if p.name.endswith(tuple(EXTENSIONS.values()))),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True
+    )
 
 
 def clean_old_backups(backup_dir, keep=10):
     """Keep only the last N backups"""
     
     # Get all backup files
-    backups = sorted(
-        backup_dir.glob('roommaster_backup_*.db'),
-        key=lambda p: p.stat().st_mtime,
-        reverse=True
-    )
+    backups = _backup_files(backup_dir)
     
     # Remove old backups
     removed = 0
@@ -78,18 +246,11 @@ def clean_old_backups(backup_dir, keep=10):
 def list_backups():
     """List all available backups"""
     
-    base_dir = Path(__file__).parent
-    backup_dir = base_dir / 'backups'
-    
-    if not backup_dir.exists():
+    if not BACKUP_DIR.exists():
         print("No backups found.")
         return
     
-    backups = sorted(
-        backup_dir.glob('roommaster_backup_*.db'),
-        key=lambda p: p.stat().st_mtime,
-        reverse=True
-    )
+    backups = _backup_files(BACKUP_DIR)
     
     if not backups:
         print("No backups found.")
@@ -107,55 +268,176 @@ def list_backups():
         print()
 
 
-def restore_backup(backup_name):
-    """Restore database from backup"""
+def restore_backup(backup_name, db_path=None, pages=DEFAULT_PAGES):
+    """
+    Restore database from backup
     
-    base_dir = Path(__file__).parent
-    db_path = base_dir / 'roommaster.db'
-    backup_path = base_dir / 'backups' / backup_name
+    The backup is decompressed in a stream to a temporary file, then copied
+    into the database through the backup API (safe with WAL and open connections).
+    """
+    db_path = Path(db_path or default_db_path())
+    backup_path = Path(backup_name)
+    if not backup_path.exists():
+        backup_path = BACKUP_DIR / backup_name
     
     if not backup_path.exists():
         print(f"❌ Backup file not found: {backup_name}")
         return False
     
+    restore_tmp = db_path.with_name(db_path.name + '.restore-tmp')
     try:
         # Backup current database before restore
         if db_path.exists():
-            current_backup = base_dir / 'backups' / f'before_restore_{datetime.now().strftime("%Y%m%d_%H%M%S")}.db'
-            shutil.copy2(db_path, current_backup)
+            current_backup = backup_database(db_path, pages=pages, keep=0,
+                                             label='before_restore_', quiet=True)
+            if current_backup is None:
+                return False
             print(f"💾 Current database backed up to: {current_backup.name}")
         
+        # Streaming decompress
+        with _open_reader(backup_path) as source, open(restore_tmp, 'wb') as target:
+            shutil.copyfileobj(source, target, CHUNK_SIZE)
+        
         # Restore
-        shutil.copy2(backup_path, db_path)
+        online_copy(restore_tmp, db_path, pages=-1, snapshot=False)
         
         print("=" * 60)
         print("✅ Database restored successfully!")
         print("=" * 60)
-        print(f"Restored from: {backup_name}")
+        print(f"Restored from: {backup_path.name}")
         print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
         return True
-        
+    
     except Exception as e:
         print(f"❌ Restore failed: {e}")
         return False
+    
+    finally:
+        if restore_tmp.exists():
+            restore_tmp.unlink()
 
 
-if __name__ == '__main__':
-    import sys
+# ============================================
+# BENCHMARK
+# ============================================
+def _seed_benchmark_db(path, size_mb):
+    """Fill a WAL-mode database with invoice-like rows until it reaches size_mb"""
+    import random
+    
+    words = ['phong', 'dien', 'nuoc', 'rac', 'wifi', 'thang', 'tien', 'coc', 'hoa', 'don', 'thanh', 'toan']
+    conn = sqlite3.connect(str(path))
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(
+        'CREATE TABLE invoices (id INTEGER PRIMARY KEY, room TEXT, month INTEGER, year INTEGER,'
+        ' electric REAL, water REAL, total REAL, status TEXT, notes TEXT)'
+    )
+    rng = random.Random(42)
+    target = size_mb * 1024 * 1024
+    while path.stat().st_size < target:
+        rows = [
+            (f'P{rng.randint(1, 999):03d}', rng.randint(1, 12), rng.randint(2020, 2026),
+             rng.uniform(0, 500), rng.uniform(0, 50), rng.uniform(1e6, 5e6),
+             rng.choice(('paid', 'unpaid', 'partial')),
+             ' '.join(rng.choice(words) for _ in range(30)))
+            for _ in range(50000)
+        ]
+        conn.executemany('INSERT INTO invoices (room, month, year, electric, water, total, status, notes)'
+                         ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        conn.commit()
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    conn.close()
+
+
+def _timed_backup(db_path, backup_dir, compression, pages):
+    """Run one backup while a writer commits every 10 ms; returns the measurements"""
+    import threading
     
-    if len(sys.argv) > 1:
-        command = sys.argv[1]
+    stop = threading.Event()
+    latencies = []
+    
+    def writer():
+        conn = sqlite3.connect(str(db_path), timeout=30)
+        while not stop.is_set():
+            started = time.perf_counter()
+            conn.execute("INSERT INTO invoices (room, status, notes) VALUES ('BENCH', 'unpaid', '')")
+            conn.commit()
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+        conn.close()
+    
+    thread = threading.Thread(target=writer)
+    thread.start()
+    started = time.perf_counter()
+    path = backup_database(db_path, backup_dir, compression=compression, pages=pages,
+                           keep=0, quiet=True)
+    seconds = time.perf_counter() - started
+    stop.set()
+    thread.join()
+    
+    size = path.stat().st_size
+    path.unlink()
+    latencies.sort()
+    return {
+        'seconds': seconds,
+        'ratio': db_path.stat().st_size / size,
+        'writes': len(latencies),
+        'write_p99_ms': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+        'write_max_ms': latencies[-1] * 1000 if latencies else 0,
+    }
+
+
+def run_benchmark(size_mb=300):
+    """Backup throughput and writer latency on a seeded database"""
+    import tempfile
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        db_path = tmp / 'bench.db'
+        print(f"🌱 Seeding {size_mb} MB database...")
+        _seed_benchmark_db(db_path, size_mb)
+        db_mb = db_path.stat().st_size / 1024 / 1024
         
-        if command == 'list':
-            list_backups()
-        elif command == 'restore' and len(sys.argv) > 2:
-            restore_backup(sys.argv[2])
-        else:
-            print("Usage:")
-            print("  python backup_db.py          - Create backup")
-            print("  python backup_db.py list     - List backups")
-            print("  python backup_db.py restore <filename> - Restore backup")
+        runs = [('none', pages) for pages in (256, DEFAULT_PAGES, 16384, -1)]
+        runs += [(compression, DEFAULT_PAGES) for compression in ('gzip', 'zstd')
+                 if compression != 'zstd' or zstandard is not None]
+        
+        print(f"\n{'compression':<12}{'pages':>8}{'seconds':>10}{'MB/s':>10}{'ratio':>8}"
+              f"{'writes':>8}{'w p99 ms':>10}{'w max ms':>10}")
+        for compression, pages in runs:
+            result = _timed_backup(db_path, tmp, compression, pages)
+            print(f"{compression:<12}{pages:>8}{result['seconds']:>10.2f}"
+                  f"{db_mb / result['seconds']:>10.1f}{result['ratio']:>8.2f}"
+                  f"{result['writes']:>8}{result['write_p99_ms']:>10.1f}{result['write_max_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backup / restore the RoomMaster SQLite database')
+    parser.add_argument('command', nargs='?', default='backup',
+                        choices=['backup', 'list', 'restore', 'benchmark'])
+    parser.add_argument('filename', nargs='?', help='Backup file to restore')
+    parser.add_argument('--db', help='Database file (default: DATABASE_URL or roommaster.db)')
+    parser.add_argument('--compression', choices=list(EXTENSIONS), default=None,
+                        help='zstd (if installed) or gzip by default')
+    parser.add_argument('--pages', type=int, default=DEFAULT_PAGES,
+                        help='Pages copied per backup step (-1 = all at once)')
+    parser.add_argument('--verify', action='store_true', help='Run PRAGMA quick_check on the snapshot')
+    parser.add_argument('--keep', type=int, default=10, help='Number of backups to keep')
+    parser.add_argument('--size-mb', type=int, default=300, help='Benchmark database size')
+    args = parser.parse_args()
+    
+    if args.command == 'list':
+        list_backups()
+    elif args.command == 'restore':
+        if not args.filename:
+            parser.error('restore needs a backup filename')
+        restore_backup(args.filename, db_path=args.db, pages=args.pages)
+    elif args.command == 'benchmark':
+        run_benchmark(size_mb=args.size_mb)
     else:
-        # Default: create backup
-        backup_database()
+        backup_database(args.db, compression=args.compression, pages=args.pages,
+                        verify=args.verify, keep=args.keep)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+"""
+Benchmarks - Đo hiệu năng các endpoint chính trên danh mục phòng giả lập
+
+Sinh dữ liệu xác định (cùng seed → cùng dữ liệu) từ 10 tới 100k phòng kèm
+vài năm hóa đơn/thanh toán, gọi endpoint thật qua Flask test client, ghi
+p50/p95 và số câu SQL ra file JSON; so với baseline để bắt chỗ chậm đi.
+Load test thu tiền đồng thời: benchmarks/payments.py.
+
+Usage:
+    python -m benchmarks run --rooms 1000 --output benchmarks/results/baseline.json
+    python -m benchmarks run --rooms 1000 --compare benchmarks/results/baseline.json
+    python -m benchmarks compare benchmarks/results/baseline.json benchmarks/results/latest.json
+    python -m benchmarks generate --rooms 100000 --database /tmp/roommaster-100k.db
+    python -m benchmarks payments --workers 4 --concurrency 32   # thu tiền đồng thời trên gunicorn
+"""
@@ -0,0 +1,128 @@
+"""
+CLI benchmark: python -m benchmarks <generate|run|compare>
+"""
+import os
+import sys
+
+import click
+
+from benchmarks.runner import DEFAULT_THRESHOLD, compare, format_comparison, load, run, save
+
+DEFAULT_OUTPUT = os.path.join('benchmarks', 'results', 'latest.json')
+
+
+def _report_comparison(baseline, current, threshold):
+    rows, regressions = compare(baseline, current, threshold=threshold)
+    if baseline.get('meta', {}).get('rooms') != current.get('meta', {}).get('rooms'):
+        print('⚠️  Baseline và lần chạy này khác số phòng - so sánh chỉ mang tính tham khảo')
+    print(format_comparison(rows))
+    if regressions:
+        print(f'\n❌ {len(regressions)} chỉ số chậm đi quá {threshold:.0%}')
+        sys.exit(1)
+    print(f'\n✅ Không có chỉ số nào chậm đi quá {threshold:.0%}')
+
+
+@click.group()
+def cli():
+    """RoomMaster performance benchmarks"""
+
+
+@cli.command()
+@click.option('--rooms', type=click.IntRange(10, 100_000), default=1000, help='Số phòng')
+@click.option('--years', type=click.IntRange(1, 10), default=3, help='Số năm hóa đơn')
+@click.option('--seed', type=int, default=42, help='Seed sinh dữ liệu')
+@click.option('--database', type=click.Path(dir_okay=False), required=True, help='File SQLite đầu ra (phải chưa có)')
+def generate(rooms, years, seed, database):
+    """Generate a synthetic portfolio into a new SQLite database"""
+    from app import create_app, db
+    from benchmarks.generator import generate as generate_portfolio
+    from benchmarks.runner import BenchmarkConfig
+    
+    if os.path.exists(database):
+        raise click.ClickException(f'{database} đã tồn tại')
+    
+    class _Config(BenchmarkConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.abspath(database)
+    
+    app = create_app(_Config)
+    with app.app_context():
+        db.create_all()
+        counts = generate_portfolio(rooms, years=years, seed=seed, progress=print)
+    print('✅ ' + ', '.join(f'{table} {count:,}' for table, count in counts.items()))
+
+
+@cli.command('run')
+@click.option('--rooms', type=click.IntRange(10, 100_000), default=1000, help='Số phòng')
+@click.option('--years', type=click.IntRange(1, 10), default=3, help='Số năm hóa đơn')
+@click.option('--seed', type=int, default=42, help='Seed sinh dữ liệu')
+@click.option('--iterations', type=click.IntRange(1), default=20, help='Số lần đo mỗi kịch bản')
+@click.option('--scenario', 'only', multiple=True, help='Chỉ chạy kịch bản này (lặp lại được)')
+@click.option('--database', type=click.Path(dir_okay=False), default=None,
+              help='File SQLite (mặc định: file tạm, xóa sau khi chạy)')
+@click.option('--output', type=click.Path(dir_okay=False), default=DEFAULT_OUTPUT, show_default=True,
+              help='File JSON kết quả')
+@click.option('--compare', 'baseline', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='So với baseline này, exit 1 nếu chậm đi')
+@click.option('--threshold', type=float, default=DEFAULT_THRESHOLD, show_default=True,
+              help='Ngưỡng chậm đi (0.10 = 10%)')
+def run_command(rooms, years, seed, iterations, only, database, output, baseline, threshold):
+    """Generate data, run every scenario and write a JSON result"""
+    if database and os.path.exists(database):
+        raise click.ClickException(f'{database} đã tồn tại')
+    
+    print(f'⏱️  {rooms:,} phòng × {years} năm, {iterations} lần đo mỗi kịch bản')
+    result = run(rooms=rooms, years=years, seed=seed, iterations=iterations,
+                 database=database, only=set(only) or None, progress=print)
+    save(result, output)
+    print(f'💾 Đã ghi {output}')
+    
+    if baseline:
+        print()
+        _report_comparison(load(baseline), result, threshold)
+
+
+@cli.command('compare')
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('current', type=click.Path(exists=True, dir_okay=False))
+@click.option('--threshold', type=float, default=DEFAULT_THRESHOLD, show_default=True,
+              help='Ngưỡng chậm đi (0.10 = 10%)')
+def compare_command(baseline, current, threshold):
+    """Compare two results; exit 1 on a regression above the threshold"""
+    _report_comparison(load(baseline), load(current), threshold)
+
+
+@cli.command('payments')
+@click.option('--rooms', type=click.IntRange(10, 100_000), default=200, help='Số phòng (database mới)')
+@click.option('--invoices', type=click.IntRange(1), default=20, help='Số hóa đơn bị thu đồng thời')
+@click.option('--per-invoice', type=click.IntRange(1), default=6, help='Số lần thu song song mỗi hóa đơn')
+@click.option('--parts', type=click.IntRange(1), default=4, help='Mỗi lần thu 1/parts tổng tiền')
+@click.option('--edits', type=click.IntRange(0), default=4, help='Số lần sửa số tiền song song mỗi hóa đơn')
+@click.option('--concurrency', type=click.IntRange(1), default=16, help='Số kết nối song song')
+@click.option('--workers', type=click.IntRange(1), default=4, help='Số worker gunicorn')
+@click.option('--seed', type=int, default=42, help='Seed sinh dữ liệu')
+@click.option('--database-url', default=None,
+              help='Database dùng thử (mặc định: SQLite tạm). PostgreSQL: database trống, KHÔNG dùng database thật')
+@click.option('--url', default=None, help='Server có sẵn (đang chạy với --database-url), không tự chạy gunicorn')
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help='Ghi kết quả ra file JSON')
+def payments_command(rooms, invoices, per_invoice, parts, edits, concurrency, workers, seed, database_url, url, output):
+    """Load-test concurrent payment recording against gunicorn; exit 1 if the ledger is inconsistent"""
+    from benchmarks.payments import format_report, run_payments
+    
+    print(f'⏱️  {invoices} hóa đơn × {per_invoice} lần thu + {edits} lần sửa song song, {concurrency} kết nối')
+    try:
+        result = run_payments(rooms=rooms, invoices=invoices, per_invoice=per_invoice, parts=parts, edits=edits,
+                              concurrency=concurrency, workers=workers, seed=seed,
+                              database_url=database_url, url=url, progress=print)
+    except (RuntimeError, ValueError) as e:
+        raise click.ClickException(str(e))
+    
+    print(format_report(result))
+    if output:
+        save(result, output)
+        print(f'💾 Đã ghi {output}')
+    if result['ledger_problems'] or result['errors']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    cli()
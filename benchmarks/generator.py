@@ -0,0 +1,225 @@
+"""
+Generator - Dữ liệu giả lập (deterministic) cho benchmark
+
+Cùng seed + cùng tháng mốc → cùng dữ liệu. Ghi thẳng bằng INSERT hàng loạt
+(executemany, mỗi lô BATCH_SIZE dòng, khóa chính gán sẵn), không qua ORM
+từng object, nên 100k phòng × vài năm hóa đơn vẫn tạo được trong vài phút.
+
+Danh mục tạo ra:
+- 1 admin (admin / admin123)
+- N phòng, 20 phòng/tầng: ~85% đang thuê, ~5% sửa chữa, còn lại trống
+- Khách đang ở cho mỗi phòng đang thuê (30% có thêm người ở ghép)
+  + 1 khách đã chuyển đi cho mỗi phòng
+- Hóa đơn hàng tháng của mọi phòng đang thuê trong `years` năm tới tháng mốc,
+  chỉ số điện/nước tăng dần; các lần thanh toán tương ứng (tháng cũ gần như
+  đã trả hết, tháng gần đây còn nợ / trả một phần)
+"""
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert, text
+
+from app import db
+from app.models import Invoice, Payment, Room, Tenant, User
+from app.services import SearchService, SnapshotService
+from app.utils.money import usage_cost
+
+BATCH_SIZE = 5000
+ROOMS_PER_FLOOR = 20
+
+ELECTRIC_PRICE = 3500
+WATER_PRICE = 20000
+
+_FAMILY_NAMES = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Huỳnh', 'Phan', 'Vũ', 'Võ', 'Đặng', 'Bùi', 'Đỗ']
+_MIDDLE_NAMES = ['Văn', 'Thị', 'Hữu', 'Minh', 'Thanh', 'Ngọc', 'Đức', 'Thu', 'Quốc', 'Gia']
+_GIVEN_NAMES = ['An', 'Bình', 'Châu', 'Dũng', 'Giang', 'Hà', 'Hải', 'Hương', 'Khải', 'Lan',
+                'Long', 'Mai', 'Nam', 'Phúc', 'Quân', 'Sơn', 'Tâm', 'Thảo', 'Trang', 'Việt']
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _add_months(year, month, count):
+    index = year * 12 + month - 1 + count
+    return index // 12, index % 12 + 1
+
+
+class _BatchWriter:
+    """Gom dòng theo model, INSERT hàng loạt khi đủ BATCH_SIZE"""
+
+    def __init__(self):
+        self.rows = {}
+        self.counts = {}
+
+    def add(self, model, row):
+        rows = self.rows.setdefault(model, [])
+        rows.append(row)
+        if len(rows) >= BATCH_SIZE:
+            self.flush(model)
+
+    def flush(self, model=None):
+        # Thứ tự theo khóa ngoại: phòng → khách → hóa đơn → thanh toán
+        for current in [model] if model else [Room, Tenant, Invoice, Payment]:
+            rows = self.rows.get(current)
+            if rows:
+                db.session.execute(insert(current), rows)
+                self.counts[current.__tablename__] = self.counts.get(current.__tablename__, 0) + len(rows)
+                self.rows[current] = []
+
+
+def _reset_sequences():
+    """PostgreSQL: INSERT với id gán sẵn không tăng sequence → đặt sequence = MAX(id)"""
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for model in (Room, Tenant, Invoice, Payment):
+        table = model.__tablename__
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+        ))
+
+
+def generate(rooms, years=3, seed=42, anchor=None, progress=None):
+    """
+    Tạo danh mục phòng/khách/hóa đơn/thanh toán trong database rỗng
+
+    Args:
+        rooms: Số phòng
+        years: Số năm hóa đơn (tính lùi từ tháng mốc)
+        seed: Seed của bộ sinh số ngẫu nhiên
+        anchor: Tháng mốc (mặc định: tháng hiện tại) - tháng hóa đơn mới nhất
+        progress: Hàm nhận chuỗi thông báo tiến độ (tùy chọn)
+
+    Returns:
+        Dict {tên bảng: số dòng đã tạo}
+    """
+    if db.session.query(func.count(Room.id)).scalar():
+        raise ValueError('Database đã có dữ liệu - benchmark cần database rỗng')
+
+    rng = random.Random(seed)
+    anchor = _month_start(anchor or date.today())
+    first_year, first_month = _add_months(anchor.year, anchor.month, -(12 * years - 1))
+    now = datetime.combine(anchor, datetime.min.time())
+    report = progress or (lambda message: None)
+
+    admin = User(username='admin', email='admin@roommaster.local', full_name='Benchmark Admin', role='admin')
+    admin.set_password('admin123')
+    db.session.add(admin)
+    db.session.flush()
+
+    writer = _BatchWriter()
+    tenant_id = invoice_id = payment_id = 0
+
+    for room_id in range(1, rooms + 1):
+        floor = (room_id - 1) // ROOMS_PER_FLOOR + 1
+        price = rng.randrange(1_500_000, 6_000_001, 50_000)
+        roll = rng.random()
+        status = 'occupied' if roll < 0.85 else 'maintenance' if roll < 0.90 else 'available'
+        writer.add(Room, {
+            'id': room_id,
+            'room_number': f'P{floor:03d}{(room_id - 1) % ROOMS_PER_FLOOR + 1:02d}',
+            'floor': floor,
+            'area': rng.choice((15.0, 18.0, 20.0, 25.0, 30.0)),
+            'price': price,
+            'deposit': price,
+            'status': status,
+            'created_at': datetime(first_year, first_month, 1) - timedelta(days=rng.randrange(1, 365)),
+            'updated_at': now
+        })
+
+        # Khách đã chuyển đi (lịch sử) + khách đang ở
+        move_in = date(first_year, first_month, 1) + timedelta(days=rng.randrange(0, 28))
+        occupants = [('moved_out', move_in - timedelta(days=rng.randrange(200, 700)), move_in)]
+        if status == 'occupied':
+            occupants.append(('active', move_in, None))
+            if rng.random() < 0.3:
+                occupants.append(('active', move_in + timedelta(days=rng.randrange(0, 365 * years)), None))
+        for index, (tenant_status, move_in_date, move_out_date) in enumerate(occupants):
+            tenant_id += 1
+            writer.add(Tenant, {
+                'id': tenant_id,
+                'full_name': f'{rng.choice(_FAMILY_NAMES)} {rng.choice(_MIDDLE_NAMES)} {rng.choice(_GIVEN_NAMES)}',
+                'id_number': f'{tenant_id:012d}',
+                'phone': f'09{rng.randrange(10 ** 8):08d}',
+                'room_id': room_id,
+                'move_in_date': min(move_in_date, anchor),
+                'move_out_date': move_out_date,
+                'deposit': price if index < 2 else 0,
+                'is_main_tenant': index < 2,
+                'status': tenant_status,
+                'created_at': datetime.combine(min(move_in_date, anchor), datetime.min.time())
+            })
+
+        if status != 'occupied':
+            continue
+
+        # Hóa đơn từng tháng, chỉ số điện/nước nối tiếp nhau
+        electric = float(rng.randrange(100, 5000))
+        water = float(rng.randrange(10, 500))
+        for offset in range(12 * years):
+            year, month = _add_months(first_year, first_month, offset)
+            age = (anchor.year - year) * 12 + anchor.month - month  # 0 = tháng mốc
+            electric_new = electric + rng.randrange(60, 300) + rng.choice((0.0, 0.5))
+            water_new = water + rng.randrange(2, 12)
+            other_fees = rng.choice((50_000, 100_000, 150_000))
+            total = (price + usage_cost(electric, electric_new, ELECTRIC_PRICE)
+                     + usage_cost(water, water_new, WATER_PRICE) + other_fees)
+            issued = datetime(year, month, 1, 9)
+            due = issued + timedelta(days=7)
+
+            roll = rng.random()
+            paid_share = (1.0 if roll < 0.97 else 0.5) if age >= 2 else \
+                (1.0 if roll < 0.70 else 0.5 if roll < 0.85 else 0.0) if age == 1 else \
+                (1.0 if roll < 0.30 else 0.0)
+            paid = int(total * paid_share)
+
+            invoice_id += 1
+            writer.add(Invoice, {
+                'id': invoice_id,
+                'room_id': room_id,
+                'created_by': admin.id,
+                'month': month,
+                'year': year,
+                'room_price': price,
+                'electric_old': electric,
+                'electric_new': electric_new,
+                'electric_unit_price': ELECTRIC_PRICE,
+                'water_old': water,
+                'water_new': water_new,
+                'water_unit_price': WATER_PRICE,
+                'other_fees': other_fees,
+                'total_amount': total,
+                'paid_amount': paid,
+                'status': 'paid' if paid >= total else 'partial' if paid else 'unpaid',
+                'created_at': issued,
+                'due_date': due,
+                'payment_date': due - timedelta(days=2) if paid >= total else None
+            })
+
+            # 20% trả làm 2 lần
+            installments = [paid] if paid and rng.random() >= 0.2 else [paid // 2, paid - paid // 2] if paid else []
+            for number, amount in enumerate(installments):
+                payment_id += 1
+                writer.add(Payment, {
+                    'id': payment_id,
+                    'invoice_id': invoice_id,
+                    'amount': amount,
+                    'payment_method': rng.choice(('cash', 'bank_transfer')),
+                    'payment_date': issued + timedelta(days=2 + number * 3),
+                    'created_at': issued + timedelta(days=2 + number * 3)
+                })
+            electric, water = electric_new, water_new
+
+        if room_id % 10_000 == 0:
+            report(f'{room_id:,}/{rooms:,} phòng')
+
+    writer.flush()
+    _reset_sequences()
+
+    report('Dựng index tìm kiếm và snapshot báo cáo...')
+    SearchService.rebuild()
+    db.session.commit()
+    SnapshotService.rebuild(force=True, now=now.replace(day=28))
+
+    counts = dict(writer.counts, users=1)
+    return counts
@@ -0,0 +1,395 @@
+"""
+Payments - Load test thu tiền đồng thời trên gunicorn (nhiều worker)
+
+Nhiều "thu ngân" cùng thu tiền các hóa đơn giống nhau: mỗi hóa đơn nhận
+`per_invoice` lần thu song song, mỗi lần 1/`parts` tổng tiền. Đúng ra chỉ đúng
+`parts` lần được ghi nhận, các lần còn lại bị từ chối vì vượt số còn nợ.
+Sau đó mỗi hóa đơn nhận `edits` lần sửa số tiền song song trên các thanh toán
+vừa tạo (số tiền ngẫu nhiên, có lần làm tổng vượt hóa đơn → bị từ chối).
+
+Các bước:
+1. Tạo database (SQLite tạm hoặc --database-url) với dữ liệu benchmark
+2. Chạy gunicorn với database đó (hoặc dùng server có sẵn: --url)
+3. Client asyncio (chỉ dùng thư viện chuẩn) gửi các POST /invoices/<id>/payment song song,
+   rồi các POST /invoices/payment/<id>/edit song song
+4. Báo cáo throughput, latency, tỷ lệ thử lại (header X-Payment-Attempts)
+   và kiểm tra sổ cái: paid_amount = SUM(payments), không hóa đơn nào bị thu thừa,
+   số thanh toán mới = số lần được ghi nhận
+"""
+import asyncio
+import importlib.util
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode, urlsplit
+
+from sqlalchemy import func, select
+
+from app import create_app, db
+from app.models import Invoice, Payment
+from benchmarks.runner import BenchmarkConfig, percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CSRF_TOKEN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+# ============================================
+# HTTP CLIENT (asyncio)
+# ============================================
+class HttpClient:
+    """HTTP/1.1 client tối giản trên asyncio streams: 1 kết nối mỗi request, có cookie"""
+    
+    def __init__(self, base_url, cookies=None):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.cookies = dict(cookies or {})
+    
+    async def request(self, method, path, form=None, timeout=60):
+        """
+        Gửi 1 request
+        
+        Returns:
+            (status, headers (tên viết thường), body bytes)
+        """
+        body = urlencode(form).encode() if form is not None else b''
+        lines = [f'{method} {self.prefix}{path} HTTP/1.1', f'Host: {self.host}:{self.port}',
+                 'Connection: close', f'Content-Length: {len(body)}']
+        if form is not None:
+            lines.append('Content-Type: application/x-www-form-urlencoded')
+        if self.cookies:
+            lines.append('Cookie: ' + '; '.join(f'{name}={value}' for name, value in self.cookies.items()))
+        
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+            await writer.drain()
+            raw = await asyncio.wait_for(reader.read(), timeout)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+        
+        head, _, content = raw.partition(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            name, value = name.strip().lower(), value.strip()
+            if name == 'set-cookie':
+                cookie = value.split(';', 1)[0]
+                key, _, cookie_value = cookie.partition('=')
+                self.cookies[key.strip()] = cookie_value.strip()
+            headers[name] = value
+        return int(status_line.split()[1]), headers, content
+    
+    async def login(self, username, password):
+        """Đăng nhập qua form (kèm CSRF token)"""
+        status, _, body = await self.request('GET', '/auth/login')
+        match = _CSRF_TOKEN.search(body.decode('utf-8', 'replace'))
+        form = {'username': username, 'password': password}
+        if match:
+            form['csrf_token'] = match.group(1)
+        status, _, _ = await self.request('POST', '/auth/login', form)
+        if status != 302:
+            raise RuntimeError(f'Đăng nhập thất bại (HTTP {status})')
+
+
+# ============================================
+# SERVER
+# ============================================
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(database_url, workers, log_path):
+    """
+    Chạy `gunicorn run:app` với database cho trước, chờ tới khi nhận kết nối
+    
+    Returns:
+        (process, base_url)
+    """
+    if importlib.util.find_spec('gunicorn') is None:
+        raise RuntimeError('Chưa cài gunicorn: pip install gunicorn (hoặc dùng --url với server có sẵn)')
+    
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, METRICS_ENABLED='false', SQL_PROFILER='0')
+    with open(log_path, 'wb') as log:
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+             '--timeout', '60', 'run:app'],
+            cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+    
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            with open(log_path, encoding='utf-8', errors='replace') as log:
+                raise RuntimeError('gunicorn dừng khi khởi động:\n' + log.read()[-2000:])
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process, f'http://127.0.0.1:{port}'
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn không sẵn sàng sau 30 giây')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+# ============================================
+# DỮ LIỆU + KIỂM TRA SỔ CÁI
+# ============================================
+def payments_of(targets):
+    """Các thanh toán của hóa đơn bị thu: list (payment id, invoice id, số tiền)"""
+    ids = [invoice_id for invoice_id, _ in targets]
+    return db.session.query(Payment.id, Payment.invoice_id, Payment.amount)\
+        .filter(Payment.invoice_id.in_(ids)).order_by(Payment.id).all()
+
+
+def prepare_targets(count):
+    """Các hóa đơn chưa thu đồng nào của tháng mới nhất: list (id, total_amount)"""
+    latest = db.session.query(Invoice.year, Invoice.month)\
+        .order_by(Invoice.year.desc(), Invoice.month.desc()).first()
+    rows = db.session.query(Invoice.id, Invoice.total_amount).filter(
+        Invoice.year == latest.year, Invoice.month == latest.month,
+        Invoice.paid_amount == 0, Invoice.total_amount > 0
+    ).order_by(Invoice.id).limit(count).all()
+    if len(rows) < count:
+        raise RuntimeError(f'Chỉ có {len(rows)} hóa đơn chưa thanh toán - tăng --rooms')
+    return [(row.id, row.total_amount) for row in rows]
+
+
+def check_ledger(targets, payments_before, accepted, expected):
+    """
+    Kiểm tra sổ cái sau load test
+    
+    Args:
+        targets: list (id, total_amount) các hóa đơn bị thu
+        payments_before: Số thanh toán trước khi chạy
+        accepted: Số lần server báo đã ghi nhận
+        expected: Số lần thu mỗi hóa đơn phải được ghi nhận (None: không kiểm tra,
+            khi có request lỗi / hết lượt thử)
+    
+    Returns:
+        List chuỗi mô tả lỗi (rỗng = nhất quán)
+    """
+    problems = []
+    ids = [invoice_id for invoice_id, _ in targets]
+    sums = dict(db.session.execute(
+        select(Payment.invoice_id, func.sum(Payment.amount)).where(Payment.invoice_id.in_(ids))
+        .group_by(Payment.invoice_id)
+    ).all())
+    counts = dict(db.session.execute(
+        select(Payment.invoice_id, func.count(Payment.id)).where(Payment.invoice_id.in_(ids))
+        .group_by(Payment.invoice_id)
+    ).all())
+    
+    for invoice in db.session.query(Invoice).filter(Invoice.id.in_(ids)).order_by(Invoice.id):
+        paid = sums.get(invoice.id, 0)
+        if invoice.paid_amount != paid:
+            problems.append(f'Hóa đơn {invoice.id}: paid_amount {invoice.paid_amount:,} ≠ SUM(payments) {paid:,}')
+        if paid > invoice.total_amount:
+            problems.append(f'Hóa đơn {invoice.id}: thu thừa {paid - invoice.total_amount:,}đ')
+        if expected is not None and counts.get(invoice.id, 0) != expected:
+            problems.append(f'Hóa đơn {invoice.id}: {counts.get(invoice.id, 0)} lần thu (đúng ra {expected})')
+        status = 'unpaid' if paid == 0 else 'paid' if paid >= invoice.total_amount else 'partial'
+        if invoice.status != status:
+            problems.append(f'Hóa đơn {invoice.id}: trạng thái {invoice.status} (đúng ra {status})')
+    
+    created = db.session.query(func.count(Payment.id)).scalar() - payments_before
+    if created != accepted:
+        problems.append(f'{created} thanh toán mới trong database nhưng server báo ghi nhận {accepted}')
+    
+    # Toàn bộ database: paid_amount khớp bảng payments
+    totals = select(Payment.invoice_id, func.sum(Payment.amount).label('paid'))\
+        .group_by(Payment.invoice_id).subquery()
+    mismatched = db.session.query(func.count(Invoice.id))\
+        .outerjoin(totals, totals.c.invoice_id == Invoice.id)\
+        .filter(Invoice.paid_amount != func.coalesce(totals.c.paid, 0)).scalar()
+    if mismatched:
+        problems.append(f'{mismatched} hóa đơn có paid_amount lệch bảng payments')
+    return problems
+
+
+# ============================================
+# LOAD TEST
+# ============================================
+async def _fire(base_url, cookies, jobs, concurrency):
+    """Gửi các request (path, form) với `concurrency` kết nối song song"""
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    outcomes = []
+    
+    async def cashier():
+        client = HttpClient(base_url, cookies)
+        while not queue.empty():
+            path, form = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                status, headers, _ = await client.request('POST', path, form)
+            except (OSError, asyncio.TimeoutError) as e:
+                status, headers = None, {'error': repr(e)}
+            outcomes.append((status, headers, (time.perf_counter() - started) * 1000))
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(cashier() for _ in range(concurrency)))
+    return outcomes, time.perf_counter() - started
+
+
+def _summarize(outcomes):
+    """(ghi nhận (headers), số lần hết lượt thử, số lỗi HTTP) của 1 đợt request"""
+    accepted = [headers for status, headers, _ in outcomes if status == 302 and 'x-payment-attempts' in headers]
+    busy = sum(1 for status, headers, _ in outcomes if status == 302 and 'retry-after' in headers)
+    errors = sum(1 for status, _, _ in outcomes if status != 302)
+    return accepted, busy, errors
+
+
+def run_payments(rooms=200, invoices=20, per_invoice=6, parts=4, edits=4, concurrency=16, workers=4,
+                 seed=42, database_url=None, url=None, progress=None):
+    """
+    Chạy load test thu tiền đồng thời
+    
+    Args:
+        rooms: Số phòng của dữ liệu benchmark (bỏ qua khi dùng database có sẵn dữ liệu)
+        invoices: Số hóa đơn bị thu đồng thời
+        per_invoice: Số lần thu song song mỗi hóa đơn (> parts để có tranh chấp vượt số nợ)
+        parts: Mỗi lần thu 1/parts tổng tiền
+        edits: Số lần sửa số tiền song song mỗi hóa đơn (sau đợt thu)
+        concurrency: Số kết nối song song
+        workers: Số worker gunicorn
+        database_url: Database (mặc định: SQLite tạm); rỗng thì tạo dữ liệu benchmark
+        url: Server có sẵn (đang dùng database_url) - không chạy gunicorn
+        progress: Hàm nhận chuỗi thông báo tiến độ (tùy chọn)
+    
+    Returns:
+        Dict kết quả (xem format_report)
+    """
+    from benchmarks.generator import generate
+    
+    report = progress or (lambda message: None)
+    if url and not database_url:
+        raise ValueError('--url cần --database-url của server đó để kiểm tra sổ cái')
+    
+    with tempfile.TemporaryDirectory(prefix='roommaster-payments-') as tmp:
+        database_url = database_url or 'sqlite:///' + os.path.join(tmp, 'payments.db')
+        
+        class _Config(BenchmarkConfig):
+            SQLALCHEMY_DATABASE_URI = database_url
+        
+        app = create_app(_Config)
+        with app.app_context():
+            db.create_all()
+            if not db.session.query(func.count(Invoice.id)).scalar():
+                generate(rooms, years=1, seed=seed, progress=report)
+            targets = prepare_targets(invoices)
+            payments_before = db.session.query(func.count(Payment.id)).scalar()
+            db.session.remove()
+        
+        expected = min(per_invoice, parts)  # số lần thu mỗi hóa đơn được ghi nhận
+        rng = random.Random(seed)
+        jobs = [(f'/invoices/{invoice_id}/payment', {'amount': total // parts, 'payment_method': 'cash',
+                                                      'notes': 'load test'})
+                for invoice_id, total in targets for _ in range(per_invoice)]
+        rng.shuffle(jobs)
+        
+        process = None
+        try:
+            if url is None:
+                process, url = start_gunicorn(database_url, workers, os.path.join(tmp, 'gunicorn.log'))
+                report(f'gunicorn {workers} worker tại {url}')
+            
+            async def main(jobs):
+                client = HttpClient(url)
+                await client.login('admin', 'admin123')
+                return await _fire(url, client.cookies, jobs, concurrency)
+            
+            outcomes, elapsed = asyncio.run(main(jobs))
+            
+            # Đợt 2: sửa số tiền các thanh toán vừa tạo, nhiều lần sửa cùng hóa đơn song song
+            with app.app_context():
+                by_invoice = {}
+                for payment_id, invoice_id, amount in payments_of(targets):
+                    by_invoice.setdefault(invoice_id, []).append((payment_id, amount))
+                db.session.remove()
+            edit_jobs = [
+                (f'/invoices/payment/{payment_id}/edit', {'amount': rng.randint(amount // 2, amount * 3 // 2)})
+                for payments in by_invoice.values()
+                for payment_id, amount in (payments[i % len(payments)] for i in range(edits))
+            ]
+            rng.shuffle(edit_jobs)
+            edit_outcomes, _ = asyncio.run(main(edit_jobs)) if edit_jobs else ([], 0)
+        finally:
+            if process is not None:
+                stop_server(process)
+        
+        accepted, busy, errors = _summarize(outcomes)
+        edits_accepted, edits_busy, edits_errors = _summarize(edit_outcomes)
+        attempts = [int(headers['x-payment-attempts']) for headers in accepted + edits_accepted]
+        latencies = [ms for _, _, ms in outcomes]
+        
+        with app.app_context():
+            problems = check_ledger(targets, payments_before, len(accepted),
+                                    None if busy or errors else expected)
+            db.session.remove()
+            db.engine.dispose()
+    
+    return {
+        'requests': len(outcomes),
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(outcomes) / elapsed, 1),
+        'payments_per_second': round(len(accepted) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'accepted': len(accepted),
+        'rejected': len(outcomes) - len(accepted) - busy - errors,
+        'busy': busy + edits_busy,
+        'errors': errors + edits_errors,
+        'edit_requests': len(edit_outcomes),
+        'edits_accepted': len(edits_accepted),
+        'edits_rejected': len(edit_outcomes) - len(edits_accepted) - edits_busy - edits_errors,
+        'retries': sum(attempts) - len(attempts),
+        'retry_rate': round(sum(1 for count in attempts if count > 1) / len(attempts), 4) if attempts else 0.0,
+        'max_attempts': max(attempts, default=0),
+        'expected_accepted': len(targets) * expected,
+        'ledger_problems': problems
+    }
+
+
+def format_report(result):
+    """Báo cáo dạng text"""
+    lines = [
+        f"Requests        {result['requests']:>8} trong {result['seconds']:.2f}s "
+        f"({result['throughput_rps']:.1f} req/s, {result['payments_per_second']:.1f} thanh toán/s)",
+        f"Latency         p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms",
+        f"Ghi nhận        {result['accepted']:>8} (đúng ra {result['expected_accepted']})",
+        f"Từ chối         {result['rejected']:>8} (vượt số còn nợ / đã thanh toán đủ)",
+        f"Sửa thanh toán  {result['edit_requests']:>8} yêu cầu: {result['edits_accepted']} ghi nhận, "
+        f"{result['edits_rejected']} từ chối (tổng đã thu vượt hóa đơn)",
+        f"Hết lượt thử    {result['busy']:>8}",
+        f"Lỗi HTTP        {result['errors']:>8}",
+        f"Thử lại         {result['retries']:>8} lần, {result['retry_rate']:.1%} lần thu / sửa phải thử lại "
+        f"(tối đa {result['max_attempts']} lần)",
+    ]
+    if result['ledger_problems']:
+        lines.append('❌ Sổ cái KHÔNG nhất quán:')
+        lines += [f'   - {problem}' for problem in result['ledger_problems'][:20]]
+    else:
+        lines.append('✅ Sổ cái nhất quán: paid_amount = SUM(payments), không thu thừa, không mất thanh toán')
+    return '\n'.join(lines)
@@ -0,0 +1,251 @@
+"""
+Runner - Chạy các kịch bản qua endpoint thật (Flask test client), ghi baseline JSON
+
+Mỗi kịch bản: 1 request khởi động (không tính), sau đó `iterations` lần đo.
+Mỗi lần đo ghi thời gian phản hồi và số câu SQL (app.utils.profiler.profile).
+
+Kết quả JSON:
+    {
+        "meta": {"rooms": ..., "years": ..., "seed": ..., "iterations": ..., "python": ..., ...},
+        "results": {
+            "invoices.list": {"p50_ms": ..., "p95_ms": ..., "mean_ms": ..., "queries": ..., "samples": ...},
+            ...
+        }
+    }
+
+So sánh (compare): kịch bản bị coi là chậm đi khi p50/p95 tăng quá ngưỡng
+(mặc định 10%) VÀ tăng ít nhất MIN_DELTA_MS (tránh nhiễu ở kịch bản < 1 ms),
+hoặc số câu SQL tăng quá ngưỡng.
+"""
+import json
+import math
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from config import Config
+
+from app import create_app, db
+from app.utils.profiler import profile
+
+DEFAULT_THRESHOLD = 0.10
+MIN_DELTA_MS = 1.0
+BULK_ITERATIONS = 3
+
+
+class BenchmarkConfig(Config):
+    """Cấu hình benchmark: database SQLite tạm, không CSRF, không cache dashboard"""
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    DASHBOARD_CACHE_TTL = 0
+    METRICS_ENABLED = False
+    SQL_PROFILER = False
+
+
+def _next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _bulk_form(state):
+    """Mỗi lần POST tạo hóa đơn cho 1 tháng tương lai mới (không trùng tháng đã tạo)"""
+    state['year'], state['month'] = _next_month(state['year'], state['month'])
+    return {'month': state['month'], 'year': state['year'], 'other_fees': 100000}
+
+
+def scenarios():
+    """
+    Danh sách kịch bản: (tên, method, url, form data / hàm tạo form, số lần đo tối đa)
+
+    Số lần đo tối đa = None → theo --iterations
+    """
+    now = datetime.now()
+    bulk_state = {'year': now.year, 'month': now.month}
+    return [
+        ('dashboard', 'GET', '/', None, None),
+        ('invoices.list', 'GET', '/invoices/', None, None),
+        ('invoices.unpaid', 'GET', '/invoices/?status=unpaid', None, None),
+        ('rooms.list', 'GET', '/rooms/', None, None),
+        ('tenants.search', 'GET', '/tenants/?search=nguyen', None, None),
+        ('reports.revenue', 'GET', '/reports/revenue', None, None),
+        ('reports.overdue', 'GET', '/reports/overdue', None, None),
+        ('api.invoices', 'GET', '/api/v1/invoices', None, None),
+        ('invoices.create_bulk', 'POST', '/invoices/create-bulk', lambda: _bulk_form(bulk_state), BULK_ITERATIONS),
+    ]
+
+
+def percentile(values, percent):
+    """Percentile kiểu nearest-rank (không nội suy)"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _measure(client, method, url, data):
+    with profile() as stats:
+        started = time.perf_counter()
+        response = client.open(url, method=method, data=data)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method} {url} → HTTP {response.status_code}')
+    return elapsed_ms, stats.count
+
+
+def run_scenarios(app, iterations=20, only=None, progress=None):
+    """
+    Chạy các kịch bản trên app đã có dữ liệu
+
+    Args:
+        app: Flask app (database đã có dữ liệu benchmark)
+        iterations: Số lần đo mỗi kịch bản
+        only: Chỉ chạy các kịch bản có tên trong danh sách này (tùy chọn)
+        progress: Hàm nhận chuỗi thông báo tiến độ (tùy chọn)
+
+    Returns:
+        Dict {tên kịch bản: {p50_ms, p95_ms, mean_ms, queries, samples}}
+    """
+    report = progress or (lambda message: None)
+    client = app.test_client()
+    response = client.post('/auth/login', data={'username': 'admin', 'password': 'admin123'})
+    if response.status_code != 302:
+        raise RuntimeError('Không đăng nhập được bằng tài khoản admin của benchmark')
+
+    results = {}
+    for name, method, url, form, limit in scenarios():
+        if only and name not in only:
+            continue
+        count = min(iterations, limit) if limit else iterations
+
+        # Khởi động: cache template, kết nối, snapshot tháng hiện tại...
+        _measure(client, method, url, form() if callable(form) else form)
+
+        timings, queries = [], []
+        for _ in range(count):
+            elapsed_ms, query_count = _measure(client, method, url, form() if callable(form) else form)
+            timings.append(elapsed_ms)
+            queries.append(query_count)
+
+        results[name] = {
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': int(statistics.median(queries)),
+            'samples': count
+        }
+        report(f"{name:24s} p50 {results[name]['p50_ms']:9.2f} ms  p95 {results[name]['p95_ms']:9.2f} ms  "
+               f"{results[name]['queries']:4d} SQL")
+    return results
+
+
+def run(rooms=1000, years=3, seed=42, iterations=20, database=None, only=None, progress=None):
+    """
+    Tạo database, sinh dữ liệu rồi chạy các kịch bản
+
+    Args:
+        database: Đường dẫn file SQLite (mặc định: file tạm, xóa sau khi chạy)
+
+    Returns:
+        Dict {'meta': {...}, 'results': {...}}
+    """
+    from benchmarks.generator import generate
+
+    report = progress or (lambda message: None)
+    temporary = database is None
+    if temporary:
+        handle, database = tempfile.mkstemp(prefix='roommaster-bench-', suffix='.db')
+        os.close(handle)
+        os.remove(database)
+
+    class _Config(BenchmarkConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.abspath(database)
+
+    app = create_app(_Config)
+    try:
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            counts = generate(rooms, years=years, seed=seed, progress=report)
+            generate_s = time.perf_counter() - started
+            report(f'Đã tạo dữ liệu trong {generate_s:.1f}s: '
+                   + ', '.join(f'{table} {count:,}' for table, count in counts.items()))
+            db.session.remove()
+
+        results = run_scenarios(app, iterations=iterations, only=only, progress=report)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        if temporary:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(database + suffix):
+                    os.remove(database + suffix)
+
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'rooms': rooms,
+            'years': years,
+            'seed': seed,
+            'iterations': iterations,
+            'rows': counts,
+            'generate_s': round(generate_s, 2),
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'results': results
+    }
+
+
+# ============================================
+# BASELINE
+# ============================================
+def save(result, path):
+    """Ghi kết quả ra file JSON"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+def load(path):
+    """Đọc kết quả đã ghi"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, min_delta_ms=MIN_DELTA_MS):
+    """
+    So sánh 2 lần chạy
+
+    Args:
+        baseline, current: Dict kết quả (run / load)
+        threshold: Ngưỡng tăng tương đối bị coi là chậm đi (0.10 = 10%)
+        min_delta_ms: Chênh lệch tuyệt đối tối thiểu của p50/p95 để bị tính
+
+    Returns:
+        (rows, regressions): rows = list dict từng kịch bản × chỉ số,
+        regressions = các dòng vượt ngưỡng
+    """
+    rows = []
+    for name, now in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'queries'):
+            old, new = before[metric], now[metric]
+            change = (new - old) / old if old else (math.inf if new else 0.0)
+            regressed = change > threshold and (metric == 'queries' or new - old >= min_delta_ms)
+            rows.append({'scenario': name, 'metric': metric, 'baseline': old, 'current': new,
+                         'change': change, 'regressed': regressed})
+    return rows, [row for row in rows if row['regressed']]
+
+
+def format_comparison(rows):
+    """Bảng so sánh dạng text"""
+    lines = [f"{'Kịch bản':24s} {'Chỉ số':8s} {'Baseline':>10s} {'Hiện tại':>10s} {'Thay đổi':>9s}"]
+    for row in rows:
+        change = 'mới' if math.isinf(row['change']) else f"{row['change']:+.1%}"
+        lines.append(f"{row['scenario']:24s} {row['metric']:8s} {row['baseline']:>10} {row['current']:>10} "
+                     f"{change:>9s}{'  ← CHẬM ĐI' if row['regressed'] else ''}")
+    return '\n'.join(lines)
@@ -0,0 +1,64 @@
+"""
+Build static assets for production
+
+1. (optional) Vendor Bootstrap, bootstrap-icons, flatpickr and Chart.js into
+   app/static/vendor/ (pinned versions, see VENDOR_FILES in app/utils/assets.py)
+2. Purge unused Bootstrap classes, bundle with style.css/main.js, minify,
+   content-hash and pre-compress into app/static/dist/ + manifest.json
+
+Once the bundles exist, base.html serves everything from 'self' and the
+Content-Security-Policy drops the CDN origins.
+
+Usage:
+    python build_assets.py --vendor   # download vendor files, then build
+    python build_assets.py            # build from files already in app/static
+"""
+import argparse
+import os
+
+from app.utils.assets import build_assets, vendor_assets, brotli
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build RoomMaster static assets')
+    parser.add_argument('--vendor', action='store_true',
+                        help='download pinned vendor libraries into app/static/vendor first')
+    args = parser.parse_args()
+    
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    static_dir = os.path.join(base_dir, 'app', 'static')
+    
+    if args.vendor:
+        print("📦 Vendoring libraries...")
+        for path, size in vendor_assets(static_dir):
+            print(f"   {path} ({size:,} bytes)")
+        print()
+    
+    print("🎨 Building static assets...")
+    print("=" * 60)
+    
+    skipped = False
+    for result in build_assets(static_dir):
+        if 'missing' in result:
+            skipped = True
+            print(f"⏭️  {result['name']} skipped, missing: {', '.join(result['missing'])}")
+            print()
+            continue
+        print(f"✅ {result['name']} → {result['output']}")
+        print(f"   Original: {result['original']:,} bytes")
+        print(f"   Minified: {result['minified']:,} bytes")
+        print(f"   Gzip:     {result['gzip']:,} bytes")
+        if result['brotli'] is not None:
+            print(f"   Brotli:   {result['brotli']:,} bytes")
+        print()
+    
+    print("=" * 60)
+    print("✅ Assets built! Restart the app to load the new manifest.")
+    if skipped:
+        print("💡 Run with --vendor to bundle Bootstrap/flatpickr locally (no CDN)")
+    if brotli is None:
+        print("💡 Install `brotli` to also write .br files")
+
+
+if __name__ == '__main__':
+    main()
@@ -21,13 +21,52 @@ class Config:
     # Disable modification tracking to save memory
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
-    # Database connection pool settings
+    # Database connection pool settings (PostgreSQL/MySQL - SQLite dùng profile SQLITE_* bên dưới)
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_size': 10,
         'pool_recycle': 3600,
         'pool_pre_ping': True
     }
     
+    # SQLite - áp dụng cho mọi kết nối trong pool (app/utils/database.py)
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 5000)  # ms chờ lock trước khi báo "database is locked"
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL'  # NORMAL an toàn với WAL
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE') or -64000)  # số âm = KiB (64MB)
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE') or 268435456)  # 256MB
+    SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE') or 10)
+    SQLITE_MAX_OVERFLOW = int(os.environ.get('SQLITE_MAX_OVERFLOW') or 10)
+    
+    # Ghi thanh toán đồng thời: số lần thử khi tranh chấp lock, thời gian chờ cơ sở (giây, tăng gấp đôi)
+    PAYMENT_MAX_ATTEMPTS = int(os.environ.get('PAYMENT_MAX_ATTEMPTS') or 5)
+    PAYMENT_RETRY_BACKOFF = float(os.environ.get('PAYMENT_RETRY_BACKOFF') or 0.05)
+    
+    # Dashboard cache TTL (giây) - 0 để tắt cache
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL') or 30)
+    
+    # In hóa đơn PDF - font TTF có dấu tiếng Việt (VD: DejaVuSans.ttf, arial.ttf)
+    PDF_FONT_PATH = os.environ.get('PDF_FONT_PATH') or next(
+        (path for path in ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+                           'C:/Windows/Fonts/arial.ttf',
+                           '/Library/Fonts/Arial.ttf') if os.path.exists(path)),
+        None
+    )
+    PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS') or 0) or None
+    
+    # Cache user cho Flask-Login (giây) - 0 để tắt cache
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)
+    
+    # SQL profiler theo request (app/utils/profiler.py) - mặc định tắt
+    SQL_PROFILER = (os.environ.get('SQL_PROFILER') or '').lower() in ('1', 'true', 'yes')
+    SQL_PROFILER_LOG = os.environ.get('SQL_PROFILER_LOG') or 'logs/sql_profile.log'  # JSON lines, xoay vòng 10MB
+    SQL_PROFILER_SLOWEST = int(os.environ.get('SQL_PROFILER_SLOWEST') or 5)  # số câu chậm nhất ghi lại
+    SQL_PROFILER_REPEAT_THRESHOLD = int(os.environ.get('SQL_PROFILER_REPEAT_THRESHOLD') or 5)  # lặp >= N lần → nghi N+1
+    
+    # Prometheus /metrics (app/utils/metrics.py)
+    METRICS_ENABLED = (os.environ.get('METRICS_ENABLED') or 'true').lower() in ('1', 'true', 'yes')
+    METRICS_DIR = os.environ.get('METRICS_DIR')  # bắt buộc khi chạy nhiều worker gunicorn (thư mục dùng chung)
+    METRICS_ALLOWED_IPS = [ip.strip() for ip in (os.environ.get('METRICS_ALLOWED_IPS') or '127.0.0.1,::1').split(',')]
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # nếu đặt: bắt buộc header "Authorization: Bearer <token>"
+    
     # Pagination
     ITEMS_PER_PAGE = int(os.environ.get('ITEMS_PER_PAGE') or 10)
     
@@ -36,6 +75,16 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
     
+    # Rate limiting - 'memory' (mỗi worker 1 bộ đếm) hoặc 'sqlite:///đường/dẫn.db' (dùng chung giữa các worker)
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE') or 'memory'
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS') or 10000)
+    
+    # Reverse proxy (nginx): số proxy tin cậy phía trước app, 0 = không có proxy.
+    # Đặt đúng số proxy - đặt thừa thì client tự giả IP bằng header X-Forwarded-For
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR') or 0)      # IP client (rate limit, /metrics, audit log)
+    PROXY_FIX_X_PROTO = int(os.environ.get('PROXY_FIX_X_PROTO') or 0)  # http/https (url_for _external, cookie Secure)
+    PROXY_FIX_X_HOST = int(os.environ.get('PROXY_FIX_X_HOST') or 0)
+    
     # Session settings
     SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
     SESSION_COOKIE_HTTPONLY = True
@@ -77,6 +126,10 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    DASHBOARD_CACHE_TTL = 0
+    USER_CACHE_TTL = 0
+    METRICS_ENABLED = False
 
 
 config = {
@@ -0,0 +1,65 @@
+"""Indexes cho các query nóng (thay optimize_production.add_indexes)
+
+Schema trước đây được tạo bằng db.create_all() (không có migration), nên đây
+là revision đầu tiên. Mọi index dùng IF [NOT] EXISTS để chạy được cả trên
+database cũ lẫn database mới (create_all đã tạo sẵn index khai báo trong models).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (tên index, bảng, cột) - khớp với __table_args__ trong app/models.py
+INDEXES = [
+    ('ix_invoices_room_year_month', 'invoices', ['room_id', 'year', 'month']),
+    ('ix_invoices_status_due_date', 'invoices', ['status', 'due_date']),
+    ('ix_invoices_year_month', 'invoices', ['year', 'month']),
+    ('ix_payments_invoice_id_payment_date', 'payments', ['invoice_id', 'payment_date']),
+    ('ix_payments_payment_date', 'payments', ['payment_date']),
+    ('ix_tenants_room_id_status', 'tenants', ['room_id', 'status']),
+    ('ix_rooms_status_room_number', 'rooms', ['status', 'room_number']),
+]
+
+# Index do optimize_production.add_indexes tạo (không có trong models):
+# thừa so với các index ghép ở trên, chỉ làm chậm thao tác ghi
+LEGACY_INDEXES = [
+    ('idx_users_email', 'users'),
+    ('idx_users_role', 'users'),
+    ('idx_rooms_status', 'rooms'),
+    ('idx_rooms_floor', 'rooms'),
+    ('idx_tenants_room_id', 'tenants'),
+    ('idx_tenants_phone', 'tenants'),
+    ('idx_invoices_room_id', 'invoices'),
+    ('idx_invoices_status', 'invoices'),
+    ('idx_invoices_month_year', 'invoices'),
+    ('idx_invoices_due_date', 'invoices'),
+    ('idx_payments_invoice_id', 'payments'),
+    ('idx_payments_payment_date', 'payments'),
+    ('idx_payments_payment_method', 'payments'),
+    ('idx_services_is_active', 'services'),
+    ('idx_services_name', 'services'),
+]
+
+
+def upgrade():
+    for name, table in LEGACY_INDEXES:
+        op.drop_index(name, table_name=table, if_exists=True)
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
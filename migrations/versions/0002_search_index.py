@@ -0,0 +1,76 @@
+"""Index tìm kiếm full-text cho khách thuê / phòng
+
+SQLite: bảng ảo FTS5 (tokenizer trigram); PostgreSQL: bảng + GIN index pg_trgm.
+Dialect khác không có bảng index (app tìm bằng ILIKE trên bảng gốc).
+
+Cấu trúc bảng và cách chuẩn hóa văn bản được chép lại ở đây (không import app):
+revision phải chạy đúng kể cả khi code của app đã thay đổi về sau.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 14:00:00
+
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+# Bảng index: (bảng gốc, các cột) - như SEARCH_INDEXES tại revision này
+SEARCH_TABLES = {
+    'tenants_search': ('tenants', ('full_name', 'id_number', 'phone')),
+    'rooms_search': ('rooms', ('room_number', 'description')),
+}
+
+
+def _normalize(value):
+    """Chữ thường, bỏ dấu tiếng Việt (đ → d), gộp khoảng trắng"""
+    if not value:
+        return ''
+    value = str(value).replace('đ', 'd').replace('Đ', 'D')
+    value = unicodedata.normalize('NFD', value)
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(value.lower().split())
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        return
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    existing = set(sa.inspect(bind).get_table_names())
+    for table_name, (source, fields) in SEARCH_TABLES.items():
+        if table_name in existing:
+            continue  # db.create_all() đã tạo
+
+        if dialect == 'sqlite':
+            op.execute(f"CREATE VIRTUAL TABLE {table_name} USING fts5({', '.join(fields)}, tokenize='trigram')")
+        else:
+            op.execute(f"CREATE TABLE {table_name} (rowid INTEGER PRIMARY KEY, "
+                       f"{', '.join(f'{field} TEXT' for field in fields)}, document TEXT NOT NULL)")
+            op.execute(f'CREATE INDEX ix_{table_name}_trgm ON {table_name} USING gin (document gin_trgm_ops)')
+
+        # Nạp dữ liệu hiện có
+        index = sa.table(table_name, sa.column('rowid'), sa.column('document'), *(sa.column(f) for f in fields))
+        rows = bind.execute(sa.select(sa.column('id'), *(sa.column(f) for f in fields)).select_from(sa.table(source)))
+        for row in rows.all():
+            values = {field: _normalize(row._mapping[field]) for field in fields}
+            if dialect == 'postgresql':
+                values['document'] = ' '.join(values.values())
+            bind.execute(index.insert().values(rowid=row.id, **values))
+
+
+def downgrade():
+    for table_name in SEARCH_TABLES:
+        op.execute(f'DROP TABLE IF EXISTS {table_name}')
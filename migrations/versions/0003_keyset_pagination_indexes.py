@@ -0,0 +1,35 @@
+"""Indexes cho keyset pagination (danh sách khách thuê, nhân viên)
+
+Danh sách hóa đơn dùng index ix_invoices_year_month có sẵn (revision 0001).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 15:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+# (tên index, bảng, cột) - khớp với __table_args__ trong app/models.py
+INDEXES = [
+    ('ix_tenants_status_full_name', 'tenants', ['status', 'full_name']),
+    ('ix_users_created_at', 'users', ['created_at']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
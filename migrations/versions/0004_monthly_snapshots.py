@@ -0,0 +1,52 @@
+"""Bảng monthly_snapshots (số liệu báo cáo theo tháng)
+
+Dữ liệu được tạo dần khi xem báo cáo / ghi hóa đơn; backfill toàn bộ bằng
+`flask snapshots-rebuild`.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('monthly_snapshots'):
+        return  # db.create_all() đã tạo
+
+    op.create_table(
+        'monthly_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Integer(), nullable=False),
+        sa.Column('receivable', sa.Float(), nullable=False),
+        sa.Column('collected', sa.Float(), nullable=False),
+        sa.Column('paid_revenue', sa.Float(), nullable=False),
+        sa.Column('invoices_total', sa.Integer(), nullable=False),
+        sa.Column('invoices_paid', sa.Integer(), nullable=False),
+        sa.Column('invoices_partial', sa.Integer(), nullable=False),
+        sa.Column('invoices_unpaid', sa.Integer(), nullable=False),
+        sa.Column('total_rooms', sa.Integer(), nullable=False),
+        sa.Column('occupied_rooms', sa.Integer(), nullable=False),
+        sa.Column('maintenance_rooms', sa.Integer(), nullable=False),
+        sa.Column('total_tenants', sa.Integer(), nullable=False),
+        sa.Column('active_tenants', sa.Integer(), nullable=False),
+        sa.Column('new_tenants', sa.Integer(), nullable=False),
+        sa.Column('closed', sa.Boolean(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('year', 'month', name='uq_monthly_snapshots_year_month')
+    )
+
+
+def downgrade():
+    op.drop_table('monthly_snapshots')
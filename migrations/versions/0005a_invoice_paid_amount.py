@@ -0,0 +1,36 @@
+"""Cột invoices.paid_amount (tổng đã thanh toán), backfill từ bảng payments
+
+Thay script add_paid_amount_migration.py (nằm ngoài chuỗi Alembic). Tạo cột kiểu
+FLOAT như các cột tiền khác ở thời điểm này; revision 0006 đổi sang BIGINT.
+Trạng thái hóa đơn không bị đổi; nếu nghi lệch, chạy `flask reconcile-paid-amounts`.
+
+Revision ID: 0005a
+Revises: 0005
+Create Date: 2026-10-18 18:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005a'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('invoices')}
+    if 'paid_amount' not in columns:
+        op.add_column('invoices', sa.Column('paid_amount', sa.Float(), nullable=False, server_default='0'))
+
+    op.execute(
+        'UPDATE invoices SET paid_amount = COALESCE('
+        '(SELECT SUM(payments.amount) FROM payments WHERE payments.invoice_id = invoices.id), 0)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('invoices') as batch_op:
+        batch_op.drop_column('paid_amount')
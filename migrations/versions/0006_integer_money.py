@@ -0,0 +1,81 @@
+"""Tiền lưu bằng số nguyên đồng (BIGINT), chỉ số điện/nước NUMERIC(12, 2)
+
+Giá trị tiền cũ (FLOAT) được làm tròn về đồng trước khi đổi kiểu cột.
+
+Revision ID: 0006
+Revises: 0005a
+Create Date: 2026-10-18 19:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005a'
+branch_labels = None
+depends_on = None
+
+
+# Cột tiền (VNĐ) → BIGINT
+MONEY_COLUMNS = {
+    'rooms': ['price', 'deposit'],
+    'tenants': ['deposit'],
+    'services': ['price'],
+    'invoices': ['room_price', 'electric_unit_price', 'water_unit_price', 'other_fees',
+                 'total_amount', 'paid_amount'],
+    'payments': ['amount'],
+    'monthly_snapshots': ['receivable', 'collected', 'paid_revenue'],
+}
+
+# Chỉ số điện/nước → NUMERIC(12, 2)
+READING_COLUMNS = {
+    'invoices': ['electric_old', 'electric_new', 'water_old', 'water_new'],
+}
+
+
+def _float_columns(table, columns):
+    """
+    Các cột vẫn còn kiểu FLOAT (bỏ qua database tạo bằng db.create_all() bản mới)
+
+    Thiếu cột → dừng migration: bỏ qua sẽ để lại cột tiền FLOAT nếu sau này cột
+    được thêm ngoài chuỗi migration (VD: invoices.paid_amount do revision 0005a tạo).
+    """
+    reflected = {c['name']: c['type'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+    missing = [name for name in columns if name not in reflected]
+    if missing:
+        raise RuntimeError(f'Bảng {table} thiếu cột {", ".join(missing)} - '
+                           f'database chưa qua các revision trước 0006?')
+    return [name for name in columns if isinstance(reflected[name], sa.Float)]
+
+
+def upgrade():
+    tables = sorted(set(MONEY_COLUMNS) | set(READING_COLUMNS))
+    for table in tables:
+        money = _float_columns(table, MONEY_COLUMNS.get(table, []))
+        readings = _float_columns(table, READING_COLUMNS.get(table, []))
+        if not money and not readings:
+            continue
+
+        for column in money:
+            op.execute(f'UPDATE {table} SET {column} = ROUND({column}) WHERE {column} IS NOT NULL')
+        for column in readings:
+            op.execute(f'UPDATE {table} SET {column} = ROUND({column}, 2) WHERE {column} IS NOT NULL')
+
+        with op.batch_alter_table(table) as batch_op:
+            for column in money:
+                batch_op.alter_column(column, type_=sa.BigInteger(), existing_type=sa.Float(),
+                                      postgresql_using=f'ROUND({column})::bigint')
+            for column in readings:
+                batch_op.alter_column(column, type_=sa.Numeric(12, 2), existing_type=sa.Float(),
+                                      postgresql_using=f'{column}::numeric(12, 2)')
+
+
+def downgrade():
+    for table in sorted(set(MONEY_COLUMNS) | set(READING_COLUMNS)):
+        with op.batch_alter_table(table) as batch_op:
+            for column in MONEY_COLUMNS.get(table, []):
+                batch_op.alter_column(column, type_=sa.Float(), existing_type=sa.BigInteger())
+            for column in READING_COLUMNS.get(table, []):
+                batch_op.alter_column(column, type_=sa.Float(), existing_type=sa.Numeric(12, 2))
@@ -0,0 +1,31 @@
+"""Cột monthly_snapshots.dirty: tháng cần tính lại ở lần đọc kế tiếp
+
+Ghi hóa đơn / thanh toán / khách thuê / phòng chỉ đánh dấu tháng bị ảnh hưởng,
+không tính lại snapshot trong transaction ghi.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 20:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('monthly_snapshots')}
+    if 'dirty' not in columns:  # db.create_all() bản mới đã tạo
+        op.add_column('monthly_snapshots',
+                      sa.Column('dirty', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('monthly_snapshots') as batch_op:
+        batch_op.drop_column('dirty')
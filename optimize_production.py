@@ -1,72 +1,21 @@
 """
 Production Optimization Script
-- Add database indexes
+- Apply migrations (indexes)
 - Optimize queries
 - Clean up unused data
 """
+import os
 import sys
+from flask_migrate import upgrade
 from app import create_app, db
 from app.models import User, Room, Tenant, Invoice, Payment, Service
 
-def add_indexes():
-    """Add indexes to improve query performance"""
-    print("📊 Adding database indexes...")
+def apply_migrations():
+    """Apply Alembic migrations (indexes are declared on the models, see migrations/)"""
+    print("📊 Applying database migrations...")
     
-    with db.engine.connect() as conn:
-        # User indexes
-        try:
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)'))
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)'))
-            print("✅ User indexes created")
-        except Exception as e:
-            print(f"⚠️  User indexes: {e}")
-        
-        # Room indexes
-        try:
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_rooms_status ON rooms(status)'))
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_rooms_floor ON rooms(floor)'))
-            print("✅ Room indexes created")
-        except Exception as e:
-            print(f"⚠️  Room indexes: {e}")
-        
-        # Tenant indexes
-        try:
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_tenants_room_id ON tenants(room_id)'))
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_tenants_check_out_date ON tenants(check_out_date)'))
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_tenants_phone ON tenants(phone)'))
-            print("✅ Tenant indexes created")
-        except Exception as e:
-            print(f"⚠️  Tenant indexes: {e}")
-        
-        # Invoice indexes
-        try:
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_invoices_room_id ON invoices(room_id)'))
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_invoices_tenant_id ON invoices(tenant_id)'))
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_invoices_status ON invoices(status)'))
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_invoices_month_year ON invoices(month, year)'))
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_invoices_due_date ON invoices(due_date)'))
-            print("✅ Invoice indexes created")
-        except Exception as e:
-            print(f"⚠️  Invoice indexes: {e}")
-        
-        # Payment indexes
-        try:
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_payments_invoice_id ON payments(invoice_id)'))
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_payments_payment_date ON payments(payment_date)'))
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_payments_payment_method ON payments(payment_method)'))
-            print("✅ Payment indexes created")
-        except Exception as e:
-            print(f"⚠️  Payment indexes: {e}")
-        
-        # Service indexes
-        try:
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_services_is_active ON services(is_active)'))
-            conn.execute(db.text('CREATE INDEX IF NOT EXISTS idx_services_name ON services(name)'))
-            print("✅ Service indexes created")
-        except Exception as e:
-            print(f"⚠️  Service indexes: {e}")
-        
-        conn.commit()
+    upgrade(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
+    print("✅ Database schema and indexes up to date")
 
 def optimize_database():
     """Optimize database for production"""
@@ -74,12 +23,9 @@ def optimize_database():
     
     with db.engine.connect() as conn:
         # SQLite specific optimizations
+        # (WAL, synchronous, cache_size... are applied on every connection, see app/utils/database.py)
         if 'sqlite' in str(db.engine.url):
             try:
-                conn.execute(db.text('PRAGMA journal_mode=WAL'))  # Write-Ahead Logging
-                conn.execute(db.text('PRAGMA synchronous=NORMAL'))  # Faster writes
-                conn.execute(db.text('PRAGMA cache_size=10000'))  # Increase cache
-                conn.execute(db.text('PRAGMA temp_store=MEMORY'))  # Store temp tables in memory
                 conn.execute(db.text('VACUUM'))  # Clean up database
                 conn.execute(db.text('ANALYZE'))  # Update statistics
                 print("✅ SQLite optimizations applied")
@@ -109,8 +55,8 @@ def main():
     
     with app.app_context():
         try:
-            # Add indexes
-            add_indexes()
+            # Apply migrations (indexes)
+            apply_migrations()
             
             # Optimize database
             optimize_database()
@@ -1,4 +1,5 @@
 import os
+import click
 from app import create_app, db
 from app.models import User, Room, Tenant, Service, Invoice, Payment
 
@@ -31,6 +32,113 @@ def init_db():
     print('✅ Database initialized!')
 
 
+@app.cli.command()
+def reconcile_paid_amounts():
+    """Rebuild Invoice.paid_amount from the payments table"""
+    from app.services import PaymentService
+    
+    fixed = PaymentService.reconcile_paid_amounts()
+    print(f'✅ Reconciled paid_amount: {fixed} invoice(s) updated')
+
+
+@app.cli.command('db-check-indexes')
+@click.option('--verbose', '-v', is_flag=True, help='In cả SQL và query plan của mọi câu')
+def db_check_indexes(verbose):
+    """EXPLAIN QUERY PLAN every hot service query; fail on full table scans"""
+    from app.services import QueryPlanService
+    
+    try:
+        results = QueryPlanService.check()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    
+    failed = 0
+    for result in results:
+        if result['error']:
+            failed += 1
+            print(f"❌ {result['name']}: {result['error']}")
+            continue
+        
+        if result['scans']:
+            failed += 1
+            print(f"❌ {result['name']}: full table scan on {', '.join(result['scans'])}")
+        elif verbose:
+            allowed = f" (allowed scan: {', '.join(result['allowed'])})" if result['allowed'] else ''
+            print(f"✅ {result['name']}{allowed}")
+        else:
+            continue
+        
+        print(f"   {' '.join(result['sql'].split())}")
+        for detail in result['plan']:
+            print(f'     {detail}')
+    
+    if failed:
+        raise click.ClickException(f'{failed} query(s) without a usable index')
+    print('✅ All hot queries use indexes')
+
+
+@app.cli.command('search-reindex')
+def search_reindex():
+    """Rebuild the tenant/room full-text search index"""
+    from app.services import SearchService
+    
+    SearchService.create_tables(db.session.connection(), rebuild_new=False)
+    total = SearchService.rebuild()
+    db.session.commit()
+    print(f'✅ Search index rebuilt: {total} row(s)')
+
+
+@app.cli.command('snapshots-rebuild')
+@click.option('--force', is_flag=True, help='Tính lại cả các tháng đã chốt')
+def snapshots_rebuild(force):
+    """Backfill/refresh the monthly_snapshots report table"""
+    from app.services import SnapshotService
+    
+    count = SnapshotService.rebuild(force=force)
+    print(f'✅ Monthly snapshots rebuilt: {count} month(s)')
+
+
+@app.cli.command('db-benchmark')
+@click.option('--writers', type=int, default=4, help='Số process ghi')
+@click.option('--readers', type=int, default=4, help='Số process đọc')
+@click.option('--seconds', type=float, default=5.0, help='Thời gian chạy mỗi profile')
+def db_benchmark(writers, readers, seconds):
+    """Concurrent-write benchmark: old SQLite settings vs the engine profile"""
+    from app.utils.database import benchmark_concurrent_writes
+    
+    print(f'⏱️  SQLite: {writers} writer(s) + {readers} reader(s), {seconds:g}s mỗi profile (database tạm)')
+    for result in benchmark_concurrent_writes(writers, readers, seconds, config=app.config):
+        print(f"   {result['profile']:8} writes {result['writes_per_second']:8.1f}/s   "
+              f"reads {result['reads_per_second']:8.1f}/s   "
+              f"locked {result['locked']}   other errors {result['errors']}")
+
+
+@app.cli.command('render-invoices')
+@click.option('--month', type=click.IntRange(1, 12), required=True, help='Tháng')
+@click.option('--year', type=int, required=True, help='Năm')
+@click.option('--workers', type=int, default=None, help='Số process (mặc định PDF_RENDER_WORKERS / số CPU)')
+@click.option('--output', type=click.Path(dir_okay=False), default=None,
+              help='File zip đầu ra (mặc định hoa_don_<năm>_<tháng>.zip)')
+@click.option('--benchmark', is_flag=True, help='Đo tốc độ in với 1, 2, 4 worker, không ghi file')
+def render_invoices(month, year, workers, output, benchmark):
+    """Render every invoice of a month to PDF (one zip file)"""
+    import time
+    from app.services import InvoicePdfService
+    
+    if benchmark:
+        print(f'⏱️  Benchmark in hóa đơn tháng {month}/{year}')
+        for result in InvoicePdfService.benchmark(month, year):
+            print(f"   {result['workers']} worker(s): {result['invoices']} hóa đơn / "
+                  f"{result['seconds']:.2f}s = {result['per_second']:.1f} hóa đơn/giây")
+        return
+    
+    output = output or f'hoa_don_{year}_{month:02d}.zip'
+    started = time.perf_counter()
+    count = InvoicePdfService.render_month(month, year, output, workers=workers)
+    seconds = time.perf_counter() - started
+    print(f'✅ Rendered {count} invoice(s) → {output} ({seconds:.2f}s)')
+
+
 @app.cli.command()
 def seed_db():
     """Seed the database with sample data"""
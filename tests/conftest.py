@@ -0,0 +1,106 @@
+"""
+Fixtures dùng chung cho test
+
+Mỗi test có 1 app riêng (TestingConfig: SQLite in-memory, không CSRF, không cache).
+
+Chạy:
+    python -m pytest
+"""
+from datetime import date, datetime
+
+import pytest
+
+from config import TestingConfig
+
+from app import create_app, db as _db
+from app.models import Invoice, Payment, Room, Tenant, User
+
+pytest_plugins = ['app.utils.pytest_plugin']
+
+
+@pytest.fixture
+def make_app():
+    """Tạo app với config ghi đè: make_app(PROXY_FIX_X_FOR=1)"""
+    apps = []
+
+    def factory(**overrides):
+        config = type('Config', (TestingConfig,), overrides)
+        app = create_app(config)
+        apps.append(app)
+        return app
+
+    yield factory
+
+    for app in apps:
+        with app.app_context():
+            _db.session.remove()
+            _db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin(db):
+    user = User(username='admin', email='admin@test.local', full_name='Admin', role='admin')
+    user.set_password('admin123')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def logged_in(client, admin):
+    """Client đã đăng nhập bằng admin"""
+    response = client.post('/auth/login', data={'username': 'admin', 'password': 'admin123'})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def make_invoice(db, admin):
+    """
+    Tạo phòng (kèm 1 khách đang ở) + hóa đơn + các lần thanh toán
+
+    Usage:
+        invoice = make_invoice(2026, 3, room_price=2_000_000, payments=[500_000])
+    """
+    counter = iter(range(1, 10 ** 6))
+
+    def factory(year, month, room_price=2_000_000, other_fees=0, payments=(), due_date=None, room=None):
+        number = next(counter)
+        if room is None:
+            room = Room(room_number=f'T{number:04d}', price=room_price, status='occupied')
+            db.session.add(room)
+            db.session.flush()
+            db.session.add(Tenant(full_name=f'Khách {number}', id_number=f'ID{number:06d}', phone='0900000000',
+                                  room_id=room.id, move_in_date=date(year, month, 1)))
+        invoice = Invoice(room_id=room.id, created_by=admin.id, month=month, year=year,
+                          room_price=room_price, electric_unit_price=3500, water_unit_price=20000,
+                          other_fees=other_fees, created_at=datetime(year, month, 1),
+                          due_date=due_date or datetime(year, month, 10))
+        invoice.calculate_total()
+        db.session.add(invoice)
+        db.session.flush()
+        for amount in payments:
+            db.session.add(Payment(invoice_id=invoice.id, amount=amount, payment_method='cash',
+                                   payment_date=datetime(year, month, 5)))
+            invoice.apply_payment(amount)
+        db.session.commit()
+        return invoice
+
+    return factory
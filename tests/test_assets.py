@@ -0,0 +1,56 @@
+"""
+Test build static assets: minify JS không phá chuỗi/regex, @charset đứng đầu CSS
+"""
+import os
+
+from app.utils.assets import build_assets, minify_js, purge_css
+
+
+def test_minify_js_keeps_comment_markers_inside_literals():
+    source = '\n'.join([
+        'const a = "/* keep */";  // bỏ',
+        "const b = 'http://example.com';",
+        'const re = /\\/\\*[^*]*\\*\\//g;  /* bỏ */',
+        "const t = `x ${ '/* expr */' + y } // giữ`;",
+        'const d = total / 2 / count;  // chia, không phải regex',
+        '    return /[/]/.test(u)',
+    ])
+
+    assert minify_js(source) == '\n'.join([
+        'const a = "/* keep */";',
+        "const b = 'http://example.com';",
+        'const re = /\\/\\*[^*]*\\*\\//g;',
+        "const t = `x ${ '/* expr */' + y } // giữ`;",
+        'const d = total / 2 / count;',
+        'return /[/]/.test(u)',
+    ])
+
+
+def test_minify_js_keeps_line_breaks_for_asi():
+    assert minify_js('let a = 1\n\n/* x\n y */\nlet b = a\n  ++b') == 'let a = 1\nlet b = a\n++b'
+
+
+def test_purge_css_puts_charset_before_license():
+    css = '@charset "UTF-8";/*! Bootstrap | MIT */.used{color:red}.unused{color:blue}'
+
+    purged = purge_css(css, lambda name: name == 'used')
+
+    assert purged == '@charset "UTF-8";/*! Bootstrap | MIT */\n.used{color:red}'
+
+
+def test_css_bundle_has_single_leading_charset(tmp_path):
+    static = tmp_path / 'static'
+    (static / 'vendor' / 'bootstrap').mkdir(parents=True)
+    (static / 'css').mkdir()
+    (static / 'vendor' / 'bootstrap' / 'bootstrap.min.css').write_text(
+        '@charset "UTF-8";/*! Bootstrap */.btn{color:red}', encoding='utf-8')
+    (static / 'css' / 'style.css').write_text('@charset "UTF-8";\n.btn { margin: 0; }', encoding='utf-8')
+    (tmp_path / 'templates').mkdir()
+    (tmp_path / 'templates' / 'page.html').write_text('<a class="btn"></a>', encoding='utf-8')
+
+    results = build_assets(str(static), {'css/bundle.css': ['vendor/bootstrap/bootstrap.min.css', 'css/style.css']})
+
+    with open(os.path.join(static, results[0]['output']), encoding='utf-8') as f:
+        built = f.read()
+    assert built.startswith('@charset "UTF-8";/*! Bootstrap */')
+    assert built.count('@charset') == 1
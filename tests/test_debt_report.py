@@ -0,0 +1,70 @@
+"""
+Test số câu SQL của báo cáo công nợ và các trang danh sách: cố định,
+không tăng theo số hóa đơn / số phòng (không N+1 khi đọc room.current_tenant)
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.services import PaymentService
+from app.utils.profiler import profile
+
+TODAY = date.today()
+DEBT_REPORT_QUERIES = 9  # 1 GROUP BY + 4 nhóm (partial/warning/danger/critical) × (1 trang + 1 selectin khách)
+
+
+def _seed(make_invoice, count):
+    """count hóa đơn chia đều các mức quá hạn (critical/danger/warning) và trả 1 phần"""
+    now = datetime.utcnow()
+    for index in range(count):
+        days, payments = [(15, ()), (8, ()), (3, ()), (3, [500_000])][index % 4]
+        make_invoice(TODAY.year, TODAY.month, due_date=now - timedelta(days=days), payments=payments)
+
+
+def _read_debt_report():
+    report = PaymentService.get_debt_report(month=TODAY.month, year=TODAY.year)
+    # Giống template: mỗi dòng hiển thị số phòng + tên khách đang ở
+    for bucket in ('partial_invoices', 'overdue_warning', 'overdue_danger', 'overdue_critical'):
+        for invoice in report[bucket].items:
+            assert invoice.room.room_number
+            assert invoice.room.current_tenant.full_name
+    return report
+
+
+def _count_queries(work):
+    with profile() as stats:
+        work()
+    return stats.count
+
+
+@pytest.mark.parametrize('invoices', [4, 40])
+def test_debt_report_runs_fixed_number_of_queries(make_invoice, query_budget, invoices):
+    _seed(make_invoice, invoices)
+
+    with query_budget(DEBT_REPORT_QUERIES, repeats=5):
+        report = _read_debt_report()
+
+    assert report['total_invoices'] == invoices
+    assert report['overdue_critical_count'] == invoices // 4
+
+
+def test_debt_report_query_count_independent_of_invoice_count(make_invoice):
+    _seed(make_invoice, 4)
+    few = _count_queries(_read_debt_report)
+
+    _seed(make_invoice, 36)
+    assert _count_queries(_read_debt_report) == few
+
+
+@pytest.mark.parametrize('url', ['/invoices/', '/rooms/', '/reports/overdue'])
+def test_list_pages_query_count_independent_of_row_count(logged_in, make_invoice, url):
+    def page_queries():
+        assert logged_in.get(url).status_code == 200  # làm nóng cache (user, dashboard) trước khi đếm
+        return _count_queries(lambda: logged_in.get(url))
+
+    # Mỗi lần seed đủ 4 nhóm: nhóm rỗng không chạy câu selectin khách thuê
+    _seed(make_invoice, 4)
+    few = page_queries()
+
+    _seed(make_invoice, 16)
+    assert page_queries() == few
@@ -0,0 +1,50 @@
+"""
+Test chuỗi chỉ số điện/nước: sửa số mới tháng trước → số cũ (và số mới tạm) của tháng sau
+"""
+from app.models import Invoice
+from app.services import InvoiceService, MeterReadingService
+
+
+def _september(db, make_invoice):
+    """Hóa đơn 9/2026 (điện 100→150, nước 10→12) + hóa đơn 10/2026 tạo hàng loạt"""
+    september = make_invoice(2026, 9)
+    september.electric_old, september.electric_new = 100, 150
+    september.water_old, september.water_new = 10, 12
+    september.calculate_total()
+    db.session.commit()
+    
+    created, _ = InvoiceService.create_bulk_invoices(10, 2026, room_ids=[september.room_id])
+    assert created == 1
+    october = Invoice.query.filter_by(room_id=september.room_id, month=10, year=2026).one()
+    assert (october.electric_old, october.electric_new) == (150, 150)
+    return september, october
+
+
+def test_edit_after_bulk_create_moves_placeholder(logged_in, db, make_invoice):
+    september, october = _september(db, make_invoice)
+    
+    response = logged_in.post(f'/invoices/{september.id}/edit', data={
+        'electric_old': '100', 'electric_new': '180', 'electric_unit_price': '3500',
+        'water_old': '10', 'water_new': '12', 'water_unit_price': '20000', 'other_fees': '0',
+    })
+    
+    assert response.status_code == 302
+    db.session.expire_all()
+    assert (october.electric_old, october.electric_new) == (180, 180)
+    assert (october.water_old, october.water_new) == (12, 12)
+    assert october.electric_cost == 0 and october.total_amount == october.room_price
+
+
+def test_cascade_refused_when_next_reading_below_new_old(db, make_invoice):
+    september, october = _september(db, make_invoice)
+    october.electric_new = 160
+    october.calculate_total()
+    db.session.commit()
+    total = october.total_amount
+    
+    september.electric_new = 180
+    next_invoice, cascaded = MeterReadingService.cascade_to_next(september)
+    
+    assert next_invoice is october and not cascaded
+    assert not MeterReadingService.is_synced(september, october)
+    assert (october.electric_old, october.electric_new, october.total_amount) == (150, 160, total)
@@ -0,0 +1,52 @@
+"""
+Test quyền đọc /metrics
+"""
+import threading
+
+PROXY = {'REMOTE_ADDR': '127.0.0.1'}  # nginx trên cùng máy
+
+
+def test_metrics_behind_proxy_uses_client_ip(make_app):
+    client = make_app(METRICS_ENABLED=True, PROXY_FIX_X_FOR=1).test_client()
+    
+    # Request từ ngoài đi qua nginx: IP thật không nằm trong METRICS_ALLOWED_IPS
+    response = client.get('/metrics', environ_base=PROXY, headers={'X-Forwarded-For': '203.0.113.5'})
+    assert response.status_code == 404
+    
+    assert client.get('/metrics', environ_base=PROXY).status_code == 200
+
+
+def test_metrics_token_required_when_configured(make_app):
+    client = make_app(METRICS_ENABLED=True, METRICS_TOKEN='s3cret').test_client()
+    
+    assert client.get('/metrics', environ_base=PROXY).status_code == 404
+    assert client.get('/metrics', environ_base=PROXY,
+                      headers={'Authorization': 'Bearer wrong'}).status_code == 404
+    
+    response = client.get('/metrics', environ_base=PROXY, headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    assert b'roommaster_http_requests_in_flight' in response.data
+
+
+def test_short_lived_threads_reuse_shards(make_app):
+    app = make_app(METRICS_ENABLED=True)
+    client = app.test_client()
+    registry = app.extensions['metrics']
+    client.get('/auth/login')
+    before = len(registry._shards)
+    
+    def request_once():
+        client.get('/auth/login')
+    
+    # 50 thread lần lượt rồi 5 đợt x 4 thread đồng thời: số shard theo số thread chạy cùng lúc
+    for wave in [[threading.Thread(target=request_once)] for _ in range(50)] + \
+            [[threading.Thread(target=request_once) for _ in range(4)] for _ in range(5)]:
+        for thread in wave:
+            thread.start()
+        for thread in wave:
+            thread.join()
+    
+    assert len(registry._shards) <= before + 4
+    totals, live = registry.collect()
+    assert totals[registry.layout.requests['auth.login'].count] == 71
+    assert live[registry.layout.in_flight] == 0
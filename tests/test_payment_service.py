@@ -0,0 +1,54 @@
+"""
+Test sửa thanh toán: khóa hóa đơn như khi thu tiền, paid_amount luôn khớp SUM(payments)
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import func
+
+from app.models import Invoice, Payment
+from app.services import PaymentService
+
+TODAY = date.today()
+
+
+def _paid(db, invoice_id):
+    db.session.expire_all()
+    invoice = db.session.get(Invoice, invoice_id)
+    total = db.session.query(func.sum(Payment.amount)).filter_by(invoice_id=invoice_id).scalar() or 0
+    return invoice.paid_amount, total, invoice.status
+
+
+def test_change_payment_updates_paid_amount_and_status(db, make_invoice):
+    invoice = make_invoice(TODAY.year, TODAY.month, room_price=1_000_000, payments=[400_000, 300_000])
+    first = invoice.payments[0]
+    
+    payment, attempts = PaymentService.change_payment(first.id, amount=700_000)
+    
+    assert attempts == 1 and payment.amount == 700_000
+    assert _paid(db, invoice.id) == (1_000_000, 1_000_000, 'paid')
+    
+    PaymentService.update_payment(first.id, {'amount': 100_000})
+    assert _paid(db, invoice.id)[:2] == (400_000, 400_000)
+
+
+def test_change_payment_rejects_overpayment(db, make_invoice):
+    invoice = make_invoice(TODAY.year, TODAY.month, room_price=1_000_000, payments=[400_000, 300_000])
+    
+    with pytest.raises(ValueError, match='700,000'):
+        PaymentService.change_payment(invoice.payments[0].id, amount=800_000)
+    
+    assert _paid(db, invoice.id)[:2] == (700_000, 700_000)
+
+
+def test_edit_payment_route(logged_in, db, make_invoice):
+    invoice = make_invoice(TODAY.year, TODAY.month, room_price=1_000_000, payments=[400_000])
+    payment_id = invoice.payments[0].id
+    
+    response = logged_in.post(f'/invoices/payment/{payment_id}/edit', data={'amount': '250000'})
+    assert response.status_code == 302 and response.headers['X-Payment-Attempts'] == '1'
+    assert _paid(db, invoice.id)[:2] == (250_000, 250_000)
+    
+    response = logged_in.post(f'/invoices/payment/{payment_id}/edit', data={'amount': '2000000'})
+    assert response.status_code == 302 and 'X-Payment-Attempts' not in response.headers
+    assert _paid(db, invoice.id)[:2] == (250_000, 250_000)
@@ -0,0 +1,20 @@
+"""
+Test in hóa đơn PDF: tiền điện/nước từng dòng cộng đúng tổng hóa đơn
+"""
+from app.services import InvoicePdfService
+
+
+def test_payload_costs_add_up_to_total(db, make_invoice):
+    invoice = make_invoice(2026, 9, room_price=1_000_000, other_fees=50_000)
+    # 0.5 đồng: làm tròn lên (usage_cost), không làm tròn về số chẵn như '{:,.0f}'
+    invoice.electric_old, invoice.electric_new, invoice.electric_unit_price = 100, 100.1, 5
+    invoice.water_old, invoice.water_new, invoice.water_unit_price = 10, 12.5, 20_001
+    invoice.calculate_total()
+    db.session.commit()
+    
+    payload, = InvoicePdfService.get_payloads(invoice_ids=[invoice.id])
+    
+    assert (payload['electric_cost'], payload['water_cost']) == (1, 50_003)
+    assert payload['room_price'] + payload['electric_cost'] + payload['water_cost'] + payload['other_fees'] \
+        == payload['total_amount'] == invoice.total_amount
+    assert InvoicePdfService.render(invoice.id)[1].startswith(b'%PDF')
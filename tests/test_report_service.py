@@ -0,0 +1,93 @@
+"""
+Test ReportService: số liệu báo cáo (đọc từ monthly_snapshots) phải khớp với
+cách tính thô bằng Python trên từng hóa đơn / thanh toán / phòng
+"""
+from collections import Counter
+from datetime import date
+
+from app.models import Invoice, Payment, Room, Tenant
+from app.services import PaymentService, ReportService
+
+TODAY = date.today()
+LAST_YEAR = TODAY.year - 1
+
+
+def _naive_month(year, month):
+    """(số hóa đơn, phải thu, đã thu) cộng tay từ hóa đơn + bảng payments"""
+    invoices = Invoice.query.filter_by(year=year, month=month).all()
+    total = sum(invoice.total_amount for invoice in invoices)
+    paid = sum(payment.amount for payment in Payment.query.join(Invoice)
+               .filter(Invoice.year == year, Invoice.month == month))
+    return len(invoices), total, paid
+
+
+def _seed_year(make_invoice, year):
+    """Mỗi tháng vài hóa đơn: đã trả đủ, trả 1 phần (nhiều lần), chưa trả, trả dư"""
+    for month in range(1, 13):
+        for index in range(month % 4 + 1):
+            price = 1_500_000 + 250_000 * index + 10_000 * month
+            payments = [(), [price], [price // 3, price // 3], [price + 50_000]][index]
+            make_invoice(year, month, room_price=price, other_fees=30_000 * index, payments=payments)
+
+
+def test_year_report_matches_naive_sums(make_invoice):
+    _seed_year(make_invoice, LAST_YEAR)
+
+    report = ReportService.get_revenue_report(LAST_YEAR)
+
+    for row in report['monthly_data']:
+        count, total, paid = _naive_month(LAST_YEAR, row['month'])
+        assert (row['total_invoices'], row['total_amount'], row['paid_amount']) == (count, total, paid)
+        assert row['unpaid_amount'] == total - paid
+
+    year_total = sum(_naive_month(LAST_YEAR, month)[1] for month in range(1, 13))
+    year_paid = sum(_naive_month(LAST_YEAR, month)[2] for month in range(1, 13))
+    assert (report['total_amount'], report['paid_amount']) == (year_total, year_paid)
+    assert report['collection_rate'] == year_paid / year_total * 100
+
+
+def test_month_report_follows_new_payments(make_invoice):
+    invoices = [make_invoice(TODAY.year, TODAY.month, room_price=2_000_000 + 100_000 * i) for i in range(3)]
+    assert ReportService.get_revenue_report(TODAY.year, TODAY.month)['paid_amount'] == 0
+
+    PaymentService.record_payment(invoices[0].id, 700_000)
+    PaymentService.record_payment(invoices[1].id, invoices[1].total_amount)
+
+    report = ReportService.get_revenue_report(TODAY.year, TODAY.month)
+    count, total, paid = _naive_month(TODAY.year, TODAY.month)
+    assert (report['total_invoices'], report['total_amount'], report['paid_amount']) == (count, total, paid)
+    assert report['unpaid_amount'] == total - paid
+
+
+def test_late_payment_updates_closed_month(make_invoice):
+    invoice = make_invoice(LAST_YEAR, 6, room_price=3_000_000, payments=[1_000_000])
+    assert ReportService.get_revenue_report(LAST_YEAR, 6)['paid_amount'] == 1_000_000  # chốt tháng
+
+    PaymentService.record_payment(invoice.id, 500_000)
+
+    assert ReportService.get_revenue_report(LAST_YEAR, 6)['paid_amount'] == _naive_month(LAST_YEAR, 6)[2]
+
+
+def test_occupancy_and_tenant_reports_match_naive_counts(db, make_invoice):
+    for _ in range(3):
+        make_invoice(TODAY.year, TODAY.month)
+    db.session.add_all([
+        Room(room_number='E0101', floor=1, price=1_000_000, status='available'),
+        Room(room_number='E0201', floor=2, price=1_000_000, status='maintenance'),
+    ])
+    db.session.commit()
+
+    occupancy = ReportService.get_occupancy_report()
+    rooms = Room.query.all()
+    statuses = Counter(room.status for room in rooms)
+    assert occupancy['total_rooms'] == len(rooms)
+    assert occupancy['occupied_rooms'] == statuses['occupied']
+    assert occupancy['maintenance_rooms'] == statuses['maintenance']
+    for row in occupancy['floors']:
+        on_floor = [room for room in rooms if room.floor == row['floor']]
+        assert row['total'] == len(on_floor)
+        assert row['occupied'] == sum(room.status == 'occupied' for room in on_floor)
+
+    tenants = ReportService.get_tenant_report()
+    assert tenants['active_tenants'] == Tenant.query.filter_by(status='active').count()
+    assert tenants['total_tenants'] == Tenant.query.count()
@@ -0,0 +1,48 @@
+"""
+Test tìm kiếm khách thuê / phòng: có bảng index (SQLite FTS5) và không có (dialect khác)
+"""
+from datetime import date
+
+from app.models import Room, Tenant
+from app.services import search_service
+from app.services.search_service import SearchService
+from app.utils.profiler import profile
+
+
+def _add_tenant(db, full_name, phone):
+    room = Room(room_number=f'S{phone[-3:]}', price=1_000_000)
+    db.session.add(room)
+    db.session.flush()
+    tenant = Tenant(full_name=full_name, id_number=f'ID{phone}', phone=phone, room_id=room.id,
+                    move_in_date=date.today())
+    db.session.add(tenant)
+    db.session.commit()
+    return tenant
+
+
+def _search(text):
+    return [tenant.full_name for tenant in SearchService.apply(Tenant.query, 'tenants', text, Tenant.id)]
+
+
+def test_search_ignores_accents(db):
+    _add_tenant(db, 'Nguyễn Văn Đức', '0901000111')
+    _add_tenant(db, 'Trần Thị Bình', '0901000222')
+
+    assert _search('nguyen duc') == ['Nguyễn Văn Đức']
+    assert _search('000222') == ['Trần Thị Bình']
+
+
+def test_without_index_tables_events_skip_and_search_uses_like(db, monkeypatch):
+    # Giả lập dialect không có bảng index (VD: MySQL)
+    monkeypatch.setattr(search_service, 'INDEXED_DIALECTS', ())
+
+    with profile() as stats:
+        tenant = _add_tenant(db, 'Le Van Nam', '0902000333')
+        tenant.phone = '0902000444'
+        db.session.commit()
+    assert not [sql for sql, _ in stats.statements if '_search' in sql]
+
+    assert _search('van nam') == ['Le Van Nam']
+    assert _search('000444') == ['Le Van Nam']
+    assert _search('khong co') == []
+    assert SearchService.rebuild() == 0
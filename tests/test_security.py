@@ -0,0 +1,40 @@
+"""
+Test rate limit đăng nhập theo IP client (sau reverse proxy)
+"""
+
+LOGIN = {'username': 'admin', 'password': 'sai-mat-khau'}
+PROXY = {'REMOTE_ADDR': '127.0.0.1'}  # nginx trên cùng máy
+
+
+def _login(client, forwarded_for):
+    return client.post('/auth/login', data=LOGIN, environ_base=PROXY,
+                       headers={'X-Forwarded-For': forwarded_for})
+
+
+def test_forwarded_ips_get_separate_login_buckets(make_app):
+    client = make_app(PROXY_FIX_X_FOR=1).test_client()
+
+    for _ in range(5):
+        assert _login(client, '203.0.113.1').status_code != 429
+    assert _login(client, '203.0.113.1').status_code == 429
+
+    # Client khác sau cùng proxy vẫn đăng nhập được
+    assert _login(client, '203.0.113.2').status_code != 429
+
+
+def test_forwarded_header_ignored_without_proxy_fix(make_app):
+    client = make_app(PROXY_FIX_X_FOR=0).test_client()
+
+    for index in range(5):
+        assert _login(client, f'203.0.113.{index}').status_code != 429
+    # Không tin X-Forwarded-For: đổi header không thoát được giới hạn
+    assert _login(client, '203.0.113.99').status_code == 429
+
+
+def test_proxy_fix_trusts_only_configured_hops(make_app):
+    client = make_app(PROXY_FIX_X_FOR=1).test_client()
+
+    # Client tự thêm IP giả vào đầu header; nginx nối IP thật vào cuối
+    for index in range(5):
+        assert _login(client, f'10.0.0.{index}, 203.0.113.7').status_code != 429
+    assert _login(client, '10.0.0.99, 203.0.113.7').status_code == 429
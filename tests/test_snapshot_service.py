@@ -0,0 +1,108 @@
+"""
+Test monthly_snapshots: ghi dữ liệu chỉ đánh dấu tháng (dirty), tính lại khi đọc
+"""
+from datetime import date
+
+import pytest
+
+from app.models import Invoice, MonthlySnapshot, Room, Tenant
+from app.services import InvoiceService, PaymentService, ReportService, SnapshotService
+from app.utils.profiler import profile
+
+TODAY = date.today()
+
+
+def _snapshot(db, year, month):
+    db.session.expire_all()
+    return MonthlySnapshot.query.filter_by(year=year, month=month).one()
+
+
+def test_payment_only_marks_month_dirty(db, make_invoice):
+    invoice = make_invoice(TODAY.year, TODAY.month)
+    ReportService.get_revenue_report(TODAY.year, TODAY.month)
+    assert not _snapshot(db, TODAY.year, TODAY.month).dirty
+    
+    with profile() as stats:
+        PaymentService.record_payment(invoice.id, 400_000)
+    
+    # Không tổng hợp lại hóa đơn / khách / phòng khi ghi thanh toán
+    snapshot_sql = [sql for sql, _ in stats.statements if 'monthly_snapshots' in sql]
+    assert len(snapshot_sql) == 1 and snapshot_sql[0].startswith('UPDATE monthly_snapshots SET dirty')
+    assert not [sql for sql, _ in stats.statements if 'count(' in sql.lower()]
+    assert _snapshot(db, TODAY.year, TODAY.month).dirty
+    
+    assert ReportService.get_revenue_report(TODAY.year, TODAY.month)['paid_amount'] == 400_000
+    assert not _snapshot(db, TODAY.year, TODAY.month).dirty
+
+
+def test_rollback_does_not_mark_month(db, make_invoice):
+    invoice = make_invoice(TODAY.year, TODAY.month)
+    ReportService.get_revenue_report(TODAY.year, TODAY.month)
+    
+    invoice.apply_payment(100_000)
+    db.session.flush()
+    db.session.rollback()
+    
+    assert not _snapshot(db, TODAY.year, TODAY.month).dirty
+
+
+def test_refresh_upserts_single_row(db, make_invoice):
+    make_invoice(TODAY.year, TODAY.month, room_price=1_000_000)
+    
+    SnapshotService.refresh(TODAY.year, TODAY.month)
+    SnapshotService.refresh(TODAY.year, TODAY.month)
+    db.session.commit()
+    
+    rows = MonthlySnapshot.query.filter_by(year=TODAY.year, month=TODAY.month).all()
+    assert len(rows) == 1
+    assert rows[0].receivable == 1_000_000
+
+
+def test_bulk_invoices_mark_month(db, make_invoice):
+    make_invoice(TODAY.year, TODAY.month)
+    room = Room(room_number='B0001', price=2_500_000, status='occupied')
+    db.session.add(room)
+    db.session.commit()
+    ReportService.get_revenue_report(TODAY.year, TODAY.month)
+    
+    created, _ = InvoiceService.create_bulk_invoices(TODAY.month, TODAY.year, room_ids=[room.id])
+    
+    assert created == 1
+    assert _snapshot(db, TODAY.year, TODAY.month).dirty
+    report = ReportService.get_revenue_report(TODAY.year, TODAY.month)
+    assert report['total_invoices'] == Invoice.query.filter_by(year=TODAY.year, month=TODAY.month).count() == 2
+
+
+def test_backdated_move_out_marks_closed_months(db, make_invoice):
+    year, month = (TODAY.year, TODAY.month - 2) if TODAY.month > 2 else (TODAY.year - 1, TODAY.month + 10)
+    invoice = make_invoice(year, month)
+    tenant_id = invoice.room.tenants.first().id
+    assert SnapshotService.get_month(year, month).active_tenants == 1
+    assert _snapshot(db, year, month).closed
+    
+    # Nhập chuyển đi trễ: ngày chuyển đi thuộc tháng đã chốt
+    tenant = db.session.get(Tenant, tenant_id)
+    tenant.move_out_date = date(year, month, 15)
+    tenant.status = 'inactive'
+    db.session.commit()
+    
+    assert _snapshot(db, year, month).dirty
+    assert SnapshotService.get_month(year, month).active_tenants == 0
+
+
+def test_mark_dirty_commits_with_data(db, make_invoice, monkeypatch):
+    invoice = make_invoice(TODAY.year, TODAY.month)
+    ReportService.get_revenue_report(TODAY.year, TODAY.month)
+    
+    def fail(months, connection):
+        raise RuntimeError('mark_dirty')
+    monkeypatch.setattr(SnapshotService, 'mark_dirty', fail)
+    
+    # Không đánh dấu được → cả thanh toán cũng không được commit
+    invoice.apply_payment(100_000)
+    with pytest.raises(RuntimeError):
+        db.session.commit()
+    db.session.rollback()
+    
+    assert db.session.get(Invoice, invoice.id).paid_amount == 0
+    assert not _snapshot(db, TODAY.year, TODAY.month).dirty
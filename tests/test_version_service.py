@@ -0,0 +1,48 @@
+"""
+Test data_versions: tăng 1 lần mỗi commit, không tăng khi rollback
+"""
+from sqlalchemy import update
+
+from app.models import Room
+from app.services import DataVersionService
+from app.utils.profiler import profile
+
+
+def _version(name):
+    return DataVersionService.get([name])[name]
+
+
+def test_version_bumped_once_per_commit(db):
+    before = _version('rooms')
+
+    with profile() as stats:
+        for number in range(3):
+            db.session.add(Room(room_number=f'V{number}', price=1_000_000))
+            db.session.flush()
+        db.session.execute(update(Room).values(floor=2))
+        db.session.commit()
+
+    assert _version('rooms') == before + 1
+    assert len([sql for sql, _ in stats.statements if 'data_versions' in sql]) == 1
+
+
+def test_rollback_does_not_bump_version(db):
+    before = _version('rooms')
+
+    db.session.add(Room(room_number='R1', price=1_000_000))
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+
+    assert _version('rooms') == before
+
+
+def test_api_etag_changes_after_commit(logged_in, db):
+    first = logged_in.get('/api/v1/rooms')
+    assert first.status_code == 200
+    assert logged_in.get('/api/v1/rooms', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    db.session.add(Room(room_number='E1', price=1_000_000))
+    db.session.commit()
+
+    assert logged_in.get('/api/v1/rooms', headers={'If-None-Match': first.headers['ETag']}).status_code == 200